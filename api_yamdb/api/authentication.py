@@ -0,0 +1,87 @@
+"""Stateless JWT authentication.
+
+Access tokens carry the ``role`` and ``is_superuser`` claims, so requests
+are authenticated with a ``ClaimsUser`` built from the token and the
+permission checks never load the ``User`` row.
+
+When the role, the superuser flag or the active status of a user changes,
+or the user is deleted, api/signals.py records the time in the shared
+cache for one token lifetime. Tokens issued before that moment fall back
+to loading the user from the database until they expire. Without
+``SHARED_CACHE_URL`` other workers would never see that mark, so the
+claims are not trusted at all and every request loads its user.
+"""
+import time
+
+from django.conf import settings
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import (
+    JWTAuthentication, JWTTokenUserAuthentication)
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+from users.models import User
+
+from .cache import shared_cache
+
+REVOKED_PREFIX = "auth-revoked:"
+CLAIMS = ("role", "is_superuser")
+
+
+class ClaimsAccessToken(AccessToken):
+    """Access token with the claims the permission classes need."""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token["role"] = user.role
+        token["is_superuser"] = user.is_superuser
+        return token
+
+
+class ClaimsUser(TokenUser):
+    """User built from the token claims, without a database query."""
+
+    @cached_property
+    def role(self):
+        return self.token.get("role", User.USER)
+
+    def is_admin(self):
+        return self.role == User.ADMIN
+
+    def is_moderator(self):
+        return self.role == User.MODERATOR
+
+
+def revoke(user_id):
+    """Make tokens issued so far for the user fall back to the database."""
+    lifetime = api_settings.ACCESS_TOKEN_LIFETIME.total_seconds()
+    shared_cache().set(
+        f"{REVOKED_PREFIX}{user_id}", time.time(), int(lifetime) + 1
+    )
+
+
+def is_revoked(token):
+    revoked_at = shared_cache().get(
+        f"{REVOKED_PREFIX}{token[api_settings.USER_ID_CLAIM]}"
+    )
+    return revoked_at is not None and token.get("iat", 0) <= revoked_at
+
+
+class ClaimsJWTAuthentication(JWTTokenUserAuthentication):
+    """Authenticate with a ``ClaimsUser`` while the claims can be trusted.
+
+    Tokens issued before the claims were added or before a revocation get
+    the database user, as with ``JWTAuthentication``, and so does every
+    token when there is no shared cache to hold the revocations.
+    """
+
+    def get_user(self, validated_token):
+        if (
+            "shared" not in settings.CACHES
+            or api_settings.USER_ID_CLAIM not in validated_token
+            or not all(claim in validated_token for claim in CLAIMS)
+            or is_revoked(validated_token)
+        ):
+            return JWTAuthentication.get_user(self, validated_token)
+        return super().get_user(validated_token)
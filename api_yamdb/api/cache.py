@@ -0,0 +1,140 @@
+"""Read-through cache of rendered catalog responses.
+
+Entries live in the per-worker ``default`` cache (local memory, LRU) and,
+when ``SHARED_CACHE_URL`` is configured, in the ``shared`` cache used by
+all workers. Instead of deleting entries on writes, api/signals.py bumps
+version tokens once the write commits:
+
+* namespace tokens (``categories``, ``genres``, ``titles``) are part of
+  the cache key, so a bump makes every list under them unreachable;
+* object tokens (``title:<id>``) are stored next to each entry and checked
+  on every hit, so a review only invalidates the entries that show its
+  title.
+
+Tokens live in the shared cache if there is one, otherwise each worker
+only sees its own bumps and other workers catch up after
+``RESPONSE_CACHE_TIMEOUT``. List ordering by rating can move a title into
+a page without changing that page's tokens, the timeout bounds that case
+too.
+"""
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.response import Response
+
+TOKEN_PREFIX = "catalog-version:"
+
+
+def shared_cache():
+    alias = "shared" if "shared" in settings.CACHES else "default"
+    return caches[alias]
+
+
+def new_token():
+    return time.time_ns()
+
+
+def get_tokens(names):
+    """Current version token of every name, creating missing ones."""
+    cache = shared_cache()
+    keys = {f"{TOKEN_PREFIX}{name}": name for name in names}
+    found = cache.get_many(keys)
+    tokens = {keys[key]: token for key, token in found.items()}
+    for key, name in keys.items():
+        if name not in tokens:
+            token = new_token()
+            if not cache.add(key, token, None):
+                token = cache.get(key, token)
+            tokens[name] = token
+    return tokens
+
+
+def bump(*names):
+    shared_cache().set_many(
+        {f"{TOKEN_PREFIX}{name}": new_token() for name in names}, None
+    )
+
+
+class CachedResponseMixin:
+    """Serve ``list`` and ``retrieve`` of a viewset from the response cache.
+
+    ``cache_namespaces`` are the tokens every list response of the view
+    depends on (``cache_retrieve_namespaces`` for single objects), and
+    ``get_cache_dependencies`` returns the per-object tokens of a response,
+    or None when the response must not be cached.
+    """
+
+    cache_namespaces = ()
+    cache_retrieve_namespaces = None
+
+    def get_cache_dependencies(self, data):
+        return []
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def get_cache_key(self, request, tokens):
+        query = urlencode(sorted(request.query_params.lists()), doseq=True)
+        raw = "|".join(
+            [request.path, query]
+            + [f"{name}={token}" for name, token in sorted(tokens.items())]
+        )
+        return "response:" + hashlib.md5(raw.encode()).hexdigest()
+
+    def cache_lookup(self):
+        """Key, cached data (or None) and version tokens of the request.
+
+        The result is kept on the view, which lives for one request.
+        """
+        if getattr(self, "_cache_lookup", None) is not None:
+            return self._cache_lookup
+        namespaces = self.cache_namespaces
+        if self.action == "retrieve" and (
+            self.cache_retrieve_namespaces is not None
+        ):
+            namespaces = self.cache_retrieve_namespaces
+        tokens = get_tokens(namespaces)
+        key = self.get_cache_key(self.request, tokens)
+        local, shared = caches["default"], shared_cache()
+        entry = local.get(key)
+        if entry is None and shared is not local:
+            entry = shared.get(key)
+            if entry is not None:
+                local.set(key, entry, settings.RESPONSE_CACHE_TIMEOUT)
+        data = None
+        if entry is not None:
+            cached_data, dependencies = entry
+            if not dependencies or get_tokens(dependencies) == dependencies:
+                data = cached_data
+                tokens = {**tokens, **dependencies}
+        self._cache_lookup = (key, data, tokens)
+        return self._cache_lookup
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        key, data, tokens = self.cache_lookup()
+        if data is not None:
+            return Response(data)
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            names = self.get_cache_dependencies(response.data)
+            if names is None:
+                return response
+            dependencies = get_tokens(names) if names else {}
+            entry = (response.data, dependencies)
+            caches["default"].set(key, entry, settings.RESPONSE_CACHE_TIMEOUT)
+            if "shared" in settings.CACHES:
+                shared_cache().set(
+                    key, entry, settings.RESPONSE_CACHE_TIMEOUT
+                )
+            self._cache_lookup = (key, response.data, {
+                **tokens, **dependencies
+            })
+        return response
@@ -0,0 +1,77 @@
+"""Conditional GET (ETag / Last-Modified / 304) for list and detail views.
+
+Validators come from small aggregate queries (row count and the latest
+``modified``), so a 304 is answered without running the serializer.
+"""
+import calendar
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+class ConditionalGetMixin:
+    """Answer ``If-None-Match``/``If-Modified-Since`` before serializing.
+
+    ``get_validators`` returns ``(parts, last_modified)`` for the current
+    request: ``parts`` are hashed into the ETag, ``last_modified`` (a
+    datetime or None) is only given when every change to the response,
+    deletions included, moves it forward. Returning None skips the check,
+    e.g. when the object does not exist; ``get_response_validators`` may
+    then still provide headers for the response that was produced.
+    """
+
+    def get_validators(self):
+        return None
+
+    def get_response_validators(self, response):
+        return None
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        validators = self.get_validators()
+        if validators is not None:
+            etag, timestamp = self.make_validators(request, *validators)
+            response = get_conditional_response(
+                request, etag=etag, last_modified=timestamp
+            )
+            if response is not None:
+                return self.add_validators(response, etag, timestamp)
+        response = handler(request, *args, **kwargs)
+        if response.status_code != 200:
+            return response
+        if validators is None:
+            validators = self.get_response_validators(response)
+            if validators is None:
+                return response
+            etag, timestamp = self.make_validators(request, *validators)
+        return self.add_validators(response, etag, timestamp)
+
+    @staticmethod
+    def make_validators(request, parts, last_modified):
+        etag = quote_etag(
+            hashlib.md5(
+                repr((request.get_full_path(), parts)).encode()
+            ).hexdigest()
+        )
+        timestamp = None
+        if last_modified is not None:
+            timestamp = calendar.timegm(last_modified.utctimetuple())
+        return etag, timestamp
+
+    @staticmethod
+    def add_validators(response, etag, timestamp):
+        if response.status_code in (200, 304):
+            response["ETag"] = etag
+            if timestamp is not None:
+                response["Last-Modified"] = http_date(timestamp)
+        return response
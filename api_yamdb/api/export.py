@@ -0,0 +1,168 @@
+"""Streaming NDJSON exports of the catalog for partners mirroring it.
+
+``GET /api/v1/export/<titles|reviews|comments>.ndjson`` writes one JSON
+object per line, in the format of the API with the parent ids added.
+Rows come from ``.iterator(chunk_size=EXPORT_CHUNK_SIZE)``, a server-side
+cursor on PostgreSQL, and are shaped chunk by chunk by the row
+serializers of api/rows.py, so the memory of the worker does not grow
+with the table. ``Accept-Encoding: gzip`` compresses the stream on the
+fly.
+
+Reviews and comments are ordered by ``(pub_date, id)``, titles by id. A
+consumer resumes from the last line it got: ``?since=<pub_date>&
+since_id=<id>`` (``?since_id=<id>`` for titles) returns only the rows
+after it. Rows are stamped when they are written, before their
+transaction commits, so reviews and comments newer than
+``EXPORT_WATERMARK_LAG`` seconds are held back: a row committed later
+than that could land behind a watermark that was already read. Title ids
+come from a sequence, and have the same gap for long transactions.
+"""
+import zlib
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.db.models import Q
+from django.http import Http404, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.views import APIView
+from reviews.models import Comment, Review, Title
+
+from .permissions import IsAdminOrSuperuser
+from .renderers import FastJSONRenderer
+from .rows import RowSerializer, TitleRowSerializer
+from .serializers import (CommentExportSerializer, ReviewExportSerializer,
+                          TitleSerializer)
+
+
+class Export:
+    """A table to export: rows, their serializer and watermark columns."""
+
+    def __init__(self, queryset, row_serializer, watermark):
+        self.queryset = queryset
+        self.row_serializer = row_serializer
+        self.watermark = watermark
+
+    def get_rows(self, since=None, since_id=None):
+        queryset = self.queryset.order_by(*self.watermark)
+        if "pub_date" not in self.watermark:
+            if since_id is not None:
+                queryset = queryset.filter(id__gt=since_id)
+        else:
+            queryset = queryset.filter(
+                pub_date__lte=timezone.now()
+                - timedelta(seconds=settings.EXPORT_WATERMARK_LAG)
+            )
+            if since is not None:
+                after = Q(pub_date__gt=since)
+                if since_id is not None:
+                    after |= Q(pub_date=since, id__gt=since_id)
+                queryset = queryset.filter(after)
+        return self.row_serializer.get_values(queryset)
+
+
+EXPORTS = {
+    "titles": Export(
+        Title.objects.all(), TitleRowSerializer(TitleSerializer), ("id",)
+    ),
+    "reviews": Export(
+        Review.objects.all(),
+        RowSerializer(ReviewExportSerializer),
+        ("pub_date", "id"),
+    ),
+    "comments": Export(
+        Comment.objects.all(),
+        RowSerializer(CommentExportSerializer),
+        ("pub_date", "id"),
+    ),
+}
+
+
+def generate_lines(rows, row_serializer, chunk_size):
+    rows = rows.iterator(chunk_size=chunk_size)
+    renderer = FastJSONRenderer()
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield b"".join(
+            renderer.render(record) + b"\n"
+            for record in row_serializer.to_representation(chunk)
+        )
+
+
+def accepts_gzip(header):
+    """Whether an Accept-Encoding header allows gzip, ``q=0`` refuses."""
+    qualities = {}
+    for coding in header.split(","):
+        name, *params = coding.split(";")
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name.strip().lower()] = quality
+    return qualities.get("gzip", qualities.get("*", 0.0)) > 0
+
+
+def gzip_stream(chunks):
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+class ExportView(APIView):
+    permission_classes = (IsAdminOrSuperuser,)
+
+    def get(self, request, resource):
+        if resource not in EXPORTS:
+            raise Http404
+        export = EXPORTS[resource]
+        rows = export.get_rows(*self.get_watermark(request))
+        stream = generate_lines(
+            rows, export.row_serializer, settings.EXPORT_CHUNK_SIZE
+        )
+        gzip = accepts_gzip(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if gzip:
+            stream = gzip_stream(stream)
+        response = StreamingHttpResponse(
+            stream, content_type="application/x-ndjson"
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="{resource}.ndjson"'
+        )
+        response["Vary"] = "Accept-Encoding"
+        if gzip:
+            response["Content-Encoding"] = "gzip"
+        return response
+
+    @staticmethod
+    def get_watermark(request):
+        since = request.query_params.get("since")
+        since_id = request.query_params.get("since_id")
+        errors = {}
+        if since is not None:
+            try:
+                since = parse_datetime(since)
+            except ValueError:
+                since = None
+            if since is None:
+                errors["since"] = "Укажите дату в формате ISO 8601."
+            elif timezone.is_aware(since) and not settings.USE_TZ:
+                since = timezone.make_naive(since)
+        if since_id is not None:
+            if not since_id.isdigit():
+                errors["since_id"] = "Укажите id."
+            else:
+                since_id = int(since_id)
+        if errors:
+            raise ValidationError(errors)
+        return since, since_id
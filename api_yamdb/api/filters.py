@@ -1,10 +1,31 @@
 from django_filters import rest_framework as filter
 from reviews.models import Title
 
+from . import slugs
+
+
+class SlugTableFilter(filter.CharFilter):
+    """Filters by the id of the slug in a table of api/slugs.py.
+
+    The related table is not joined, an unknown slug matches nothing.
+    """
+
+    def __init__(self, table, **kwargs):
+        self.table = table
+        super().__init__(**kwargs)
+
+    def filter(self, qs, value):
+        if not value:
+            return qs
+        entry = self.table.get(value)
+        if entry is None:
+            return qs.none()
+        return super().filter(qs, entry.id)
+
 
 class FilterTitle(filter.FilterSet):
-    category = filter.CharFilter(field_name="category__slug")
-    genre = filter.CharFilter(field_name="genre__slug")
+    category = SlugTableFilter(slugs.categories, field_name="category")
+    genre = SlugTableFilter(slugs.genres, field_name="genre")
     name = filter.CharFilter(field_name="name", lookup_expr="contains")
     year = filter.NumberFilter(field_name="year")
 
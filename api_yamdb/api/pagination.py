@@ -0,0 +1,175 @@
+import base64
+import binascii
+import json
+from collections import OrderedDict
+from datetime import datetime
+from functools import reduce
+from operator import and_, or_
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class PageSizePagination(PageNumberPagination):
+    """Page number pagination with ``?page_size=`` up to MAX_PAGE_SIZE."""
+
+    page_size_query_param = "page_size"
+
+    @property
+    def max_page_size(self):
+        return settings.MAX_PAGE_SIZE
+
+
+class KeysetPagination(PageSizePagination):
+    """Page number pagination with an opt-in keyset (cursor) mode.
+
+    Passing ``?cursor=`` switches to keyset pages ordered by ``ordering``:
+    no COUNT(*), no OFFSET, and ``next``/``previous`` links carry an opaque
+    cursor with the position of the edge row. Requests without the
+    parameter keep the usual ``?page=`` behaviour.
+    """
+
+    cursor_query_param = "cursor"
+    ordering = ("-pub_date", "-id")
+    invalid_cursor_message = "Неверный курсор."
+
+    def use_keyset(self, request):
+        return self.cursor_query_param in request.query_params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.use_keyset(request)
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(
+            request.query_params.get(self.cursor_query_param, "")
+        )
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(self.invert(field) for field in ordering)
+        queryset = queryset.order_by(*ordering)
+        try:
+            if position is not None:
+                queryset = queryset.filter(self.after(ordering, position))
+            results = list(queryset[:page_size + 1])
+        except (ValidationError, ValueError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
+        has_more = len(results) > page_size
+        results = results[:page_size]
+        if not results:
+            self.next_position = self.previous_position = None
+        elif reverse:
+            results.reverse()
+            self.next_position = self.get_position(results[-1])
+            self.previous_position = (
+                self.get_position(results[0]) if has_more else None
+            )
+        else:
+            self.next_position = (
+                self.get_position(results[-1]) if has_more else None
+            )
+            self.previous_position = (
+                self.get_position(results[0]) if position is not None else None
+            )
+        return results
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response(
+            OrderedDict(
+                [
+                    ("next", self.get_next_link()),
+                    ("previous", self.get_previous_link()),
+                    ("results", data),
+                ]
+            )
+        )
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        return self.get_link(self.next_position, reverse=False)
+
+    def get_previous_link(self):
+        if not self.keyset:
+            return super().get_previous_link()
+        return self.get_link(self.previous_position, reverse=True)
+
+    def get_link(self, position, reverse):
+        if position is None:
+            return None
+        url = remove_query_param(self.base_url, self.page_query_param)
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(position, reverse)
+        )
+
+    @staticmethod
+    def invert(field):
+        return field[1:] if field.startswith("-") else f"-{field}"
+
+    @staticmethod
+    def after(ordering, position):
+        """Q for rows strictly after ``position`` in ``ordering``."""
+        conditions = []
+        for index, field in enumerate(ordering):
+            lookup = "lt" if field.startswith("-") else "gt"
+            beyond = Q(**{f"{field.lstrip('-')}__{lookup}": position[index]})
+            equal = [
+                Q(**{previous.lstrip("-"): value})
+                for previous, value in zip(ordering[:index], position)
+            ]
+            conditions.append(reduce(and_, equal, beyond))
+        return reduce(or_, conditions)
+
+    def get_position(self, instance):
+        position = []
+        for field in self.ordering:
+            name = field.lstrip("-")
+            # Model instances, or .values() rows (see api/rows.py).
+            if isinstance(instance, dict):
+                value = instance[name]
+            else:
+                value = getattr(instance, name)
+            if isinstance(value, datetime):
+                value = value.isoformat()
+            position.append(value)
+        return position
+
+    def encode_cursor(self, position, reverse):
+        data = json.dumps({"p": position, "r": reverse})
+        return base64.urlsafe_b64encode(data.encode()).decode()
+
+    def decode_cursor(self, cursor):
+        if not cursor:
+            return None, False
+        try:
+            data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            position, reverse = data["p"], bool(data["r"])
+        except (TypeError, ValueError, KeyError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(
+            self.ordering
+        ):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+
+class SearchPagination(KeysetPagination):
+    """Keyset pages of search results, best matches first.
+
+    Keyed on the integer ``rank_key`` of api/search.py, equal ranks are
+    ordered by id.
+    """
+
+    ordering = ("-rank_key", "-id")
+
+    def use_keyset(self, request):
+        return True
@@ -0,0 +1,45 @@
+"""JSON renderer using orjson when it is installed.
+
+orjson is an optional dependency: without it, or for output it cannot
+produce the same way (indented or ASCII-only JSON, values it does not
+know), ``FastJSONRenderer`` falls back to DRF's stdlib renderer. The
+output is otherwise the same bytes, except for floats in exponent
+notation (orjson writes ``1e-7``, the stdlib ``1e-07``).
+"""
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+        try:
+            ret = orjson.dumps(
+                data,
+                # Dates and lazy strings are encoded like JSONRenderer does.
+                default=self.encoder_class().default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME,
+            )
+        except TypeError:
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+        # JSONRenderer escapes the two line terminators that are valid in
+        # JSON strings but not in JavaScript ones.
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+            b"\xe2\x80\xa9", b"\\u2029"
+        )
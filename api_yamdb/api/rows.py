@@ -0,0 +1,242 @@
+"""Read-only serialization straight from ``.values()`` rows.
+
+A ``RowSerializer`` gives the same data as its DRF serializer for list
+and retrieve requests, without model instances or the per-field
+machinery of ``ModelSerializer``. The queryset is narrowed to the
+needed columns with ``.values()``. Each row is then shaped by a plan of
+``(key, column, converter)`` entries, built once from the fields of the
+serializer.
+"""
+from collections import defaultdict
+from datetime import datetime
+from operator import itemgetter
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import serializers
+from rest_framework.generics import get_object_or_404
+from rest_framework.response import Response
+from rest_framework.settings import ISO_8601, api_settings
+from reviews.models import Title
+
+from .serializers import selected_fields
+
+# Fields whose database value is already the representation.
+PLAIN_FIELDS = (
+    serializers.CharField,
+    serializers.IntegerField,
+    serializers.BooleanField,
+)
+
+
+class RowSerializer:
+    """Shapes ``.values()`` rows the way ``serializer_class`` would.
+
+    Fields reading a model field, a foreign key id or, for
+    ``SlugRelatedField``, a field of a related model are compiled from
+    the serializer. Anything else (method fields, nested serializers)
+    needs a subclass.
+    """
+
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+        self._plan = None
+
+    @property
+    def plan(self):
+        if self._plan is None:
+            self._plan = [
+                self.compile_field(name, field)
+                for name, field in self.serializer_class().fields.items()
+                if not field.write_only
+            ]
+        return self._plan
+
+    def compile_field(self, name, field):
+        if isinstance(field, serializers.SlugRelatedField):
+            return name, f"{field.source}__{field.slug_field}", None
+        if isinstance(field, serializers.PrimaryKeyRelatedField):
+            # .values() gives the id of a foreign key under its name.
+            return name, field.source, None
+        if "." in field.source or isinstance(field, (
+            serializers.RelatedField,
+            serializers.SerializerMethodField,
+            serializers.BaseSerializer,
+        )):
+            raise ImproperlyConfigured(
+                f"{self.serializer_class.__name__}.{name} has no row form"
+            )
+        if isinstance(field, PLAIN_FIELDS):
+            return name, field.source, None
+        if (
+            isinstance(field, serializers.DateTimeField)
+            and getattr(field, "format", None) is None
+            and api_settings.DATETIME_FORMAT == ISO_8601
+            and not settings.USE_TZ
+        ):
+            # What the field does for naive datetimes, minus the checks.
+            return name, field.source, datetime.isoformat
+        return name, field.source, field.to_representation
+
+    @property
+    def field_names(self):
+        return [key for key, _, _ in self.plan]
+
+    def get_columns(self, fields=None):
+        return [
+            column
+            for key, column, _ in self.plan
+            if fields is None or key in fields
+        ]
+
+    def get_values(self, queryset, fields=None, extra=()):
+        """``queryset`` as rows with the columns of ``fields``.
+
+        ``fields`` is a set of output keys, None for all of them.
+        ``extra`` columns are read too, e.g. for the cursor of a page.
+        """
+        columns = self.get_columns(fields)
+        columns += [column for column in extra if column not in columns]
+        return queryset.prefetch_related(None).values(*columns)
+
+    def to_representation(self, rows, fields=None):
+        plan = [
+            (key, column, convert)
+            for key, column, convert in self.plan
+            if fields is None or key in fields
+        ]
+        return [
+            {
+                key: (
+                    row[column]
+                    if convert is None or row[column] is None
+                    else convert(row[column])
+                )
+                for key, column, convert in plan
+            }
+            for row in rows
+        ]
+
+
+def get_rating(row):
+    count = row["rating_count"]
+    return round(row["rating_sum"] / count) if count else None
+
+
+def get_category(row):
+    if row["category__slug"] is None:
+        return None
+    return {"name": row["category__name"], "slug": row["category__slug"]}
+
+
+class TitleRowSerializer(RowSerializer):
+    """Rows of ``TitleSerializer`` with its category and genres.
+
+    The genres of all rows are read with one query, in id order like the
+    prefetch of ``TitleViewSet``, and only when they are asked for.
+    """
+
+    # Output key: columns it is built from, in the output order.
+    field_columns = {
+        "id": ("id",),
+        "rating": ("rating_sum", "rating_count"),
+        "name": ("name",),
+        "year": ("year",),
+        "description": ("description",),
+        "category": ("category__name", "category__slug"),
+        "genre": ("id",),
+    }
+
+    @property
+    def field_names(self):
+        return list(self.field_columns)
+
+    def get_columns(self, fields=None):
+        columns = []
+        for key, key_columns in self.field_columns.items():
+            if fields is None or key in fields:
+                columns += [
+                    column for column in key_columns if column not in columns
+                ]
+        return columns
+
+    def to_representation(self, rows, fields=None):
+        getters = {
+            "id": itemgetter("id"),
+            "rating": get_rating,
+            "name": itemgetter("name"),
+            "year": itemgetter("year"),
+            "description": itemgetter("description"),
+            "category": get_category,
+        }
+        if fields is None or "genre" in fields:
+            genres = defaultdict(list)
+            links = (
+                Title.genre.through.objects.filter(
+                    title_id__in=[row["id"] for row in rows]
+                )
+                .order_by("title_id", "genre_id")
+                .values_list("title_id", "genre__name", "genre__slug")
+            )
+            for title_id, name, slug in links:
+                genres[title_id].append({"name": name, "slug": slug})
+            getters["genre"] = lambda row: genres[row["id"]]
+        getters = [
+            (key, getter)
+            for key, getter in getters.items()
+            if fields is None or key in fields
+        ]
+        return [{key: getter(row) for key, getter in getters} for row in rows]
+
+
+class RowSerializerMixin:
+    """Serve safe ``list`` and ``retrieve`` requests from rows.
+
+    Opt in with ``row_serializer``. Other methods, and views without
+    one, go through the regular serializer. Goes right before the
+    generic viewset, so caching and conditional GET wrap it. Honours
+    ``?fields=`` like ``SparseFieldsMixin`` of the serializers, reading
+    only the columns of the selected fields.
+    """
+
+    row_serializer = None
+
+    def use_rows(self):
+        return self.row_serializer is not None and (
+            self.request.method in ("GET", "HEAD")
+        )
+
+    def get_row_fields(self):
+        return selected_fields(self.request, self.row_serializer.field_names)
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_rows():
+            return super().list(request, *args, **kwargs)
+        fields = self.get_row_fields()
+        # Keyset pages need the ordering columns of every row.
+        ordering = getattr(self.paginator, "ordering", ())
+        rows = self.row_serializer.get_values(
+            self.filter_queryset(self.get_queryset()),
+            fields,
+            extra=[field.lstrip("-") for field in ordering],
+        )
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(
+                self.row_serializer.to_representation(page, fields)
+            )
+        return Response(self.row_serializer.to_representation(rows, fields))
+
+    def retrieve(self, request, *args, **kwargs):
+        if not self.use_rows():
+            return super().retrieve(request, *args, **kwargs)
+        fields = self.get_row_fields()
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        rows = self.row_serializer.get_values(
+            self.filter_queryset(self.get_queryset()), fields
+        ).filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        row = get_object_or_404(rows)
+        self.check_object_permissions(request, row)
+        return Response(
+            self.row_serializer.to_representation([row], fields)[0]
+        )
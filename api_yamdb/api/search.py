@@ -0,0 +1,129 @@
+"""Full-text search over titles and reviews.
+
+On PostgreSQL queries match the stored ``search_vector`` columns through
+their GIN indexes. Other backends (SQLite in tests) use an in-memory
+inverted index that is built on first use and dropped by api/signals.py
+whenever a title or review changes.
+
+Results are ordered by ``rank_key``, the rank scaled to an integer: keyset
+cursors compare it exactly, where a float rank (``real`` on PostgreSQL)
+may not round-trip through JSON. ``rank`` is derived from the same key.
+"""
+import heapq
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connections
+from django.db.models import (Case, ExpressionWrapper, F, FloatField,
+                              IntegerField, Value, When)
+from django.db.models.functions import Cast
+
+# Default ts_rank weights of the A, B, C and D labels.
+WEIGHTS = {"A": 1.0, "B": 0.4, "C": 0.2, "D": 0.1}
+TOKEN_RE = re.compile(r"\w+")
+RANK_SCALE = 10 ** 6
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+class InvertedIndex:
+    """Token -> {pk: weighted term frequency} for one model."""
+
+    def __init__(self, documents):
+        self.postings = defaultdict(dict)
+        self.size = 0
+        for pk, texts in documents:
+            self.size += 1
+            for text, weight in texts:
+                for token, count in Counter(tokenize(text)).items():
+                    postings = self.postings[token]
+                    postings[pk] = postings.get(pk, 0) + count * weight
+
+    def search(self, query):
+        """Rank of every document containing all tokens of ``query``."""
+        tokens = set(tokenize(query))
+        if not tokens or not all(token in self.postings for token in tokens):
+            return {}
+        postings = [self.postings[token] for token in tokens]
+        matches = set.intersection(*(set(docs) for docs in postings))
+        return {
+            pk: sum(
+                docs[pk] * math.log(1 + self.size / len(docs))
+                for docs in postings
+            )
+            for pk in matches
+        }
+
+
+def get_index(model):
+    with _indexes_lock:
+        if model not in _indexes:
+            fields = model.objects.get_queryset().search_fields
+            names = [name for name, _ in fields]
+            weights = [WEIGHTS[weight] for _, weight in fields]
+            rows = model.objects.values_list("pk", *names).iterator()
+            _indexes[model] = InvertedIndex(
+                (row[0], zip((text or "" for text in row[1:]), weights))
+                for row in rows
+            )
+        return _indexes[model]
+
+
+def invalidate(model):
+    with _indexes_lock:
+        _indexes.pop(model, None)
+
+
+def search(queryset, query):
+    """Rows of ``queryset`` matching ``query``, with ``rank`` and ``rank_key``.
+
+    Without PostgreSQL only the ``SEARCH_FALLBACK_LIMIT`` best matches are
+    returned, each of them is one branch of a CASE expression.
+    """
+    if connections[queryset.db].vendor == "postgresql":
+        search_query = SearchQuery(query, config=settings.SEARCH_CONFIG)
+        return with_rank(
+            queryset.filter(search_vector=search_query),
+            Cast(
+                SearchRank(F("search_vector"), search_query)
+                * Value(float(RANK_SCALE)),
+                IntegerField(),
+            ),
+        )
+    ranks = get_index(queryset.model).search(query)
+    if not ranks:
+        return with_rank(queryset.none(), Value(0, IntegerField()))
+    best = heapq.nlargest(
+        settings.SEARCH_FALLBACK_LIMIT,
+        ranks.items(),
+        key=lambda item: (item[1], item[0]),
+    )
+    return with_rank(
+        queryset.filter(pk__in=[pk for pk, _ in best]),
+        Case(
+            *[
+                When(pk=pk, then=Value(round(rank * RANK_SCALE)))
+                for pk, rank in best
+            ],
+            output_field=IntegerField(),
+        ),
+    )
+
+
+def with_rank(queryset, rank_key):
+    return queryset.annotate(
+        rank_key=rank_key,
+        rank=ExpressionWrapper(
+            F("rank_key") / Value(float(RANK_SCALE)),
+            output_field=FloatField(),
+        ),
+    )
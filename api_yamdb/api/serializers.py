@@ -1,86 +1,175 @@
-from django.db.models import Avg
 from django.shortcuts import get_object_or_404
 from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 from rest_framework.validators import UniqueValidator
-from rest_framework_simplejwt.tokens import RefreshToken
 from reviews.models import Category, Comment, Genre, Review, Title
+from users.confirmation import check_confirmation_code
 from users.models import User
 
+from api_yamdb.metrics import Timer
 
-class CategorySerializer(serializers.ModelSerializer):
+from . import slugs
+from .authentication import ClaimsAccessToken
+
+
+def selected_fields(request, names):
+    """Field names from ``?fields=`` of a read request, None for all.
+
+    Unknown names are a validation error.
+    """
+    if request is None or request.method not in ("GET", "HEAD"):
+        return None
+    value = request.query_params.get("fields", "")
+    selected = {name.strip() for name in value.split(",") if name.strip()}
+    if not selected:
+        return None
+    unknown = selected.difference(names)
+    if unknown:
+        raise ValidationError(
+            {"fields": f"Неизвестные поля: {', '.join(sorted(unknown))}."}
+        )
+    return selected
+
+
+class SparseFieldsMixin:
+    """Leaves out the fields not listed in ``?fields=`` of the request."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        selected = selected_fields(self.context.get("request"), self.fields)
+        if selected is not None:
+            for name in set(self.fields) - selected:
+                self.fields.pop(name)
+
+
+class TimedSerializerMixin:
+    """Counts the output of the serializer as serializer time."""
+
+    def to_representation(self, instance):
+        with Timer("serializer"):
+            return super().to_representation(instance)
+
+
+class SlugTableField(serializers.SlugRelatedField):
+    """``SlugRelatedField`` resolving slugs from a table of api/slugs.py.
+
+    Gives the ``Entry`` of the slug, the serializer loads the objects.
+    """
+
+    def __init__(self, table, **kwargs):
+        self.table = table
+        super().__init__(
+            slug_field="slug", queryset=table.model.objects.all(), **kwargs
+        )
+
+    def to_internal_value(self, data):
+        if not isinstance(data, str):
+            self.fail("invalid")
+        entry = self.table.get(data)
+        if entry is None:
+            self.fail("does_not_exist", slug_name=self.slug_field, value=data)
+        return entry
+
+
+class CategorySerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         fields = ("name", "slug")
         model = Category
 
 
-class GenreSerializer(serializers.ModelSerializer):
+class GenreSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         fields = ("name", "slug")
         model = Genre
 
 
-class TitleSerializer(serializers.ModelSerializer):
-    category = serializers.SlugRelatedField(
-        slug_field="slug", queryset=Category.objects.all()
-    )
-    genre = serializers.SlugRelatedField(
-        slug_field="slug", queryset=Genre.objects.all(), many=True
-    )
+class TitleSerializer(
+    SparseFieldsMixin, TimedSerializerMixin, serializers.ModelSerializer
+):
+    category = SlugTableField(slugs.categories)
+    genre = SlugTableField(slugs.genres, many=True)
     rating = serializers.SerializerMethodField(required=False)
 
     class Meta:
-        fields = "__all__"
+        fields = (
+            "id",
+            "category",
+            "genre",
+            "rating",
+            "name",
+            "year",
+            "description",
+        )
         model = Title
 
-    def validate_category(self, value):
-        if value is not None:
-            category = Category.objects.get(slug=value)
-            if category:
-                return value
-            else:
-                raise serializers.ValidationError("Такой категории нет!")
-        else:
-            raise serializers.ValidationError("Такой категории нет!")
-
     def validate_genre(self, values):
-        if len(values) > 0:
-            if not Genre.objects.filter(slug__in=values):
-                raise serializers.ValidationError("Такого жанра нет!")
-            else:
-                return values
-        else:
+        if not values:
             raise serializers.ValidationError("Такого жанра нет!")
+        return values
+
+    def validate(self, attrs):
+        # The tables of api/slugs.py may not know of a deletion made on
+        # another worker yet, the rows are loaded by id before saving.
+        if "category" in attrs:
+            category = attrs["category"]
+            objects = slugs.categories.load([category])
+            if category.id not in objects:
+                raise ValidationError({"category": "Такой категории нет!"})
+            attrs["category"] = objects[category.id]
+        if "genre" in attrs:
+            objects = slugs.genres.load(attrs["genre"])
+            if any(genre.id not in objects for genre in attrs["genre"]):
+                raise ValidationError({"genre": "Такого жанра нет!"})
+            attrs["genre"] = [objects[genre.id] for genre in attrs["genre"]]
+        return attrs
 
     def to_representation(self, instance):
         data = super(TitleSerializer, self).to_representation(instance)
-        category_slug = data.pop("category")
-        name_category = instance.category.name
-        category = {"category": {"name": name_category, "slug": category_slug}}
-        genre_data = data.pop("genre")
-        genre_list = []
-        genre_dict = {"genre": genre_list}
-        for genre in genre_data:
-            name = Genre.objects.get(slug=genre).name
-            genre_dict_one = {"name": name, "slug": genre}
-            genre_list.append(genre_dict_one)
-        data.update(category)
-        data.update(genre_dict)
+        # Nested category and genres go last, each one only if selected.
+        if "category" in data:
+            del data["category"]
+            if instance.category is None:
+                data["category"] = None
+            else:
+                data["category"] = CategorySerializer(instance.category).data
+        if "genre" in data:
+            del data["genre"]
+            data["genre"] = GenreSerializer(
+                instance.genre.all(), many=True
+            ).data
         return data
 
     def get_rating(self, obj):
-        rating = obj.reviews.aggregate(Avg("score"))["score__avg"]
-        if rating is None:
-            return rating
-        return round(rating)
+        if not obj.rating_count:
+            return None
+        return round(obj.rating_sum / obj.rating_count)
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class TitleBulkSerializer(serializers.ModelSerializer):
+    """One title of a bulk write, checked without database queries.
+
+    The category and genres stay slugs, api/bulk.py resolves the slugs of
+    all the titles at once.
+    """
+
+    id = serializers.IntegerField(required=False)
+    category = serializers.SlugField()
+    genre = serializers.ListField(
+        child=serializers.SlugField(), allow_empty=False
+    )
+
+    class Meta:
+        fields = ("id", "category", "genre", "name", "year", "description")
+        model = Title
+
+
+class ReviewSerializer(
+    SparseFieldsMixin, TimedSerializerMixin, serializers.ModelSerializer
+):
     author = serializers.SlugRelatedField(
         slug_field="username",
         read_only=True,
-        default=serializers.CurrentUserDefault(),
     )
 
     class Meta:
@@ -88,7 +177,23 @@ class ReviewSerializer(serializers.ModelSerializer):
         model = Review
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class TitleSearchSerializer(TitleSerializer):
+    rank = serializers.FloatField(read_only=True)
+
+    class Meta(TitleSerializer.Meta):
+        fields = TitleSerializer.Meta.fields + ("rank",)
+
+
+class ReviewSearchSerializer(ReviewSerializer):
+    rank = serializers.FloatField(read_only=True)
+
+    class Meta(ReviewSerializer.Meta):
+        fields = ("id", "title", "text", "author", "score", "pub_date", "rank")
+
+
+class CommentSerializer(
+    SparseFieldsMixin, TimedSerializerMixin, serializers.ModelSerializer
+):
     author = serializers.SlugRelatedField(
         slug_field="username", read_only=True
     )
@@ -98,15 +203,20 @@ class CommentSerializer(serializers.ModelSerializer):
         model = Comment
 
 
+class ReviewExportSerializer(ReviewSerializer):
+    class Meta(ReviewSerializer.Meta):
+        fields = ("id", "title", "text", "author", "score", "pub_date")
+
+
+class CommentExportSerializer(CommentSerializer):
+    class Meta(CommentSerializer.Meta):
+        fields = ("id", "review", "text", "author", "pub_date")
+
+
 class SignUpSerializer(serializers.Serializer):
-    username = serializers.CharField(
-        required=True,
-        validators=[UniqueValidator(queryset=User.objects.all())],
-    )
-    email = serializers.EmailField(
-        required=True,
-        validators=[UniqueValidator(queryset=User.objects.all())],
-    )
+    # Uniqueness is left to the database, see SignUpViewSet.
+    username = serializers.CharField(required=True)
+    email = serializers.EmailField(required=True)
 
     def validate(self, attrs):
         if attrs.get("username") == "me":
@@ -130,15 +240,21 @@ class TokenSerializer(serializers.Serializer):
         self.fields["confirmation_code"] = serializers.CharField()
 
     def validate(self, attrs):
-        user = get_object_or_404(User, username=attrs["username"])
-        if user.confirmation_code == attrs["confirmation_code"]:
-            refresh = RefreshToken.for_user(user)
-            return {"access": str(refresh.access_token)}
+        user = get_object_or_404(
+            User.objects.only(
+                "id", "confirmation_version", *User.CLAIM_FIELDS
+            ),
+            username=attrs["username"],
+        )
+        if check_confirmation_code(user, attrs["confirmation_code"]):
+            return {"access": str(ClaimsAccessToken.for_user(user))}
         else:
             raise ValidationError("неверный confirmation_code")
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(
+    SparseFieldsMixin, TimedSerializerMixin, serializers.ModelSerializer
+):
     email = serializers.EmailField(
         required=True,
         validators=[UniqueValidator(queryset=User.objects.all())],
@@ -0,0 +1,68 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from reviews.models import Category, Genre, Review, Title
+from users.models import User
+
+from . import authentication, cache, search
+
+
+def bump(*names):
+    """Bump the cache tokens once the transaction of the change commits.
+
+    A bump made before the commit would let a concurrent read cache the
+    old rows under the new token until ``RESPONSE_CACHE_TIMEOUT``.
+    """
+    transaction.on_commit(lambda: cache.bump(*names))
+
+
+@receiver([post_save, post_delete], sender=Title)
+@receiver([post_save, post_delete], sender=Review)
+def invalidate_search_index(sender, **kwargs):
+    transaction.on_commit(lambda: search.invalidate(sender))
+
+
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_categories(sender, **kwargs):
+    bump("categories")
+
+
+@receiver([post_save, post_delete], sender=Genre)
+def invalidate_genres(sender, **kwargs):
+    bump("genres")
+
+
+@receiver([post_save, post_delete], sender=Title)
+def invalidate_title(sender, instance, **kwargs):
+    bump("titles", f"title:{instance.pk}")
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def invalidate_title_genres(sender, instance, action, reverse, pk_set,
+                            **kwargs):
+    if not action.startswith("post_"):
+        return
+    if not reverse:
+        bump(f"title:{instance.pk}")
+    elif pk_set:
+        bump(*(f"title:{pk}" for pk in pk_set))
+    else:
+        bump("titles")
+
+
+@receiver([post_save, post_delete], sender=Review)
+def invalidate_review_title(sender, instance, **kwargs):
+    bump(f"title:{instance.title_id}")
+
+
+@receiver(post_save, sender=User)
+def revoke_changed_claims(sender, instance, created, **kwargs):
+    claims = instance.get_claims()
+    if not created and getattr(instance, "_claims_snapshot", None) != claims:
+        authentication.revoke(instance.pk)
+    instance._claims_snapshot = claims
+
+
+@receiver(post_delete, sender=User)
+def revoke_deleted_user(sender, instance, **kwargs):
+    authentication.revoke(instance.pk)
@@ -0,0 +1,111 @@
+"""Process-local tables of the categories and genres by slug.
+
+Both tables are tiny and every title write and filtered title list
+resolves slugs in them. Each worker keeps them in memory, loaded at boot
+by the ``post_worker_init`` hook of gunicorn.conf.py, and reloads a
+table when the version token of its namespace in api/cache.py, bumped by
+api/signals.py when a change commits, is not the one it was loaded with.
+
+Without a shared cache a worker does not see the bumps of the others,
+so a table can lag behind for up to ``RESPONSE_CACHE_TIMEOUT`` seconds.
+A slug missing from the table is looked up in the database before it is
+reported as unknown, and writes load the rows they link to by id (see
+``TitleSerializer.validate``), so a lagging table never lets a deleted
+row through.
+"""
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from reviews.models import Category, Genre
+
+from .cache import get_tokens
+
+Entry = namedtuple("Entry", ("id", "slug", "name"))
+
+
+class SlugTable:
+    """``slug -> Entry(id, slug, name)`` of every row of ``model``."""
+
+    def __init__(self, model, namespace):
+        self.model = model
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._version = None
+        self._loaded_at = 0
+
+    def __deepcopy__(self, memo):
+        # One table per process, shared by the copies of filters.
+        return self
+
+    def is_fresh(self, version):
+        return version == self._version and (
+            time.monotonic() - self._loaded_at
+            < settings.RESPONSE_CACHE_TIMEOUT
+        )
+
+    def get_all(self):
+        version = get_tokens([self.namespace])[self.namespace]
+        if not self.is_fresh(version):
+            with self._lock:
+                if not self.is_fresh(version):
+                    # The token is read before the rows, a change made in
+                    # between is reloaded on the next call.
+                    self._entries = {
+                        row[1]: Entry(*row)
+                        for row in self.model.objects.values_list(
+                            "id", "slug", "name"
+                        )
+                    }
+                    self._version = version
+                    self._loaded_at = time.monotonic()
+        return self._entries
+
+    def get(self, slug):
+        entry = self.get_all().get(slug)
+        if entry is not None:
+            return entry
+        # Possibly added on a worker whose bump is not seen here yet.
+        return self.fetch(slug=slug).get(slug)
+
+    def fetch(self, **lookup):
+        """Entries of the rows matching ``lookup``, from the database.
+
+        A row the table does not know makes it reload on the next call.
+        """
+        entries = {
+            row[1]: Entry(*row)
+            for row in self.model.objects.filter(**lookup).values_list(
+                "id", "slug", "name"
+            )
+        }
+        if any(
+            self._entries.get(slug) != entry
+            for slug, entry in entries.items()
+        ):
+            self.expire()
+        return entries
+
+    def load(self, entries):
+        """The objects of ``entries`` that still exist, by id."""
+        objects = self.model.objects.in_bulk(
+            [entry.id for entry in entries]
+        )
+        if len(objects) < len({entry.id for entry in entries}):
+            self.expire()
+        return objects
+
+    def expire(self):
+        with self._lock:
+            self._version = None
+
+
+categories = SlugTable(Category, "categories")
+genres = SlugTable(Genre, "genres")
+
+
+def warm():
+    for table in (categories, genres):
+        table.get_all()
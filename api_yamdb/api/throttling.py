@@ -0,0 +1,240 @@
+"""Token bucket throttles with a pluggable bucket store.
+
+A rate ``N/period`` from ``DEFAULT_THROTTLE_RATES`` gives a bucket of N
+tokens refilled at N per period, so bursts of up to N requests pass and
+the sustained rate is capped. Every check is a single keyed read-modify-
+write in the store, never a database query. ``THROTTLE_STORE_URL`` picks
+the store:
+
+* empty: memory of the worker process, limits are per worker;
+* ``sqlite:///path/to/file``: a SQLite file shared by the workers of one
+  host, meant for local testing;
+* ``redis://host:port/db``: Redis (or a compatible server), shared by
+  every worker, the bucket update runs as a Lua script.
+
+Rejected requests get ``Retry-After`` through DRF's ``Throttled``.
+"""
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+
+def take(tokens, updated, capacity, rate, now):
+    """Refill a bucket and take a token from it.
+
+    Returns whether the request is allowed, the tokens left and the
+    seconds until the next token when it is not.
+    """
+    tokens = min(capacity, tokens + max(0.0, now - updated) * rate)
+    if tokens >= 1:
+        return True, tokens - 1, None
+    return False, tokens, (1 - tokens) / rate
+
+
+class LocalStore:
+    """Buckets in a dict of the current process, oldest evicted first."""
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self.buckets = OrderedDict()
+        self.lock = threading.Lock()
+
+    def consume(self, key, capacity, rate):
+        now = time.time()
+        with self.lock:
+            tokens, updated = self.buckets.pop(key, (capacity, now))
+            allowed, tokens, wait = take(tokens, updated, capacity, rate, now)
+            self.buckets[key] = (tokens, now)
+            if len(self.buckets) > self.max_entries:
+                self.buckets.popitem(last=False)
+        return allowed, wait
+
+    def clear(self):
+        with self.lock:
+            self.buckets.clear()
+
+
+class SQLiteStore:
+    """Buckets in a SQLite file, one autocommit connection per thread."""
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        self.connect().execute(
+            "CREATE TABLE IF NOT EXISTS bucket (key TEXT PRIMARY KEY, "
+            "tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+
+    def connect(self):
+        db = getattr(self.local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            self.local.db = db
+        return db
+
+    def consume(self, key, capacity, rate):
+        db = self.connect()
+        now = time.time()
+        # BEGIN IMMEDIATE takes the write lock before the read, so the
+        # read-modify-write is atomic between processes.
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            row = db.execute(
+                "SELECT tokens, updated FROM bucket WHERE key = ?", (key,)
+            ).fetchone()
+            tokens, updated = row or (capacity, now)
+            allowed, tokens, wait = take(tokens, updated, capacity, rate, now)
+            db.execute(
+                "INSERT OR REPLACE INTO bucket (key, tokens, updated) "
+                "VALUES (?, ?, ?)",
+                (key, tokens, now),
+            )
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+        return allowed, wait
+
+    def clear(self):
+        self.connect().execute("DELETE FROM bucket")
+
+
+class RedisStore:
+    """Buckets in Redis hashes that expire once they would be full."""
+
+    script = """
+        local capacity = tonumber(ARGV[1])
+        local rate = tonumber(ARGV[2])
+        local now = tonumber(ARGV[3])
+        local bucket = redis.call("HMGET", KEYS[1], "tokens", "updated")
+        local tokens = tonumber(bucket[1]) or capacity
+        local updated = tonumber(bucket[2]) or now
+        tokens = math.min(
+            capacity, tokens + math.max(0, now - updated) * rate
+        )
+        local allowed = 0
+        if tokens >= 1 then
+            tokens = tokens - 1
+            allowed = 1
+        end
+        redis.call("HMSET", KEYS[1], "tokens", tokens, "updated", now)
+        redis.call("EXPIRE", KEYS[1], math.ceil(capacity / rate))
+        return {allowed, tostring(tokens)}
+    """
+
+    def __init__(self, url):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.consume_script = self.client.register_script(self.script)
+
+    def consume(self, key, capacity, rate):
+        allowed, tokens = self.consume_script(
+            keys=[f"throttle:{key}"], args=[capacity, rate, time.time()]
+        )
+        if allowed:
+            return True, None
+        return False, (1 - float(tokens)) / rate
+
+    def clear(self):
+        keys = list(self.client.scan_iter("throttle:*"))
+        if keys:
+            self.client.delete(*keys)
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store():
+    url = settings.THROTTLE_STORE_URL
+    with _stores_lock:
+        if url not in _stores:
+            if url.startswith("redis://"):
+                _stores[url] = RedisStore(url)
+            elif url.startswith("sqlite://"):
+                _stores[url] = SQLiteStore(url[len("sqlite://"):])
+            else:
+                _stores[url] = LocalStore()
+        return _stores[url]
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """Base class, subclasses define ``scope`` and ``get_cache_key``."""
+
+    def get_rate(self):
+        # Read the rates on every request instead of once at import.
+        return api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return True
+        allowed, self.retry_after = get_store().consume(
+            key, self.num_requests, self.num_requests / self.duration
+        )
+        return allowed
+
+    def wait(self):
+        return math.ceil(self.retry_after) if self.retry_after else None
+
+    def get_user_ident(self, request):
+        if request.user and request.user.is_authenticated:
+            return f"user-{request.user.pk}"
+        return self.get_ident(request)
+
+
+class AnonTokenBucketThrottle(TokenBucketThrottle):
+    """``anon`` rate per client IP for unauthenticated requests."""
+
+    scope = "anon"
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return None
+        return self.cache_format % {
+            "scope": self.scope,
+            "ident": self.get_ident(request),
+        }
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle):
+    """``user`` rate per authenticated user."""
+
+    scope = "user"
+
+    def get_cache_key(self, request, view):
+        if not (request.user and request.user.is_authenticated):
+            return None
+        return self.cache_format % {
+            "scope": self.scope,
+            "ident": self.get_user_ident(request),
+        }
+
+
+class ScopedTokenBucketThrottle(TokenBucketThrottle):
+    """Rate of the view's ``throttle_scope`` per user or client IP."""
+
+    def allow_request(self, request, view):
+        self.scope = getattr(view, "throttle_scope", None)
+        if not self.scope:
+            return True
+        self.rate = self.get_rate()
+        if self.rate is None:
+            return True
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        return super().allow_request(request, view)
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {
+            "scope": self.scope,
+            "ident": self.get_user_ident(request),
+        }
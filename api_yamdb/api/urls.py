@@ -1,9 +1,10 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
+from .export import ExportView
 from .views import (CategoryViewSet, CommentsViewSet, GenreViewSet,
-                    ReviewsViewSet, SignUpViewSet, TitleViewSet, TokenView,
-                    UserViewset)
+                    ReviewsViewSet, SearchViewSet, SignUpViewSet, TitleViewSet,
+                    TokenView, UserViewset)
 
 router_v1 = DefaultRouter()
 router_v1.register(r"auth/signup", SignUpViewSet, "signup")
@@ -11,6 +12,7 @@ router_v1.register(r"users", UserViewset, "users")
 router_v1.register(r"categories", CategoryViewSet, basename="categories")
 router_v1.register(r"genres", GenreViewSet, basename="genres")
 router_v1.register(r"titles", TitleViewSet, basename="titles")
+router_v1.register(r"search", SearchViewSet, basename="search")
 router_v1.register(
     r"titles/(?P<title_id>\d+)/reviews", ReviewsViewSet, basename="review"
 )
@@ -22,5 +24,10 @@ router_v1.register(
 
 urlpatterns = [
     path("v1/auth/token/", TokenView.as_view()),
+    path(
+        "v1/export/<str:resource>.ndjson",
+        ExportView.as_view(),
+        name="export",
+    ),
     path("v1/", include(router_v1.urls)),
 ]
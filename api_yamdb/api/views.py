@@ -1,21 +1,35 @@
-from django.contrib.auth.tokens import default_token_generator
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Prefetch, Q
 from django.shortcuts import get_object_or_404
 from django_filters import rest_framework as filter
+from jobs.tasks import enqueue
 from rest_framework import (filters, mixins, permissions, serializers, status,
                             viewsets)
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.response import Response
 from rest_framework_simplejwt.views import TokenViewBase
-from reviews.models import Category, Genre, Review, Title
+from reviews.models import Category, Comment, Genre, Review, Title
+from users.confirmation import make_confirmation_code
 from users.models import User
 
+from .bulk import write_titles
+from .cache import CachedResponseMixin, get_tokens
+from .conditional import ConditionalGetMixin
 from .filters import FilterTitle
+from .pagination import KeysetPagination, SearchPagination
 from .permissions import (IsAdminOrSuperuser, IsAdminOrSuperuserOrReadOnly,
                           IsAuthorOrStaffOrReadOnly)
+from .rows import RowSerializer, RowSerializerMixin, TitleRowSerializer
+from .search import search
 from .serializers import (CategorySerializer, CommentSerializer,
-                          GenreSerializer, ReviewSerializer, SignUpSerializer,
-                          TitleSerializer, TokenSerializer,
-                          UserForMeSerializer, UserSerializer)
+                          GenreSerializer, ReviewSearchSerializer,
+                          ReviewSerializer, SignUpSerializer,
+                          TitleSearchSerializer, TitleSerializer,
+                          TokenSerializer, UserForMeSerializer, UserSerializer)
+
+# Genres of a title in a stable order, the same as in api/rows.py.
+GENRES_BY_ID = Prefetch("genre", queryset=Genre.objects.order_by("id"))
 
 
 class CrLstDstViewSet(
@@ -27,7 +41,45 @@ class CrLstDstViewSet(
     pass
 
 
-class CategoryViewSet(CrLstDstViewSet):
+class NestedResourceMixin:
+    """Nested views filtered by the parent ids from the URL.
+
+    The querysets filter on the ids directly instead of loading the
+    parents first; ``get_parent_queryset`` is only queried when a list
+    comes out empty, to answer 404 for a missing parent, and before a
+    create. ``parent_lookup`` maps the fields of ``parent_model`` to the
+    URL kwargs they are matched with.
+    """
+
+    parent_model = None
+    parent_lookup = {}
+
+    def get_parent_queryset(self):
+        return self.parent_model.objects.filter(
+            **{
+                field: self.kwargs.get(kwarg)
+                for field, kwarg in self.parent_lookup.items()
+            }
+        )
+
+    def check_parent(self):
+        # PostgreSQL checks the foreign keys only at the commit, too late
+        # for a 404.
+        if not self.get_parent_queryset().exists():
+            raise NotFound
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        results = response.data
+        if isinstance(results, dict):
+            results = results.get("results")
+        if not results:
+            self.check_parent()
+        return response
+
+
+class CategoryViewSet(CachedResponseMixin, CrLstDstViewSet):
+    cache_namespaces = ("categories",)
     queryset = Category.objects.order_by("id")
     serializer_class = CategorySerializer
     lookup_field = "slug"
@@ -38,7 +90,8 @@ class CategoryViewSet(CrLstDstViewSet):
     search_fields = ("name",)
 
 
-class GenreViewSet(CrLstDstViewSet):
+class GenreViewSet(CachedResponseMixin, CrLstDstViewSet):
+    cache_namespaces = ("genres",)
     queryset = Genre.objects.order_by("id")
     serializer_class = GenreSerializer
     lookup_field = "slug"
@@ -49,80 +102,267 @@ class GenreViewSet(CrLstDstViewSet):
     search_fields = ("name",)
 
 
-class TitleViewSet(viewsets.ModelViewSet):
-    queryset = Title.objects.order_by("id")
+class TitleViewSet(
+    ConditionalGetMixin,
+    CachedResponseMixin,
+    RowSerializerMixin,
+    viewsets.ModelViewSet,
+):
+    cache_namespaces = ("titles", "categories", "genres")
+    cache_retrieve_namespaces = ("categories", "genres")
+    queryset = (
+        Title.objects.select_related("category")
+        .prefetch_related(GENRES_BY_ID)
+        .with_rating()
+        .order_by("id")
+    )
     serializer_class = TitleSerializer
+    row_serializer = TitleRowSerializer(TitleSerializer)
     permission_classes = [
         IsAdminOrSuperuserOrReadOnly,
     ]
-    filter_backends = (filter.DjangoFilterBackend,)
+    filter_backends = (filter.DjangoFilterBackend, filters.OrderingFilter)
     filterset_class = FilterTitle
+    ordering_fields = ("name", "year", "rating")
 
+    def get_cache_dependencies(self, data):
+        titles = data["results"] if "results" in data else [data]
+        if any("id" not in title for title in titles):
+            # ?fields= without the id, the entry could not be invalidated
+            # per title.
+            return None
+        return [f"title:{title['id']}" for title in titles]
 
-class ReviewsViewSet(viewsets.ModelViewSet):
+    def get_validators(self):
+        # Title.modified moves on every edit, rating and genre change, and
+        # when its category or a genre is deleted; renames move the
+        # modified of the category or genre.
+        if self.action == "retrieve":
+            row = (
+                Title.objects.filter(pk=self.kwargs["pk"])
+                .annotate(genres_modified=Max("genre__modified"))
+                .values_list(
+                    "modified", "category__modified", "genres_modified"
+                )
+                .first()
+            )
+            if row is None:
+                return None
+            return row, max(value for value in row if value is not None)
+        # Lists of any filter change with the namespace tokens, bumped by
+        # category and genre changes, or with a title change, which moves
+        # the count or the latest modified of the whole table. A deleted
+        # title does not move any timestamp, so lists get an ETag but no
+        # Last-Modified.
+        tokens = get_tokens(self.cache_namespaces)
+        aggregate = Title.objects.order_by().aggregate(
+            count=Count("id"), modified=Max("modified")
+        )
+        return (sorted(tokens.items()), sorted(aggregate.items())), None
+
+    @action(detail=False, methods=["post", "patch"])
+    def bulk(self, request):
+        partial = request.method == "PATCH"
+        ids = write_titles(request.data, partial=partial)
+        rows = self.row_serializer.get_values(
+            Title.objects.filter(pk__in=ids)
+        )
+        titles = {
+            title["id"]: title
+            for title in self.row_serializer.to_representation(rows)
+        }
+        return Response(
+            [titles[pk] for pk in ids],
+            status=status.HTTP_200_OK if partial else status.HTTP_201_CREATED,
+        )
+
+
+class ReviewsViewSet(
+    ConditionalGetMixin,
+    NestedResourceMixin,
+    RowSerializerMixin,
+    viewsets.ModelViewSet,
+):
     serializer_class = ReviewSerializer
+    row_serializer = RowSerializer(ReviewSerializer)
     permission_classes = (IsAuthorOrStaffOrReadOnly,)
+    pagination_class = KeysetPagination
+    parent_model = Title
+    parent_lookup = {"pk": "title_id"}
+
+    def get_validators(self):
+        if self.action == "retrieve":
+            rows = Review.objects.filter(
+                pk=self.kwargs["pk"], title_id=self.kwargs.get("title_id")
+            )
+        else:
+            # Title.modified moves on every review insert, edit and
+            # delete, see reviews/signals.py.
+            rows = self.get_parent_queryset()
+        modified = rows.values_list("modified", flat=True).first()
+        return None if modified is None else (modified, modified)
 
     def get_queryset(self):
-        title_id = self.kwargs.get("title_id")
-        title = get_object_or_404(Title, pk=title_id)
-        return title.reviews.order_by("-pub_date")
+        return (
+            Review.objects.filter(title_id=self.kwargs.get("title_id"))
+            .select_related("author")
+            .order_by("-pub_date", "-id")
+        )
 
     def perform_create(self, serializer):
-        title = get_object_or_404(Title, pk=self.kwargs.get("title_id"))
-        if title.reviews.filter(author=self.request.user).exists():
+        self.check_parent()
+        # The unique_review constraint catches a second review.
+        try:
+            with transaction.atomic():
+                serializer.save(
+                    author_id=self.request.user.id,
+                    title_id=self.kwargs.get("title_id"),
+                )
+        except IntegrityError:
             raise serializers.ValidationError(
                 "Можно оставить только один отзыв!"
             )
-        serializer.save(author=self.request.user, title=title)
 
 
-class CommentsViewSet(viewsets.ModelViewSet):
+class CommentsViewSet(
+    ConditionalGetMixin,
+    NestedResourceMixin,
+    RowSerializerMixin,
+    viewsets.ModelViewSet,
+):
     serializer_class = CommentSerializer
+    row_serializer = RowSerializer(CommentSerializer)
     permission_classes = (IsAuthorOrStaffOrReadOnly,)
+    pagination_class = KeysetPagination
+    parent_model = Review
+    parent_lookup = {"pk": "review_id", "title_id": "title_id"}
+
+    def get_validators(self):
+        if self.action == "retrieve":
+            rows = Comment.objects.filter(
+                pk=self.kwargs["pk"],
+                review_id=self.kwargs.get("review_id"),
+                review__title_id=self.kwargs.get("title_id"),
+            )
+        else:
+            # Review.modified moves on every comment insert, edit and
+            # delete, see reviews/signals.py.
+            rows = self.get_parent_queryset()
+        modified = rows.values_list("modified", flat=True).first()
+        return None if modified is None else (modified, modified)
 
     def get_queryset(self):
-        review_id = self.kwargs.get("review_id")
-        review = get_object_or_404(Review, pk=review_id)
-        return review.comments.order_by("-pub_date")
+        return (
+            Comment.objects.filter(
+                review_id=self.kwargs.get("review_id"),
+                review__title_id=self.kwargs.get("title_id"),
+            )
+            .select_related("author")
+            .order_by("-pub_date", "-id")
+        )
 
     def perform_create(self, serializer):
-        review_id = self.kwargs.get("review_id")
-        review = get_object_or_404(Review, pk=review_id)
-        serializer.save(author=self.request.user, review=review)
+        self.check_parent()
+        serializer.save(
+            author_id=self.request.user.id,
+            review_id=self.kwargs.get("review_id"),
+        )
+
+
+class SearchViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+    """Ranked full-text search: ``?q=<words>&type=titles|reviews``."""
+
+    permission_classes = (permissions.AllowAny,)
+    pagination_class = SearchPagination
+    search_types = {
+        "titles": (
+            Title.objects.select_related("category").prefetch_related(
+                GENRES_BY_ID
+            ),
+            TitleSearchSerializer,
+        ),
+        "reviews": (
+            Review.objects.select_related("author"),
+            ReviewSearchSerializer,
+        ),
+    }
+
+    def get_search_type(self):
+        search_type = self.request.query_params.get("type", "titles")
+        if search_type not in self.search_types:
+            raise ValidationError({"type": "Можно искать titles или reviews."})
+        return self.search_types[search_type]
+
+    def get_queryset(self):
+        query = self.request.query_params.get("q", "").strip()
+        if not query:
+            raise ValidationError({"q": "Укажите строку поиска."})
+        queryset, _ = self.get_search_type()
+        return search(queryset.all(), query)
+
+    def get_serializer_class(self):
+        _, serializer_class = self.get_search_type()
+        return serializer_class
 
 
 class SignUpViewSet(mixins.CreateModelMixin, viewsets.GenericViewSet):
     permission_classes = (permissions.AllowAny,)
+    throttle_scope = "signup"
     queryset = User.objects.all()
     serializer_class = SignUpSerializer
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        User.objects.get_or_create(**serializer.data)
-        user = User.objects.get(
-            username=serializer.initial_data.get("username")
-        )
-        user.confirmation_code = default_token_generator.make_token(user)
-        user.email_user(
-            "Welcome!",
-            f"Your confirmation code: {user.confirmation_code}",
+        try:
+            with transaction.atomic():
+                user = User.objects.create(**serializer.validated_data)
+        except IntegrityError:
+            user = self.get_existing_user(**serializer.validated_data)
+        enqueue(
+            "send_mail",
+            subject="Welcome!",
+            message=f"Your confirmation code: {make_confirmation_code(user)}",
+            recipient_list=[user.email],
         )
         headers = self.get_success_headers(serializer.data)
         return Response(
             serializer.data, status=status.HTTP_200_OK, headers=headers
         )
 
+    def get_existing_user(self, username, email):
+        """The user signing up again, with a new code replacing old ones.
+
+        A username or email that belongs to someone else is a 400.
+        """
+        users = User.objects.filter(
+            Q(username=username) | Q(email=email)
+        ).only("id", "username", "email", "confirmation_version")
+        errors = {}
+        for user in users:
+            if user.username == username and user.email == email:
+                User.objects.filter(pk=user.pk).update(
+                    confirmation_version=F("confirmation_version") + 1
+                )
+                user.confirmation_version += 1
+                return user
+            if user.username == username:
+                errors["username"] = ["Этот username уже занят."]
+            if user.email == email:
+                errors["email"] = ["Этот email уже занят."]
+        raise ValidationError(errors)
+
 
 class TokenView(TokenViewBase):
     permission_classes = (permissions.AllowAny,)
+    throttle_scope = "token"
     serializer_class = TokenSerializer
 
 
-class UserViewset(viewsets.ModelViewSet):
+class UserViewset(RowSerializerMixin, viewsets.ModelViewSet):
     queryset = User.objects.all().order_by("id")
     serializer_class = UserSerializer
+    row_serializer = RowSerializer(UserSerializer)
     permission_classes = (IsAdminOrSuperuser,)
     lookup_field = "username"
     filter_backends = (filters.SearchFilter,)
@@ -134,7 +374,7 @@ class UserViewset(viewsets.ModelViewSet):
         permission_classes=(permissions.IsAuthenticated,),
     )
     def me(self, request):
-        user = self.request.user
+        user = get_object_or_404(User, pk=request.user.pk)
         if request.method == "GET":
             serializer = UserForMeSerializer(user)
             return Response(serializer.data)
@@ -0,0 +1,41 @@
+"""
+ASGI config for YaMDb project.
+
+Django 2.2 has neither an ASGI handler nor an async ORM, so the WSGI
+application is served through asgiref's ``WsgiToAsgi``. The ASGI server
+handles connections, keep-alive and slow clients on its event loop, and
+a request takes a thread from the adapter's pool only once its body has
+been read. Views, and so responses, are the same as under WSGI.
+
+    gunicorn api_yamdb.asgi:application -c gunicorn.conf.py \\
+        -k uvicorn.workers.UvicornWorker
+
+The adapter of asgiref 3.2 never calls ``close()`` on the response, so
+Django would not send ``request_finished`` and the connections of the
+threads would never go back to the pool of DB_POOL_SIZE. ``closing``
+calls it once the body has been sent, in the thread that ran the view.
+"""
+
+import os
+
+from asgiref.wsgi import WsgiToAsgi
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "api_yamdb.settings")
+
+
+def closing(wsgi_application):
+    """``wsgi_application`` whose responses are closed after sending."""
+
+    def application(environ, start_response):
+        response = wsgi_application(environ, start_response)
+        try:
+            yield from response
+        finally:
+            if hasattr(response, "close"):
+                response.close()
+
+    return application
+
+
+application = WsgiToAsgi(closing(get_wsgi_application()))
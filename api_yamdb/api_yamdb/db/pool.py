@@ -0,0 +1,154 @@
+"""Process-wide pool of raw database connections.
+
+Used by the ``api_yamdb.db.postgresql`` backend when the database
+settings have a ``POOL`` entry: every thread of a worker takes a
+connection when Django connects and gives it back when Django closes it
+at the end of the request.
+"""
+import queue
+import threading
+import time
+
+# Idle connections older than this are pinged before they are handed out.
+CHECK_AFTER = 30
+
+
+class PoolTimeoutError(Exception):
+    pass
+
+
+class ConnectionPool:
+    """At most ``size`` connections, reused newest first.
+
+    ``max_age`` limits the lifetime of a connection in seconds and
+    ``timeout`` how long ``get`` waits for a free slot.
+    """
+
+    def __init__(self, size, max_age=600, timeout=5.0):
+        self.size = size
+        self.max_age = max_age
+        self.timeout = timeout
+        self.idle = queue.LifoQueue()
+        self.slots = threading.BoundedSemaphore(size)
+        self.lock = threading.Lock()
+        # id(connection) -> creation time of the connections in use.
+        self.in_use = {}
+        self.counters = {
+            "checkouts": 0,
+            "connects": 0,
+            "discards": 0,
+            "timeouts": 0,
+            "wait_seconds": 0.0,
+        }
+
+    def count(self, name, value=1):
+        with self.lock:
+            self.counters[name] += value
+
+    def get(self, connect, check=None):
+        """Take an idle connection or open one with ``connect()``.
+
+        ``check(connection)`` tells whether a connection that sat idle for
+        a while still works.
+        """
+        started = time.monotonic()
+        if not self.slots.acquire(timeout=self.timeout):
+            self.count("timeouts")
+            raise PoolTimeoutError(
+                f"No database connection available after {self.timeout}s"
+            )
+        self.count("wait_seconds", time.monotonic() - started)
+        try:
+            connection, created = self.take_idle(check)
+            if connection is None:
+                connection, created = connect(), time.monotonic()
+                self.count("connects")
+        except BaseException:
+            self.slots.release()
+            raise
+        with self.lock:
+            self.in_use[id(connection)] = created
+            self.counters["checkouts"] += 1
+        return connection
+
+    def take_idle(self, check):
+        now = time.monotonic()
+        while True:
+            try:
+                connection, created, released = self.idle.get_nowait()
+            except queue.Empty:
+                return None, None
+            if now - created >= self.max_age or (
+                check is not None
+                and now - released >= CHECK_AFTER
+                and not check(connection)
+            ):
+                self.close(connection)
+                continue
+            return connection, created
+
+    def put(self, connection):
+        with self.lock:
+            created = self.in_use.pop(id(connection))
+        try:
+            if time.monotonic() - created >= self.max_age:
+                self.close(connection)
+            else:
+                self.idle.put((connection, created, time.monotonic()))
+        finally:
+            self.slots.release()
+
+    def discard(self, connection):
+        with self.lock:
+            self.in_use.pop(id(connection), None)
+        try:
+            self.close(connection)
+        finally:
+            self.slots.release()
+
+    def close(self, connection):
+        self.count("discards")
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def stats(self):
+        with self.lock:
+            return {
+                "size": self.size,
+                "in_use": len(self.in_use),
+                "idle": self.idle.qsize(),
+                **self.counters,
+            }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, database, options):
+    """The pool of connections to ``database`` for the ``alias`` settings.
+
+    The database name is part of the key because the test runner renames
+    the database of a connection alias.
+    """
+    with _pools_lock:
+        key = (alias, database)
+        if key not in _pools:
+            _pools[key] = ConnectionPool(
+                options["SIZE"],
+                max_age=options.get("MAX_AGE", 600),
+                timeout=options.get("TIMEOUT", 5.0),
+            )
+        return _pools[key]
+
+
+def pool_stats():
+    """Statistics of every pool of the process."""
+    with _pools_lock:
+        pools = dict(_pools)
+    return [
+        {"alias": alias, "database": database, **pool.stats()}
+        for (alias, database), pool in pools.items()
+    ]
@@ -0,0 +1,81 @@
+"""PostgreSQL backend with connection health checks and an optional pool.
+
+Persistent connections (``CONN_MAX_AGE`` > 0) are pinged on their first
+use in each request, so a connection dropped by the server or a proxy is
+replaced instead of failing the request. With ``POOL`` in the database
+settings the threads of a worker share a ``ConnectionPool``: connecting
+takes a connection from it and closing at the end of the request gives
+it back.
+"""
+from django.db.backends.postgresql import base
+from psycopg2 import extensions
+
+from ..pool import PoolTimeoutError, get_pool
+
+Database = base.Database
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.health_check_pending = False
+        # The pool the current connection was taken from.
+        self.pool = None
+
+    def get_new_connection(self, conn_params):
+        options = self.settings_dict.get("POOL")
+        if not options:
+            return super().get_new_connection(conn_params)
+        pool = get_pool(self.alias, self.settings_dict["NAME"], options)
+        try:
+            connection = pool.get(
+                lambda: super(DatabaseWrapper, self).get_new_connection(
+                    conn_params
+                ),
+                check=self.ping,
+            )
+        except PoolTimeoutError as error:
+            raise Database.OperationalError(str(error)) from error
+        self.pool = pool
+        return connection
+
+    def _close(self):
+        if self.pool is None:
+            return super()._close()
+        connection, pool, self.pool = self.connection, self.pool, None
+        try:
+            status = connection.get_transaction_status()
+            if status != extensions.TRANSACTION_STATUS_IDLE:
+                connection.rollback()
+        except Database.Error:
+            pool.discard(connection)
+        else:
+            pool.put(connection)
+
+    def close_if_unusable_or_obsolete(self):
+        super().close_if_unusable_or_obsolete()
+        # Called when a request starts and ends, the connection kept for
+        # the next request is checked when that request first uses it.
+        self.health_check_pending = self.connection is not None
+
+    def ensure_connection(self):
+        if self.health_check_pending:
+            self.health_check_pending = False
+            if (
+                self.connection is not None
+                and not self.in_atomic_block
+                and not self.is_usable()
+            ):
+                self.close()
+        super().ensure_connection()
+
+    @staticmethod
+    def ping(connection):
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            if not connection.autocommit:
+                connection.rollback()
+        except Database.Error:
+            return False
+        return True
@@ -0,0 +1,384 @@
+"""Per-request timings: a Server-Timing header and Prometheus metrics.
+
+``PerformanceMiddleware`` counts the SQL queries of a request and their
+time, the time spent in serializers (see ``Timer``) and the time of the
+whole view. It sends them back in a ``Server-Timing`` header and adds
+them to per-route histograms, which ``metrics_view`` exports in the
+Prometheus text format.
+
+Every process keeps its metrics in memory. With ``METRICS_DIR`` set (as
+gunicorn.conf.py does) a process also writes them to ``<pid>.json`` in
+that directory. It writes at most once per ``METRICS_FLUSH_INTERVAL``
+seconds, and the endpoint adds up the files of all workers, so any
+worker can answer a scrape. When a worker exits its file is merged into
+``archive.json`` so the counters never go back.
+
+The endpoint answers only the networks of ``METRICS_ALLOWED_NETWORKS``
+and, with ``METRICS_TOKEN`` set, requests bearing that token. The
+``Server-Timing`` header, enabled with ``SERVER_TIMING``, goes only to
+the same clients.
+"""
+import fcntl
+import glob
+import hmac
+import ipaddress
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+
+from .db.pool import pool_stats
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ARCHIVE = "archive.json"
+
+# name: (type, help)
+METRICS = {
+    "yamdb_request_duration_seconds": (
+        "histogram", "Time of the view, by route and method.",
+    ),
+    "yamdb_responses_total": ("counter", "Responses by route and status."),
+    "yamdb_db_queries_total": ("counter", "SQL queries by route."),
+    "yamdb_db_duration_seconds_total": ("counter", "SQL time by route."),
+    "yamdb_serializer_duration_seconds_total": (
+        "counter", "Serializer time by route.",
+    ),
+    "yamdb_db_pool_checkouts_total": (
+        "counter", "Connections taken from the pool.",
+    ),
+    "yamdb_db_pool_connects_total": (
+        "counter", "Connections opened by the pool.",
+    ),
+    "yamdb_db_pool_timeouts_total": (
+        "counter", "Requests that found no free connection.",
+    ),
+    "yamdb_db_pool_wait_seconds_total": (
+        "counter", "Time spent waiting for a connection.",
+    ),
+    "yamdb_db_pool_connections": (
+        "gauge", "Pooled connections by state, per worker.",
+    ),
+}
+
+_local = threading.local()
+
+
+class Timer:
+    """Adds the time spent in the block to the current request.
+
+    Nested timers of the same name count once, so a serializer nested in
+    another one is not added twice. Outside a request it does nothing.
+    """
+
+    __slots__ = ("name", "started")
+
+    def __init__(self, name):
+        self.name = name
+        self.started = None
+
+    def __enter__(self):
+        timings = getattr(_local, "timings", None)
+        if timings is not None and self.name not in _local.running:
+            _local.running.add(self.name)
+            self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        if self.started is not None:
+            timings = _local.timings
+            timings[self.name] = (
+                timings.get(self.name, 0.0)
+                + time.perf_counter() - self.started
+            )
+            _local.running.discard(self.name)
+
+
+class Registry:
+    """Histograms and counters of the process, keyed by name and labels.
+
+    A histogram is a list of per-bucket counts, the last bucket being
+    +Inf, followed by the sum of the observed values.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+        self.last_flush = 0.0
+
+    def observe(self, name, labels, value):
+        key = (name, labels)
+        with self.lock:
+            series = self.histograms.get(key)
+            if series is None:
+                series = self.histograms[key] = [0] * (len(BUCKETS) + 2)
+            series[bisect_left(BUCKETS, value)] += 1
+            series[-1] += value
+
+    def inc(self, name, labels, value=1):
+        key = (name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def snapshot(self):
+        """The metrics as JSON-ready data, the pool statistics included."""
+        with self.lock:
+            data = {
+                "histograms": [
+                    [name, labels, list(series)]
+                    for (name, labels), series in self.histograms.items()
+                ],
+                "counters": [
+                    [name, labels, value]
+                    for (name, labels), value in self.counters.items()
+                ],
+                "gauges": [],
+            }
+        pid = str(os.getpid())
+        for stats in pool_stats():
+            labels = (("alias", stats["alias"]),)
+            for counter in ("checkouts", "connects", "timeouts"):
+                data["counters"].append([
+                    f"yamdb_db_pool_{counter}_total", labels, stats[counter]
+                ])
+            data["counters"].append([
+                "yamdb_db_pool_wait_seconds_total",
+                labels,
+                stats["wait_seconds"],
+            ])
+            for state in ("in_use", "idle"):
+                data["gauges"].append([
+                    "yamdb_db_pool_connections",
+                    labels + (("state", state), ("pid", pid)),
+                    stats[state],
+                ])
+        return data
+
+    def flush(self, directory, force=False):
+        """Write the metrics of the process to ``directory``."""
+        now = time.monotonic()
+        with self.lock:
+            if not force and (
+                now - self.last_flush < settings.METRICS_FLUSH_INTERVAL
+            ):
+                return
+            self.last_flush = now
+        write_json(
+            os.path.join(directory, f"{os.getpid()}.json"), self.snapshot()
+        )
+
+
+registry = Registry()
+
+
+def write_json(path, data):
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def read_json(path):
+    try:
+        with open(path, encoding="utf8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def merge(total, data, gauges=True):
+    """Add ``data`` (a snapshot) to ``total``, a dict keyed by series."""
+    for name, labels, series in data["histograms"]:
+        key = (name, tuple(map(tuple, labels)))
+        current = total.setdefault(key, [0] * len(series))
+        for i, value in enumerate(series):
+            current[i] += value
+    kinds = ("counters", "gauges") if gauges else ("counters",)
+    for kind in kinds:
+        for name, labels, value in data[kind]:
+            key = (name, tuple(map(tuple, labels)))
+            total[key] = total.get(key, 0) + value
+
+
+def collect():
+    """Metrics of this process plus those of the other workers."""
+    total = {}
+    directory = settings.METRICS_DIR
+    if directory:
+        own = os.path.join(directory, f"{os.getpid()}.json")
+        for path in glob.glob(os.path.join(directory, "*.json")):
+            if path == own:
+                continue
+            data = read_json(path)
+            if data is not None:
+                merge(total, data, gauges=not path.endswith(ARCHIVE))
+    merge(total, registry.snapshot())
+    return total
+
+
+def mark_process_dead(directory, pid):
+    """Move the counters of an exited worker into the archive file."""
+    path = os.path.join(directory, f"{pid}.json")
+    data = read_json(path)
+    if data is None:
+        return
+    with open(os.path.join(directory, "archive.lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        archive_path = os.path.join(directory, ARCHIVE)
+        archived = {}
+        for source in (read_json(archive_path), data):
+            if source is not None:
+                merge(archived, source, gauges=False)
+        write_json(archive_path, {
+            "histograms": [
+                [name, labels, series]
+                for (name, labels), series in archived.items()
+                if isinstance(series, list)
+            ],
+            "counters": [
+                [name, labels, value]
+                for (name, labels), value in archived.items()
+                if not isinstance(value, list)
+            ],
+            "gauges": [],
+        })
+        os.remove(path)
+
+
+def format_labels(labels):
+    return ",".join(
+        '{}="{}"'.format(
+            name,
+            str(value).replace("\\", "\\\\").replace('"', '\\"'),
+        )
+        for name, value in labels
+    )
+
+
+def render(total):
+    """``collect()`` output in the Prometheus text exposition format."""
+    lines = []
+    for metric, (kind, help_text) in METRICS.items():
+        series = sorted(
+            (labels, value)
+            for (name, labels), value in total.items()
+            if name == metric
+        )
+        if not series:
+            continue
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} {kind}")
+        for labels, value in series:
+            if kind != "histogram":
+                lines.append(f"{metric}{{{format_labels(labels)}}} {value}")
+                continue
+            cumulative = 0
+            bounds = [str(bound) for bound in BUCKETS] + ["+Inf"]
+            for bound, count in zip(bounds, value):
+                cumulative += count
+                bucket_labels = format_labels(labels + (("le", bound),))
+                lines.append(
+                    f"{metric}_bucket{{{bucket_labels}}} {cumulative}"
+                )
+            labels = format_labels(labels)
+            lines.append(f"{metric}_sum{{{labels}}} {value[-1]}")
+            lines.append(f"{metric}_count{{{labels}}} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+def is_allowed(request):
+    try:
+        address = ipaddress.ip_address(request.META.get("REMOTE_ADDR", ""))
+    except ValueError:
+        return False
+    if not any(
+        address in ipaddress.ip_network(network.strip())
+        for network in settings.METRICS_ALLOWED_NETWORKS
+        if network.strip()
+    ):
+        return False
+    if not settings.METRICS_TOKEN:
+        return True
+    return hmac.compare_digest(
+        request.META.get("HTTP_AUTHORIZATION", "").encode(),
+        f"Bearer {settings.METRICS_TOKEN}".encode(),
+    )
+
+
+def metrics_view(request):
+    if not is_allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        render(collect()), content_type="text/plain; version=0.0.4"
+    )
+
+
+class PerformanceMiddleware:
+    """Times every request, see the module docstring.
+
+    Goes first in ``MIDDLEWARE`` so the view time covers the other
+    middleware too.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # Number and time of the SQL queries, for every connection.
+        queries = [0, 0.0]
+
+        def count_query(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                queries[0] += 1
+                queries[1] += time.perf_counter() - started
+
+        outer = (
+            getattr(_local, "timings", None), getattr(_local, "running", None)
+        )
+        _local.timings, _local.running = {}, set()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(count_query)
+                    )
+                response = self.get_response(request)
+            elapsed = time.perf_counter() - started
+            serializer_time = _local.timings.get("serializer", 0.0)
+        finally:
+            _local.timings, _local.running = outer
+        match = request.resolver_match
+        route = match.view_name if match else "unmatched"
+        labels = (("route", route),)
+        registry.observe(
+            "yamdb_request_duration_seconds",
+            labels + (("method", request.method),),
+            elapsed,
+        )
+        registry.inc(
+            "yamdb_responses_total",
+            labels + (("status", str(response.status_code)),),
+        )
+        registry.inc("yamdb_db_queries_total", labels, queries[0])
+        registry.inc("yamdb_db_duration_seconds_total", labels, queries[1])
+        registry.inc(
+            "yamdb_serializer_duration_seconds_total", labels, serializer_time
+        )
+        if settings.METRICS_DIR:
+            registry.flush(settings.METRICS_DIR)
+        if settings.SERVER_TIMING and is_allowed(request):
+            response["Server-Timing"] = (
+                f'db;dur={queries[1] * 1000:.1f};desc="{queries[0]} queries",'
+                f" serializer;dur={serializer_time * 1000:.1f},"
+                f" view;dur={elapsed * 1000:.1f}"
+            )
+        return response
@@ -0,0 +1,127 @@
+"""Development and test checks of the SQL a request runs.
+
+With ``QUERY_INSPECTOR`` set to "log" or "raise",
+``QueryInspectorMiddleware`` fingerprints every statement of a request:
+the SQL with its literals, placeholders and IN lists collapsed. A
+fingerprint seen more than ``QUERY_REPEAT_LIMIT`` times is the usual
+sign of a query issued per row (N+1) and is reported with the Python
+stack that ran it.
+
+``QUERY_BUDGETS`` maps ``"<view class>.<action>"`` (e.g.
+``"TitleViewSet.list"``, or ``"TokenView.post"`` for plain API views) to
+the most queries a request to that view may run. "log" writes problems
+to the ``api_yamdb.queries`` logger, "raise" fails the request with
+``QueryInspectionError``, which the test client re-raises, so the test
+suite catches regressions.
+"""
+import logging
+import re
+import traceback
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+NORMALIZE = (
+    (re.compile(r"'(?:[^']|'')*'"), "?"),
+    (re.compile(r"%s|\b\d+(?:\.\d+)?\b"), "?"),
+    (re.compile(r"\((?:\?, )+\?\)"), "(...)"),
+    (re.compile(r"\s+"), " "),
+)
+# Savepoints of atomic blocks are not counted: they are not queries of
+# the view, and a test case adds more of them than production does.
+TRANSACTION_CONTROL = ("SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK TO")
+
+
+class QueryInspectionError(AssertionError):
+    pass
+
+
+def fingerprint(sql):
+    """``sql`` without the values, the same for every row of a loop."""
+    for pattern, replacement in NORMALIZE:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+def project_stack():
+    """The frames of the current stack that belong to the project."""
+    frames = [
+        frame
+        for frame in traceback.extract_stack()[:-2]
+        if frame.filename.startswith(settings.BASE_DIR)
+        and "site-packages" not in frame.filename
+        and not frame.filename.endswith("queries.py")
+    ]
+    return "".join(traceback.format_list(frames))
+
+
+def get_view_key(request):
+    """``"<view class>.<action>"`` of a DRF view, None for other views."""
+    match = request.resolver_match
+    view_class = getattr(match.func, "cls", None) if match else None
+    if view_class is None:
+        return None
+    actions = getattr(match.func, "actions", None)
+    method = request.method.lower()
+    action = actions.get(method, method) if actions else method
+    return f"{view_class.__name__}.{action}"
+
+
+class QueryInspectorMiddleware:
+    """Reports repeated statements and exceeded query budgets."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = settings.QUERY_INSPECTOR
+        if not mode:
+            return self.get_response(request)
+        counts = Counter()
+        repeated = {}
+        limit = settings.QUERY_REPEAT_LIMIT
+
+        def inspect_query(execute, sql, params, many, context):
+            if sql.startswith(TRANSACTION_CONTROL):
+                return execute(sql, params, many, context)
+            key = fingerprint(sql)
+            counts[key] += 1
+            if counts[key] == limit + 1:
+                repeated[key] = project_stack()
+            return execute(sql, params, many, context)
+
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(inspect_query))
+            response = self.get_response(request)
+        self.report(request, response, mode, counts, repeated)
+        return response
+
+    @staticmethod
+    def report(request, response, mode, counts, repeated):
+        problems = [
+            f"{counts[key]} x {key}\n{stack}"
+            for key, stack in repeated.items()
+        ]
+        view_key = get_view_key(request)
+        budget = settings.QUERY_BUDGETS.get(view_key)
+        total = sum(counts.values())
+        if budget is not None and total > budget:
+            problems.append(
+                f"{view_key} ran {total} queries, the budget is {budget}:\n"
+                + "\n".join(
+                    f"{count} x {key}" for key, count in counts.items()
+                )
+            )
+        if problems:
+            message = (
+                f"{request.method} {request.path} "
+                f"({response.status_code}): " + "\n".join(problems)
+            )
+            if mode == "raise":
+                raise QueryInspectionError(message)
+            logger.warning(message)
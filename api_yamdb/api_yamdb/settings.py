@@ -27,11 +27,14 @@ INSTALLED_APPS = [
     "users.apps.UsersConfig",
     "api.apps.ApiConfig",
     "reviews.apps.ReviewsConfig",
+    "jobs.apps.JobsConfig",
     "rest_framework",
     "django_filters",
 ]
 
 MIDDLEWARE = [
+    "api_yamdb.metrics.PerformanceMiddleware",
+    "api_yamdb.queries.QueryInspectorMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -76,6 +79,55 @@ DATABASES = {
     }
 }
 
+# Connection reuse, PostgreSQL only. DB_CONN_MAX_AGE keeps a connection
+# per thread open for that many seconds and pings it on its first use in
+# each request. DB_POOL_SIZE instead shares a pool of connections between
+# the threads of a worker (see gunicorn.conf.py), connections go back to
+# the pool at the end of every request.
+DB_CONN_MAX_AGE = int(os.getenv("DB_CONN_MAX_AGE", "0"))
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "0"))
+if DATABASES["default"]["ENGINE"] == "django.db.backends.postgresql" and (
+    DB_CONN_MAX_AGE or DB_POOL_SIZE
+):
+    DATABASES["default"]["ENGINE"] = "api_yamdb.db.postgresql"
+    if DB_POOL_SIZE:
+        DATABASES["default"]["POOL"] = {
+            "SIZE": DB_POOL_SIZE,
+            "MAX_AGE": int(os.getenv("DB_POOL_MAX_AGE", "600")),
+            "TIMEOUT": float(os.getenv("DB_POOL_TIMEOUT", "5")),
+        }
+    else:
+        DATABASES["default"]["CONN_MAX_AGE"] = DB_CONN_MAX_AGE
+
+
+# Cache
+# "default" is the per-worker LRU cache. SHARED_CACHE_URL adds a cache
+# shared by all workers: redis://host:6379/0 or file:///path/to/dir.
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "yamdb",
+        "OPTIONS": {
+            "MAX_ENTRIES": int(os.getenv("LOCAL_CACHE_MAX_ENTRIES", "1000")),
+        },
+    },
+}
+
+SHARED_CACHE_URL = os.getenv("SHARED_CACHE_URL", "")
+if SHARED_CACHE_URL.startswith("redis://"):
+    CACHES["shared"] = {
+        "BACKEND": "django_redis.cache.RedisCache",
+        "LOCATION": SHARED_CACHE_URL,
+    }
+elif SHARED_CACHE_URL.startswith("file://"):
+    CACHES["shared"] = {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": SHARED_CACHE_URL[len("file://"):],
+    }
+
+RESPONSE_CACHE_TIMEOUT = int(os.getenv("RESPONSE_CACHE_TIMEOUT", "300"))
+
 
 # Password validation
 
@@ -117,21 +169,116 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 AUTH_USER_MODEL = "users.User"
 
+# PostgreSQL text search configuration for titles and reviews.
+SEARCH_CONFIG = "russian"
+# Best matches ranked by the in-memory index of other backends (SQLite).
+SEARCH_FALLBACK_LIMIT = int(os.getenv("SEARCH_FALLBACK_LIMIT", "1000"))
+
 EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
 
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 
+# Lifetime of the signup confirmation codes, in seconds.
+CONFIRMATION_CODE_MAX_AGE = int(
+    os.getenv("CONFIRMATION_CODE_MAX_AGE", str(24 * 60 * 60))
+)
+
+# Job queue (manage.py runworker): attempts per job, the first retry
+# delay in seconds (doubled on every retry) and how long a claimed job
+# stays with its worker before another worker may take it over.
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_RETRY_DELAY = int(os.getenv("JOB_RETRY_DELAY", "30"))
+JOB_LEASE = int(os.getenv("JOB_LEASE", "300"))
+
+# Request metrics (api_yamdb/metrics.py): the Server-Timing header, off
+# by default and only sent to the clients allowed to read /metrics/, and
+# the directory where the workers share their metrics for /metrics/,
+# set by gunicorn.conf.py. Without it /metrics/ shows one process.
+SERVER_TIMING = os.getenv("SERVER_TIMING", "0") == "1"
+METRICS_DIR = os.getenv("METRICS_DIR", "")
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "1"))
+# Who may read /metrics/: clients connecting from these networks (the
+# address of the connection, not X-Forwarded-For) and, when
+# METRICS_TOKEN is set, sending it as "Authorization: Bearer <token>".
+METRICS_ALLOWED_NETWORKS = os.getenv(
+    "METRICS_ALLOWED_NETWORKS",
+    "127.0.0.0/8,::1/128,10.0.0.0/8,172.16.0.0/12,192.168.0.0/16",
+).split(",")
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# SQL checks of every request (api_yamdb/queries.py), meant for
+# development and tests: "" to disable, "log" or "raise". A statement run
+# more than QUERY_REPEAT_LIMIT times in one request is reported as N+1,
+# QUERY_BUDGETS caps the queries of a view action.
+QUERY_INSPECTOR = os.getenv("QUERY_INSPECTOR", "log" if DEBUG else "")
+QUERY_REPEAT_LIMIT = int(os.getenv("QUERY_REPEAT_LIMIT", "5"))
+QUERY_BUDGETS = {
+    "CategoryViewSet.list": 1,
+    "GenreViewSet.list": 1,
+    "TitleViewSet.list": 4,
+    "TitleViewSet.retrieve": 3,
+    "ReviewsViewSet.list": 3,
+    "ReviewsViewSet.retrieve": 2,
+    "ReviewsViewSet.create": 4,
+    "ReviewsViewSet.partial_update": 4,
+    "CommentsViewSet.list": 3,
+    "CommentsViewSet.retrieve": 2,
+    "CommentsViewSet.create": 4,
+    "SearchViewSet.list": 3,
+    "SignUpViewSet.create": 4,
+    "TokenView.post": 1,
+    "UserViewset.list": 2,
+    "UserViewset.retrieve": 1,
+    "UserViewset.me": 4,
+}
+
+# Largest page a client may ask for with ?page_size=.
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "1000"))
+
+# Most titles one request to /api/v1/titles/bulk/ may write.
+MAX_BULK_TITLES = int(os.getenv("MAX_BULK_TITLES", "10000"))
+
+# Rows fetched and encoded at a time by the NDJSON exports.
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "2000"))
+# Reviews and comments younger than this many seconds are left for the
+# next export, their transactions may not have committed everything yet.
+EXPORT_WATERMARK_LAG = int(os.getenv("EXPORT_WATERMARK_LAG", "60"))
+
 REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "api.authentication.ClaimsJWTAuthentication",
+    ),
+    # orjson when installed, see api/renderers.py.
+    "DEFAULT_RENDERER_CLASSES": (
+        "api.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
     ),
-    "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
+    "DEFAULT_PAGINATION_CLASS": "api.pagination.PageSizePagination",
     "PAGE_SIZE": 5,
+    "DEFAULT_THROTTLE_CLASSES": (
+        "api.throttling.AnonTokenBucketThrottle",
+        "api.throttling.UserTokenBucketThrottle",
+        "api.throttling.ScopedTokenBucketThrottle",
+    ),
+    "DEFAULT_THROTTLE_RATES": {
+        "anon": os.getenv("THROTTLE_RATE_ANON", "600/min"),
+        "user": os.getenv("THROTTLE_RATE_USER", "1200/min"),
+        "signup": os.getenv("THROTTLE_RATE_SIGNUP", "5/min"),
+        "token": os.getenv("THROTTLE_RATE_TOKEN", "10/min"),
+    },
+    # nginx puts the client address into X-Forwarded-For.
+    "NUM_PROXIES": int(os.getenv("NUM_PROXIES", "1")),
 }
 
+# Where the throttle token buckets live: empty for the worker memory,
+# sqlite:///path/to/file or redis://host:6379/1 to share them between
+# workers, see api/throttling.py.
+THROTTLE_STORE_URL = os.getenv("THROTTLE_STORE_URL", "")
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(days=1),
+    "TOKEN_USER_CLASS": "api.authentication.ClaimsUser",
 }
@@ -0,0 +1,60 @@
+"""gunicorn settings, every value can be overridden from the environment.
+
+With DB_POOL_SIZE set, workers run that many threads (gthread) sharing a
+connection pool of the same size. Otherwise they are sync workers, each
+keeping its connection for DB_CONN_MAX_AGE seconds.
+"""
+import glob
+import multiprocessing
+import os
+import tempfile
+
+bind = os.getenv("GUNICORN_BIND", "0:8000")
+workers = int(
+    os.getenv("GUNICORN_WORKERS", str(multiprocessing.cpu_count() * 2 + 1))
+)
+pool_size = int(os.getenv("DB_POOL_SIZE", "0"))
+threads = int(os.getenv("GUNICORN_THREADS", str(max(pool_size, 1))))
+worker_class = os.getenv(
+    "GUNICORN_WORKER_CLASS", "gthread" if threads > 1 else "sync"
+)
+# Import the project once in the master, workers fork with it loaded.
+# Database connections are only opened by requests, never shared.
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") == "1"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "10000"))
+max_requests_jitter = max_requests // 10
+
+# Workers share their request metrics through files in this directory,
+# see api_yamdb/metrics.py. Set before the app is loaded so the settings
+# and every forked worker see it.
+os.environ.setdefault(
+    "METRICS_DIR", tempfile.mkdtemp(prefix="yamdb-metrics-")
+)
+
+
+def on_starting(server):
+    for path in glob.glob(os.path.join(os.environ["METRICS_DIR"], "*")):
+        os.remove(path)
+
+
+def child_exit(server, worker):
+    from api_yamdb.metrics import mark_process_dead
+
+    mark_process_dead(os.environ["METRICS_DIR"], worker.pid)
+
+
+def post_worker_init(worker):
+    # Load the category and genre tables of api/slugs.py before the first
+    # request. A database that is not up yet only delays it to the first
+    # request that needs them.
+    from api.slugs import warm
+    from django.db import DatabaseError, connections
+
+    try:
+        warm()
+    except DatabaseError:
+        worker.log.exception("Could not load the slug tables")
+    finally:
+        connections.close_all()
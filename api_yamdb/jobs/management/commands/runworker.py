@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from jobs.tasks import Worker
+
+
+class Command(BaseCommand):
+    help = "Run deferred jobs from the job queue"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=20)
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=1.0,
+            help="Seconds to wait when no job is due.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit as soon as no job is due.",
+        )
+
+    def handle(self, *args, **options):
+        worker = Worker(batch_size=options["batch_size"])
+        try:
+            while True:
+                close_old_connections()
+                results = worker.run_batch()
+                if results:
+                    self.stdout.write(
+                        f"{len(results)} jobs run, "
+                        f"{results.count(False)} failed"
+                    )
+                    continue
+                # Keep the mail connection only while there is work, idle
+                # SMTP connections are dropped by the server anyway.
+                worker.close()
+                if options["once"]:
+                    break
+                time.sleep(options["sleep"])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            worker.close()
@@ -0,0 +1,60 @@
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.utils import timezone
+
+
+class JobQuerySet(models.QuerySet):
+    def due(self, now=None):
+        """Pending jobs whose time has come and running jobs whose lease
+        has expired (their worker died)."""
+        return self.filter(
+            status__in=(Job.PENDING, Job.RUNNING),
+            run_at__lte=now or timezone.now(),
+        )
+
+
+class Job(models.Model):
+    """A unit of deferred work, executed by ``manage.py runworker``.
+
+    Finished jobs are deleted, jobs that ran out of attempts stay with
+    the ``failed`` status and the last error.
+    """
+
+    PENDING = "pending"
+    RUNNING = "running"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (PENDING, "pending"),
+        (RUNNING, "running"),
+        (FAILED, "failed"),
+    ]
+    name = models.CharField(max_length=100)
+    payload = models.TextField(default="{}")
+    status = models.CharField(
+        max_length=7, choices=STATUS_CHOICES, default=PENDING
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    run_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    objects = JobQuerySet.as_manager()
+
+    class Meta:
+        ordering = ("run_at", "id")
+        indexes = [
+            models.Index(
+                fields=["status", "run_at"], name="job_status_run_at_idx"
+            ),
+        ]
+
+    def get_payload(self):
+        return json.loads(self.payload)
+
+    def set_payload(self, payload):
+        self.payload = json.dumps(payload, cls=DjangoJSONEncoder)
+
+    def __str__(self):
+        return f"{self.name} #{self.pk}"
@@ -0,0 +1,130 @@
+"""Deferred work stored in the ``Job`` table.
+
+``enqueue`` saves a job in the current transaction, so a rolled back
+request drops its jobs too. ``manage.py runworker`` claims due jobs in
+batches and calls the handler registered under the job name with the
+worker and the payload as keyword arguments. Failed jobs are retried with
+exponential backoff until ``JOB_MAX_ATTEMPTS``.
+"""
+import smtplib
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+HANDLERS = {}
+MAX_RETRY_DELAY = 3600
+
+
+def register(name):
+    """Register the decorated function as the handler of ``name`` jobs."""
+
+    def decorator(func):
+        HANDLERS[name] = func
+        return func
+
+    return decorator
+
+
+def enqueue(name, run_at=None, **payload):
+    if name not in HANDLERS:
+        raise ValueError(f"No handler registered for {name!r} jobs")
+    job = Job(name=name, run_at=run_at or timezone.now())
+    job.set_payload(payload)
+    job.save()
+    return job
+
+
+class Worker:
+    """Runs claimed jobs, sharing one mail connection between them."""
+
+    def __init__(self, batch_size=20, max_attempts=None, retry_delay=None,
+                 lease=None):
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts or settings.JOB_MAX_ATTEMPTS
+        self.retry_delay = retry_delay or settings.JOB_RETRY_DELAY
+        self.lease = timedelta(seconds=lease or settings.JOB_LEASE)
+        self._mail_connection = None
+
+    @property
+    def mail_connection(self):
+        """Mail connection opened on first use and kept until ``close``."""
+        if self._mail_connection is None:
+            self._mail_connection = get_connection()
+            self._mail_connection.open()
+        return self._mail_connection
+
+    def close(self):
+        if self._mail_connection is not None:
+            try:
+                self._mail_connection.close()
+            finally:
+                self._mail_connection = None
+
+    def claim(self):
+        """Lock a batch of due jobs and mark them running for one lease."""
+        now = timezone.now()
+        with transaction.atomic():
+            jobs = list(
+                Job.objects.select_for_update(skip_locked=True)
+                .due(now)[:self.batch_size]
+            )
+            Job.objects.filter(pk__in=[job.pk for job in jobs]).update(
+                status=Job.RUNNING,
+                run_at=now + self.lease,
+                attempts=F("attempts") + 1,
+            )
+        for job in jobs:
+            job.attempts += 1
+        return jobs
+
+    def run_batch(self):
+        """Run one batch, return the results (True for success) per job."""
+        return [self.run(job) for job in self.claim()]
+
+    def run(self, job):
+        try:
+            handler = HANDLERS.get(job.name)
+            if handler is None:
+                raise LookupError(f"No handler registered for {job.name!r}")
+            handler(self, **job.get_payload())
+        except Exception as error:
+            if isinstance(error, (smtplib.SMTPException, OSError)):
+                # The connection may be broken, reopen it for the next job.
+                self.close()
+            self.retry(job, traceback.format_exc())
+            return False
+        Job.objects.filter(pk=job.pk).delete()
+        return True
+
+    def retry(self, job, error):
+        if job.attempts >= self.max_attempts:
+            Job.objects.filter(pk=job.pk).update(
+                status=Job.FAILED, last_error=error
+            )
+            return
+        delay = min(
+            self.retry_delay * 2 ** (job.attempts - 1), MAX_RETRY_DELAY
+        )
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.PENDING,
+            run_at=timezone.now() + timedelta(seconds=delay),
+            last_error=error,
+        )
+
+
+@register("send_mail")
+def send_mail(worker, subject, message, recipient_list, from_email=None):
+    EmailMessage(
+        subject,
+        message,
+        from_email,
+        recipient_list,
+        connection=worker.mail_connection,
+    ).send()
@@ -0,0 +1,131 @@
+"""Fast multi-row inserts used by the data loading commands.
+
+Rows are plain tuples with one database-ready value per concrete field of
+the model, in ``model._meta.concrete_fields`` order. On PostgreSQL they are
+streamed with ``COPY ... FROM STDIN``, other backends get a single
+``executemany`` INSERT.
+"""
+import io
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.management.color import no_style
+from django.db import connections, transaction
+from django.db.models import DateTimeField
+from django.utils import timezone
+
+
+class RowBuilder:
+    """Converts text values (e.g. a CSV row) into a row for ``insert_rows``.
+
+    ``columns`` are the attnames of the fields present in the input, every
+    other field gets its default. Values are passed through the field's
+    ``to_python`` so malformed input raises ``ValidationError``.
+    """
+
+    def __init__(self, model, columns, using="default"):
+        self.model = model
+        self.connection = connections[using]
+        self.fields = model._meta.concrete_fields
+        self.positions = [columns.index(f.attname) if f.attname in columns
+                          else None for f in self.fields]
+
+    def build(self, values):
+        row = []
+        for field, position in zip(self.fields, self.positions):
+            if position is None:
+                value = self.get_default(field)
+            else:
+                value = self.to_python(field, values[position])
+            row.append(field.get_db_prep_save(value, self.connection))
+        return tuple(row)
+
+    @staticmethod
+    def get_default(field):
+        if isinstance(field, DateTimeField) and (
+            field.auto_now or field.auto_now_add
+        ):
+            return timezone.now()
+        return field.get_default()
+
+    @staticmethod
+    def to_python(field, value):
+        if value == "" and field.null:
+            return None
+        value = field.to_python(value)
+        if (
+            isinstance(value, str)
+            and field.max_length
+            and len(value) > field.max_length
+        ):
+            raise ValidationError(f"{field.name} is too long")
+        if (
+            isinstance(field, DateTimeField)
+            and value is not None
+            and not settings.USE_TZ
+            and timezone.is_aware(value)
+        ):
+            return timezone.make_naive(value, timezone.utc)
+        return value
+
+
+def insert_rows(model, rows, using="default"):
+    """Insert prepared ``rows`` into the table of ``model``."""
+    if not rows:
+        return
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    columns = ", ".join(
+        quote(field.column) for field in model._meta.concrete_fields
+    )
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            data = io.StringIO("".join(map(_copy_line, rows)))
+            cursor.copy_expert(f"COPY {table} ({columns}) FROM STDIN", data)
+        else:
+            placeholders = ", ".join(["%s"] * len(rows[0]))
+            cursor.executemany(
+                f"INSERT INTO {table} ({columns}) VALUES ({placeholders})",
+                rows,
+            )
+
+
+def truncate(models, using="default"):
+    """Empty the tables of ``models``, and the tables referencing them."""
+    connection = connections[using]
+    tables = [model._meta.db_table for model in models]
+    sql_list = connection.ops.sql_flush(
+        no_style(), tables, [], allow_cascade=True
+    )
+    with transaction.atomic(using=using):
+        with connection.cursor() as cursor:
+            for sql in sql_list:
+                cursor.execute(sql)
+
+
+def reset_sequences(models, using="default"):
+    """Move the id sequences past rows inserted with explicit ids."""
+    connection = connections[using]
+    sql_list = connection.ops.sequence_reset_sql(no_style(), models)
+    with connection.cursor() as cursor:
+        for sql in sql_list:
+            cursor.execute(sql)
+
+
+def _copy_value(value):
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def _copy_line(row):
+    return "\t".join(map(_copy_value, row)) + "\n"
@@ -1,132 +1,276 @@
 import csv
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
+from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.core.management.base import BaseCommand
-from reviews.models import Category, Comment, Genre, GenreTitle, Review, Title
+from django.db import connection, connections, transaction
+from reviews.bulk import RowBuilder, insert_rows, reset_sequences, truncate
+from reviews.models import Category, Comment, Genre, Review, Title
 from users.models import User
 
+DATA_DIR = os.path.join(settings.BASE_DIR, "static", "data")
+
+
+class CsvFile:
+    """A CSV fixture: target model, column attnames and foreign keys.
+
+    ``references`` maps a column to the model its value must exist in.
+    """
+
+    def __init__(self, filename, model, columns, references=None):
+        self.filename = filename
+        self.model = model
+        self.columns = columns
+        self.references = references or {}
+
+    def depends_on(self, csv_file):
+        return csv_file.model in self.references.values()
+
+
+CSV_FILES = (
+    CsvFile(
+        "users.csv",
+        User,
+        ("id", "username", "email", "role", "bio", "first_name",
+         "last_name"),
+    ),
+    CsvFile("category.csv", Category, ("id", "name", "slug")),
+    CsvFile("genre.csv", Genre, ("id", "name", "slug")),
+    CsvFile(
+        "titles.csv",
+        Title,
+        ("id", "name", "year", "category_id"),
+        {"category_id": Category},
+    ),
+    CsvFile(
+        "genre_title.csv",
+        Title.genre.through,
+        ("id", "title_id", "genre_id"),
+        {"title_id": Title, "genre_id": Genre},
+    ),
+    CsvFile(
+        "review.csv",
+        Review,
+        ("id", "title_id", "text", "author_id", "score", "pub_date"),
+        {"title_id": Title, "author_id": User},
+    ),
+    CsvFile(
+        "comments.csv",
+        Comment,
+        ("id", "review_id", "text", "author_id", "pub_date"),
+        {"review_id": Review, "author_id": User},
+    ),
+)
+
+
+def read_record(f):
+    """Read one CSV record from a binary file, it may span several lines."""
+    record = f.readline()
+    while record.count(b'"') % 2:
+        line = f.readline()
+        if not line:
+            break
+        record += line
+    return record
 
-def fill_user_data(path):
-    try:
-        with open(path, encoding="utf8") as f:
-            reader = csv.reader(f)
-            next(reader, None)
-            for row in reader:
-                User.objects.get_or_create(
-                    id=row[0],
-                    username=row[1],
-                    email=row[2],
-                    role=row[3],
-                    bio=row[4],
-                    first_name=row[5],
-                    last_name=row[6],
-                )
-    except IOError:
-        print("no users data")
-
-
-def fill_category_data(path):
-    try:
-        with open(path, encoding="utf8") as f:
-            reader = csv.reader(f)
-            next(reader, None)
-            for row in reader:
-                Category.objects.get_or_create(
-                    id=row[0],
-                    name=row[1],
-                    slug=row[2],
-                )
-    except IOError:
-        print("no category data")
-
-
-def fill_title_data(path):
-    try:
-        with open(path, encoding="utf8") as f:
-            reader = csv.reader(f)
-            next(reader, None)
-            for row in reader:
-                Title.objects.get_or_create(
-                    id=row[0],
-                    name=row[1],
-                    year=row[2],
-                    category=Category.objects.get(pk=row[3]),
-                )
-    except IOError:
-        print("no title data")
-
-
-def fill_review_data(path):
-    try:
-        with open(path, encoding="utf8") as f:
-            reader = csv.reader(f)
-            next(reader, None)
-            for row in reader:
-                Review.objects.get_or_create(
-                    id=row[0],
-                    title=Title.objects.get(pk=row[1]),
-                    text=row[2],
-                    author=User.objects.get(pk=row[3]),
-                    score=row[4],
-                    pub_date=row[5],
-                )
-    except IOError:
-        print("no review data")
-
-
-def fill_comments_data(path):
-    try:
-        with open(path, encoding="utf8") as f:
-            reader = csv.reader(f)
-            next(reader, None)
-            for row in reader:
-                Comment.objects.get_or_create(
-                    id=row[0],
-                    review=Review.objects.get(pk=row[1]),
-                    text=row[2],
-                    author=User.objects.get(pk=row[3]),
-                    pub_date=row[4],
-                )
-    except IOError:
-        print("no comments data")
-
-
-def fill_genre_data(path):
-    try:
-        with open(path, encoding="utf8") as f:
-            reader = csv.reader(f)
-            next(reader, None)
-            for row in reader:
-                Genre.objects.get_or_create(
-                    id=row[0],
-                    name=row[1],
-                    slug=row[2],
-                )
-    except IOError:
-        print("no genre data")
-
-
-def fill_genre_title_data(path):
-    try:
-        with open(path, encoding="utf8") as f:
-            reader = csv.reader(f)
-            next(reader, None)
-            for row in reader:
-                GenreTitle.objects.get_or_create(
-                    id=row[0],
-                    title=Title.objects.get(pk=row[1]),
-                    genre=Genre.objects.get(pk=row[2]),
-                )
-    except IOError:
-        print("no genre_title data")
+
+def read_chunks(path, batch_size, offset=0):
+    """Yield lists of parsed rows with the byte offset right after them."""
+    with open(path, "rb") as f:
+        read_record(f)
+        if offset:
+            f.seek(offset)
+        while True:
+            records = []
+            while len(records) < batch_size:
+                record = read_record(f)
+                if not record:
+                    break
+                records.append(record.decode("utf8"))
+            if not records:
+                return
+            yield list(csv.reader(records)), f.tell()
+
+
+class Checkpoint:
+    """Per-file progress of an import, kept in a JSON file.
+
+    An offset is saved only after its chunk is committed. Rows committed
+    just before a crash are skipped on resume by the loaded id check.
+    """
+
+    def __init__(self, path, enabled=True):
+        self.path = path
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.state = {}
+        if enabled and os.path.exists(path):
+            with open(path, encoding="utf8") as f:
+                self.state = json.load(f)
+
+    def get(self, filename):
+        return self.state.get(filename, {"offset": 0, "done": False})
+
+    def save(self, filename, offset, done=False):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.state[filename] = {"offset": offset, "done": done}
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf8") as f:
+                json.dump(self.state, f)
+            os.replace(tmp_path, self.path)
+
+    def clear(self):
+        self.state = {}
+        if self.enabled and os.path.exists(self.path):
+            os.remove(self.path)
 
 
 class Command(BaseCommand):
+    help = "Load CSV fixtures from static/data into the database"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", default=DATA_DIR)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--jobs",
+            type=int,
+            default=4,
+            help="Files loaded in parallel (always 1 on SQLite).",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            help="Progress file, defaults to .filldb-checkpoint.json "
+            "in the data directory.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Parse and validate the files without writing anything.",
+        )
+        parser.add_argument(
+            "--truncate",
+            action="store_true",
+            help="Empty the target tables before loading.",
+        )
+
     def handle(self, *args, **options):
-        fill_user_data("static/data/users.csv")
-        fill_category_data("static/data/category.csv")
-        fill_title_data("static/data/titles.csv")
-        fill_review_data("static/data/review.csv")
-        fill_comments_data("static/data/comments.csv")
-        fill_genre_data("static/data/genre.csv")
-        fill_genre_title_data("static/data/genre_title.csv")
-        print("fixtures added to DB")
+        self.path = options["path"]
+        self.batch_size = options["batch_size"]
+        self.dry_run = options["dry_run"]
+        self.checkpoint = Checkpoint(
+            options["checkpoint"]
+            or os.path.join(self.path, ".filldb-checkpoint.json"),
+            enabled=not self.dry_run,
+        )
+        files = []
+        for csv_file in CSV_FILES:
+            if os.path.exists(os.path.join(self.path, csv_file.filename)):
+                files.append(csv_file)
+            else:
+                self.stderr.write(f"no {csv_file.filename} data")
+        if options["truncate"] and not self.dry_run:
+            self.checkpoint.clear()
+            truncate([csv_file.model for csv_file in files])
+        self.known_ids = {}
+        self.known_ids_lock = threading.Lock()
+        jobs = 1 if connection.vendor == "sqlite" else options["jobs"]
+        self.run(files, max(jobs, 1))
+        if self.dry_run:
+            self.stdout.write("dry run: fixtures checked, nothing written")
+            return
+        loaded_models = [csv_file.model for csv_file in files]
+        if Review in loaded_models:
+            Title.objects.rebuild_ratings()
+        for model in (Title, Review):
+            if model in loaded_models:
+                model.objects.filter(
+                    search_vector=None
+                ).update_search_vector()
+        reset_sequences(loaded_models)
+        self.checkpoint.clear()
+        self.stdout.write("fixtures added to DB")
+
+    def run(self, files, jobs):
+        """Load files in parallel, each one after the files it references."""
+        pending = list(files)
+        running = {}
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            while pending or running:
+                for csv_file in list(pending):
+                    if not any(
+                        csv_file.depends_on(other)
+                        for other in pending + list(running.values())
+                    ):
+                        pending.remove(csv_file)
+                        future = executor.submit(self.load_in_thread, csv_file)
+                        running[future] = csv_file
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    del running[future]
+                    future.result()
+
+    def load_in_thread(self, csv_file):
+        try:
+            self.load(csv_file)
+        finally:
+            connections.close_all()
+
+    def get_known_ids(self, model):
+        with self.known_ids_lock:
+            if model not in self.known_ids:
+                self.known_ids[model] = set(
+                    model._default_manager.values_list("pk", flat=True)
+                )
+            return self.known_ids[model]
+
+    def load(self, csv_file):
+        progress = self.checkpoint.get(csv_file.filename)
+        if progress["done"]:
+            self.stdout.write(f"{csv_file.filename}: already loaded")
+            return
+        path = os.path.join(self.path, csv_file.filename)
+        builder = RowBuilder(csv_file.model, csv_file.columns)
+        fields = [field.attname for field in builder.fields]
+        references = [
+            (fields.index(column), self.get_known_ids(model))
+            for column, model in csv_file.references.items()
+        ]
+        pk_index = fields.index(csv_file.model._meta.pk.attname)
+        loaded_ids = self.get_known_ids(csv_file.model)
+        loaded = skipped = 0
+        started = time.monotonic()
+        offset = progress["offset"]
+        for chunk, offset in read_chunks(path, self.batch_size, offset):
+            rows = []
+            for values in chunk:
+                try:
+                    row = builder.build(values)
+                except (ValidationError, IndexError):
+                    skipped += 1
+                    continue
+                if row[pk_index] in loaded_ids or any(
+                    row[index] not in known for index, known in references
+                ):
+                    skipped += 1
+                    continue
+                loaded_ids.add(row[pk_index])
+                rows.append(row)
+            if not self.dry_run:
+                with transaction.atomic():
+                    insert_rows(csv_file.model, rows)
+                self.checkpoint.save(csv_file.filename, offset)
+            loaded += len(rows)
+        self.checkpoint.save(csv_file.filename, offset, done=True)
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f"{csv_file.filename}: {loaded} rows in {elapsed:.2f}s "
+            f"({loaded / elapsed if elapsed else 0:.0f} rows/s), "
+            f"{skipped} skipped"
+        )
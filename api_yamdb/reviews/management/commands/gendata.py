@@ -0,0 +1,332 @@
+import random
+import time
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+from reviews.bulk import RowBuilder, insert_rows, reset_sequences, truncate
+from reviews.models import Category, Comment, Genre, Review, Title
+from users.models import User
+
+# Generated timestamps are offsets from this date, not from now, so the
+# same seed gives the same rows whenever the command runs.
+EPOCH = datetime(2015, 1, 1)
+PERIOD = 7 * 365 * 24 * 3600
+
+WORDS = (
+    "книга", "фильм", "музыка", "сюжет", "герой", "автор", "финал",
+    "история", "жанр", "сцена", "образ", "стиль", "ритм", "мир", "время",
+    "любовь", "война", "дорога", "город", "море", "тайна", "память",
+)
+
+
+class Generator:
+    """Builds rows for ``insert_rows`` from a seeded random generator.
+
+    Primary keys are assigned here, starting after the largest existing
+    key of each table, so reviews and comments can reference rows of the
+    same batch without reading them back.
+    """
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.builders = {}
+        self.next_ids = {}
+
+    def next_id(self, model):
+        if model not in self.next_ids:
+            last = model._default_manager.aggregate(last=Max("pk"))["last"]
+            self.next_ids[model] = (last or 0) + 1
+        self.next_ids[model] += 1
+        return self.next_ids[model] - 1
+
+    def row(self, model, **values):
+        columns = tuple(values)
+        key = (model, columns)
+        if key not in self.builders:
+            self.builders[key] = RowBuilder(model, columns)
+        return self.builders[key].build(list(values.values()))
+
+    def moments(self, count):
+        """``count`` timestamps in the generated period."""
+        return [
+            EPOCH + timedelta(seconds=offset)
+            for offset in self.rng.choices(range(PERIOD), k=count)
+        ]
+
+    def delays(self, count):
+        """``count`` delays of up to 30 days."""
+        return [
+            timedelta(seconds=offset)
+            for offset in self.rng.choices(range(30 * 24 * 3600), k=count)
+        ]
+
+    def texts(self, count, words=12):
+        """``count`` texts of ``words`` words, drawn in one call."""
+        drawn = self.rng.choices(WORDS, k=count * words)
+        return [
+            " ".join(drawn[start:start + words]).capitalize()
+            for start in range(0, count * words, words)
+        ]
+
+
+class Command(BaseCommand):
+    help = "Generate a synthetic dataset of a given size for scale testing"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--categories", type=int, default=20)
+        parser.add_argument("--genres", type=int, default=50)
+        parser.add_argument("--titles", type=int, default=10000)
+        parser.add_argument("--genres-per-title", type=int, default=2)
+        parser.add_argument(
+            "--reviews-per-title",
+            type=float,
+            default=5,
+            help="Average number of reviews of a title.",
+        )
+        parser.add_argument(
+            "--zipf",
+            type=float,
+            default=1.1,
+            help="Skew of the reviews between titles, 0 spreads them "
+            "evenly. A title never gets more reviews than there are "
+            "users, the author of a review is unique per title.",
+        )
+        parser.add_argument(
+            "--comments-per-review",
+            type=float,
+            default=2,
+            help="Average number of comments of a review.",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Titles written per transaction with their reviews and "
+            "comments.",
+        )
+        parser.add_argument(
+            "--truncate",
+            action="store_true",
+            help="Empty the tables first. Without it the generated rows "
+            "are added after the existing ones.",
+        )
+
+    def handle(self, *args, **options):
+        if options["genres_per_title"] > options["genres"]:
+            raise CommandError("--genres-per-title is larger than --genres")
+        if options["reviews_per_title"] and not options["users"]:
+            raise CommandError("Reviews need at least one user")
+        models = [User, Category, Genre, Title, Title.genre.through,
+                  Review, Comment]
+        if options["truncate"]:
+            truncate(models)
+        started = time.monotonic()
+        self.generator = Generator(random.Random(options["seed"]))
+        with transaction.atomic():
+            self.user_ids = self.insert_users(options["users"])
+            self.category_ids = self.insert_groups(
+                Category, "Категория", "category", options["categories"]
+            )
+            self.genre_ids = self.insert_groups(
+                Genre, "Жанр", "genre", options["genres"]
+            )
+        review_counts = self.review_counts(
+            options["titles"],
+            options["titles"] * options["reviews_per_title"],
+            options["zipf"],
+        )
+        totals = {"titles": 0, "reviews": 0, "comments": 0}
+        batch_size = max(options["batch_size"], 1)
+        for start in range(0, options["titles"], batch_size):
+            with transaction.atomic():
+                batch = self.insert_titles(
+                    review_counts[start:start + batch_size],
+                    options["genres_per_title"],
+                    options["comments_per_review"],
+                )
+            for name, count in batch.items():
+                totals[name] += count
+        reset_sequences(models)
+        with transaction.atomic():
+            Title.objects.rebuild_ratings()
+        for model in (Title, Review):
+            model.objects.filter(search_vector=None).update_search_vector()
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f"{len(self.user_ids)} users, {totals['titles']} titles, "
+            f"{totals['reviews']} reviews, {totals['comments']} comments "
+            f"in {elapsed:.2f}s"
+        )
+
+    def review_counts(self, titles, total, skew):
+        """Reviews of every title, Zipf distributed over shuffled ranks.
+
+        The title of rank ``r`` gets a share of ``total`` proportional to
+        ``1 / r ** skew``, rounded up or down at random so the average
+        holds. Titles over the number of users are capped and the excess
+        goes to the others.
+        """
+        rng = self.generator.rng
+        ranks = list(range(1, titles + 1))
+        rng.shuffle(ranks)
+        weights = [rank ** -skew for rank in ranks]
+        limit = len(self.user_ids)
+        total = min(total, limit * titles)
+        capped = 0
+        while True:
+            # Ranks below ``capped`` are at the limit, the rest share what
+            # is left of the total.
+            rest = sum(1 / r ** skew for r in range(capped + 1, titles + 1))
+            scale = (total - capped * limit) / rest if rest else 0
+            over = sum(
+                1 for r in range(capped + 1, titles + 1)
+                if r ** -skew * scale > limit
+            )
+            if not over:
+                break
+            capped += over
+        return [
+            limit if rank <= capped else min(
+                limit, int(weight * scale + fraction)
+            )
+            for rank, weight, fraction in zip(
+                ranks, weights, [rng.random() for _ in weights]
+            )
+        ]
+
+    def insert_users(self, count):
+        generator = self.generator
+        rows = []
+        ids = []
+        for date_joined in generator.moments(count):
+            pk = generator.next_id(User)
+            ids.append(pk)
+            rows.append(generator.row(
+                User,
+                id=pk,
+                username=f"gen{pk}",
+                email=f"gen{pk}@example.com",
+                # An unusable password, generated users cannot log in.
+                password="!",
+                date_joined=date_joined,
+            ))
+        insert_rows(User, rows)
+        return ids
+
+    def insert_groups(self, model, name, slug, count):
+        generator = self.generator
+        ids = [generator.next_id(model) for _ in range(count)]
+        insert_rows(model, [
+            generator.row(
+                model,
+                id=pk,
+                name=f"{name} {pk}",
+                slug=f"{slug}-{pk}",
+                modified=EPOCH,
+            )
+            for pk in ids
+        ])
+        return ids
+
+    def insert_titles(self, review_counts, genres_per_title, comments):
+        """Rows of a batch of titles with their reviews and comments.
+
+        The values of every column are drawn for the whole batch with one
+        ``k=`` call of the generator; only the genres and the authors of
+        a title, sampled without replacement, are drawn per title.
+        """
+        generator = self.generator
+        rng = generator.rng
+        rows = {
+            Title: [], Title.genre.through: [], Review: [], Comment: []
+        }
+        titles = len(review_counts)
+        title_ids = [generator.next_id(Title) for _ in range(titles)]
+        for title_id, year, category_id, name, description in zip(
+            title_ids,
+            rng.choices(range(1900, 2023), k=titles),
+            rng.choices(self.category_ids or [None], k=titles),
+            generator.texts(titles, 3),
+            generator.texts(titles),
+        ):
+            rows[Title].append(generator.row(
+                Title,
+                id=title_id,
+                name=name,
+                year=year,
+                description=description,
+                category_id=category_id,
+                modified=EPOCH,
+            ))
+            for genre_id in rng.sample(self.genre_ids, genres_per_title):
+                rows[Title.genre.through].append(generator.row(
+                    Title.genre.through,
+                    id=generator.next_id(Title.genre.through),
+                    title_id=title_id,
+                    genre_id=genre_id,
+                ))
+        reviews = [
+            (title_id, author_id)
+            for title_id, count in zip(title_ids, review_counts)
+            # Distinct authors, the unique_review constraint holds.
+            for author_id in rng.sample(self.user_ids, count)
+        ]
+        total = len(reviews)
+        # Comments per review, uniform around the average.
+        comment_counts = [
+            int(offset / 1000 + 0.5)
+            for offset in rng.choices(range(int(2000 * comments) + 1), k=total)
+        ]
+        review_ids = [generator.next_id(Review) for _ in range(total)]
+        review_dates = generator.moments(total)
+        for review_id, (title_id, author_id), score, text, pub_date in zip(
+            review_ids,
+            reviews,
+            rng.choices(range(1, 11), k=total),
+            generator.texts(total),
+            review_dates,
+        ):
+            rows[Review].append(generator.row(
+                Review,
+                id=review_id,
+                title_id=title_id,
+                text=text,
+                author_id=author_id,
+                score=score,
+                pub_date=pub_date,
+                modified=pub_date,
+            ))
+        comment_reviews = [
+            (review_id, pub_date)
+            for review_id, pub_date, count in zip(
+                review_ids, review_dates, comment_counts
+            )
+            for _ in range(count)
+        ]
+        total = len(comment_reviews)
+        for (review_id, review_date), author_id, text, delay in zip(
+            comment_reviews,
+            rng.choices(self.user_ids, k=total),
+            generator.texts(total),
+            generator.delays(total),
+        ):
+            rows[Comment].append(generator.row(
+                Comment,
+                id=generator.next_id(Comment),
+                review_id=review_id,
+                text=text,
+                author_id=author_id,
+                pub_date=review_date + delay,
+                modified=review_date + delay,
+            ))
+        for model, model_rows in rows.items():
+            insert_rows(model, model_rows)
+        return {
+            "titles": len(rows[Title]),
+            "reviews": len(rows[Review]),
+            "comments": len(rows[Comment]),
+        }
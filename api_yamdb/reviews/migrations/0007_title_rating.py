@@ -0,0 +1,42 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:08
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def fill_ratings(apps, schema_editor):
+    Review = apps.get_model("reviews", "Review")
+    Title = apps.get_model("reviews", "Title")
+    reviews = (
+        Review.objects.filter(title=OuterRef("pk")).order_by().values("title")
+    )
+    Title.objects.update(
+        rating_sum=Coalesce(
+            Subquery(reviews.annotate(total=Sum("score")).values("total")), 0
+        ),
+        rating_count=Coalesce(
+            Subquery(reviews.annotate(total=Count("pk")).values("total")), 0
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reviews", "0006_delete_genretitle"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="title",
+            name="rating_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="title",
+            name="rating_sum",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_ratings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:20
+
+from django.db import migrations, models
+
+# FilterTitle uses ``name__contains`` (LIKE), SearchFilter uses
+# ``icontains`` which Django renders as UPPER(column::text) LIKE UPPER(%s).
+TRIGRAM_INDEXES = (
+    ("title_name_trgm_idx", "reviews_title", "name"),
+    ("category_name_trgm_idx", "reviews_category", "UPPER(name)"),
+    ("genre_name_trgm_idx", "reviews_genre", "UPPER(name)"),
+)
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for name, table, expression in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {name} ON {table} "
+            f"USING gin (({expression}) gin_trgm_ops)"
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, _, _ in TRIGRAM_INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reviews", "0008_feed_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="title",
+            index=models.Index(fields=["year"], name="title_year_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="title",
+            index=models.Index(
+                fields=["category", "year"], name="title_category_year_idx"
+            ),
+        ),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
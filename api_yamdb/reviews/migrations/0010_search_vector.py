@@ -0,0 +1,65 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:31
+
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+SEARCH_INDEXES = (
+    ("title_search_vector_idx", "reviews_title"),
+    ("review_search_vector_idx", "reviews_review"),
+)
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    config = settings.SEARCH_CONFIG
+    schema_editor.execute(
+        "UPDATE reviews_title SET search_vector = "
+        "setweight(to_tsvector(%s::regconfig, COALESCE(name, '')), 'A') || "
+        "setweight(to_tsvector(%s::regconfig, COALESCE(description, '')), "
+        "'B')",
+        [config, config],
+    )
+    schema_editor.execute(
+        "UPDATE reviews_review SET search_vector = "
+        "setweight(to_tsvector(%s::regconfig, COALESCE(text, '')), 'A')",
+        [config],
+    )
+    for name, table in SEARCH_INDEXES:
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {name} ON {table} "
+            "USING gin (search_vector)"
+        )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, _ in SEARCH_INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reviews", "0009_catalog_search_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="review",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="title",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
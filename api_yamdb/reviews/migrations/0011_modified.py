@@ -0,0 +1,48 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reviews", "0010_search_vector"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="category",
+            name="modified",
+            field=models.DateTimeField(
+                auto_now=True, verbose_name="Дата изменения"
+            ),
+        ),
+        migrations.AddField(
+            model_name="comment",
+            name="modified",
+            field=models.DateTimeField(
+                auto_now=True, verbose_name="Дата изменения"
+            ),
+        ),
+        migrations.AddField(
+            model_name="genre",
+            name="modified",
+            field=models.DateTimeField(
+                auto_now=True, verbose_name="Дата изменения"
+            ),
+        ),
+        migrations.AddField(
+            model_name="review",
+            name="modified",
+            field=models.DateTimeField(
+                auto_now=True, verbose_name="Дата изменения"
+            ),
+        ),
+        migrations.AddField(
+            model_name="title",
+            name="modified",
+            field=models.DateTimeField(
+                auto_now=True, verbose_name="Дата изменения"
+            ),
+        ),
+    ]
@@ -1,11 +1,18 @@
+from django.conf import settings
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import connections, models, transaction
+from django.db.models import (Case, Count, F, FloatField, OuterRef, Subquery,
+                              Sum, When)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from users.models import User
 
 
 class Category(models.Model):
     name = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
+    modified = models.DateTimeField("Дата изменения", auto_now=True)
 
     class Meta:
         constraints = [
@@ -21,6 +28,7 @@ class Category(models.Model):
 class Genre(models.Model):
     name = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
+    modified = models.DateTimeField("Дата изменения", auto_now=True)
 
     class Meta:
         constraints = [
@@ -33,6 +41,66 @@ class Genre(models.Model):
         return self.slug
 
 
+class SearchVectorQuerySet(models.QuerySet):
+    """Keeps the stored ``search_vector`` column of a model up to date.
+
+    Only PostgreSQL has tsvector, other backends search in memory
+    (see api/search.py) and leave the column empty.
+    """
+
+    search_fields = ()
+
+    def update_search_vector(self):
+        if connections[self.db].vendor != "postgresql":
+            return 0
+        vectors = [
+            SearchVector(field, weight=weight, config=settings.SEARCH_CONFIG)
+            for field, weight in self.search_fields
+        ]
+        vector = vectors[0]
+        for other in vectors[1:]:
+            vector += other
+        return self.update(search_vector=vector)
+
+
+class TitleQuerySet(SearchVectorQuerySet):
+    search_fields = (("name", "A"), ("description", "B"))
+
+    def with_rating(self):
+        return self.annotate(
+            rating=Case(
+                When(rating_count=0, then=None),
+                default=F("rating_sum") * 1.0 / F("rating_count"),
+                output_field=FloatField(),
+            )
+        )
+
+    def add_to_rating(self, score_delta, count_delta):
+        return self.update(
+            rating_sum=F("rating_sum") + score_delta,
+            rating_count=F("rating_count") + count_delta,
+            modified=timezone.now(),
+        )
+
+    def rebuild_ratings(self):
+        reviews = (
+            Review.objects.filter(title=OuterRef("pk"))
+            .order_by()
+            .values("title")
+        )
+        return self.update(
+            rating_sum=Coalesce(
+                Subquery(reviews.annotate(total=Sum("score")).values("total")),
+                0,
+            ),
+            rating_count=Coalesce(
+                Subquery(reviews.annotate(total=Count("pk")).values("total")),
+                0,
+            ),
+            modified=timezone.now(),
+        )
+
+
 class Title(models.Model):
     name = models.CharField(max_length=200)
     year = models.IntegerField()
@@ -41,11 +109,29 @@ class Title(models.Model):
         Category, on_delete=models.SET_NULL, related_name="titles", null=True
     )
     genre = models.ManyToManyField(Genre, related_name="titles")
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    search_vector = SearchVectorField(null=True, editable=False)
+    modified = models.DateTimeField("Дата изменения", auto_now=True)
+
+    objects = TitleQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["year"], name="title_year_idx"),
+            models.Index(
+                fields=["category", "year"], name="title_category_year_idx"
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
 
+class ReviewQuerySet(SearchVectorQuerySet):
+    search_fields = (("text", "A"),)
+
+
 class Review(models.Model):
     title = models.ForeignKey(
         Title, on_delete=models.CASCADE, related_name="reviews"
@@ -61,6 +147,10 @@ class Review(models.Model):
         "Дата добавления",
         auto_now_add=True,
     )
+    modified = models.DateTimeField("Дата изменения", auto_now=True)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = ReviewQuerySet.as_manager()
 
     class Meta:
         constraints = [
@@ -68,6 +158,23 @@ class Review(models.Model):
                 name="unique_review", fields=["author", "title"]
             )
         ]
+        indexes = [
+            models.Index(
+                fields=["title", "-pub_date", "-id"],
+                name="review_title_pub_date_idx",
+            ),
+            # Incremental exports, see api/export.py.
+            models.Index(
+                fields=["pub_date", "id"], name="review_pub_date_id_idx"
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        # Title.rating_sum/rating_count are updated by the post_save
+        # handler from the row locked by pre_save, keep it all in one
+        # transaction.
+        with transaction.atomic(using=kwargs.get("using")):
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return self.text[:15]
@@ -85,6 +192,18 @@ class Comment(models.Model):
         "Дата добавления",
         auto_now_add=True,
     )
+    modified = models.DateTimeField("Дата изменения", auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["review", "-pub_date", "-id"],
+                name="comment_review_pub_date_idx",
+            ),
+            models.Index(
+                fields=["pub_date", "id"], name="comment_pub_date_id_idx"
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -0,0 +1,106 @@
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Category, Comment, Genre, Review, Title
+
+
+@receiver(post_save, sender=Title)
+def update_title_search_vector(sender, instance, raw, **kwargs):
+    if not raw:
+        Title.objects.filter(pk=instance.pk).update_search_vector()
+
+
+@receiver(post_save, sender=Review)
+def update_review_search_vector(sender, instance, raw, **kwargs):
+    if not raw:
+        Review.objects.filter(pk=instance.pk).update_search_vector()
+
+
+def stored_rating(pk):
+    """The title and score of the stored review, locked until the commit.
+
+    Saves and deletes run in a transaction, so concurrent writes to one
+    review take turns and each one sees the score the previous one left.
+    """
+    return (
+        Review.objects.select_for_update()
+        .filter(pk=pk)
+        .values_list("title_id", "score")
+        .first()
+    )
+
+
+@receiver(pre_save, sender=Review)
+def snapshot_rating_on_save(sender, instance, raw, **kwargs):
+    if not raw:
+        instance._rating_snapshot = (
+            None if instance.pk is None else stored_rating(instance.pk)
+        )
+
+
+@receiver(post_save, sender=Review)
+def update_rating_on_save(sender, instance, created, raw, **kwargs):
+    if raw:
+        return
+    snapshot = instance._rating_snapshot
+    if created or snapshot is None:
+        Title.objects.filter(pk=instance.title_id).add_to_rating(
+            instance.score, 1
+        )
+        return
+    old_title_id, old_score = snapshot
+    if old_title_id == instance.title_id:
+        # Also moves Title.modified, the review lists depend on it.
+        Title.objects.filter(pk=instance.title_id).add_to_rating(
+            instance.score - old_score, 0
+        )
+    else:
+        Title.objects.filter(pk=old_title_id).add_to_rating(-old_score, -1)
+        Title.objects.filter(pk=instance.title_id).add_to_rating(
+            instance.score, 1
+        )
+
+
+@receiver(pre_delete, sender=Review)
+def snapshot_rating_on_delete(sender, instance, **kwargs):
+    instance._rating_snapshot = stored_rating(instance.pk)
+
+
+@receiver(post_delete, sender=Review)
+def update_rating_on_delete(sender, instance, **kwargs):
+    if instance._rating_snapshot is not None:
+        title_id, score = instance._rating_snapshot
+        Title.objects.filter(pk=title_id).add_to_rating(-score, -1)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def touch_review_on_comment_change(sender, instance, raw=False, **kwargs):
+    # The comment lists take their validators from Review.modified.
+    if not raw:
+        Review.objects.filter(pk=instance.review_id).update(
+            modified=timezone.now()
+        )
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def touch_title_on_genres_change(sender, instance, action, reverse, pk_set,
+                                 **kwargs):
+    if not action.startswith("post_"):
+        return
+    if reverse:
+        titles = Title.objects.filter(genre=instance)
+        if pk_set:
+            titles = Title.objects.filter(pk__in=pk_set)
+    else:
+        titles = Title.objects.filter(pk=instance.pk)
+    titles.update(modified=timezone.now())
+
+
+@receiver(pre_delete, sender=Category)
+@receiver(pre_delete, sender=Genre)
+def touch_titles_on_group_delete(sender, instance, **kwargs):
+    # The titles lose the category or genre without a signal of their own.
+    instance.titles.update(modified=timezone.now())
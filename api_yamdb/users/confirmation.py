@@ -0,0 +1,25 @@
+"""Signed, expiring confirmation codes.
+
+A code is ``<user id>:<confirmation_version>`` signed with a timestamp, so
+checking it needs the user row the token view loads anyway and nothing is
+stored at signup. Bumping ``User.confirmation_version`` invalidates every
+code issued before.
+"""
+from django.conf import settings
+from django.core import signing
+
+signer = signing.TimestampSigner(salt="users.confirmation")
+
+
+def make_confirmation_code(user):
+    return signer.sign(f"{user.pk}:{user.confirmation_version}")
+
+
+def check_confirmation_code(user, code):
+    try:
+        value = signer.unsign(
+            code, max_age=settings.CONFIRMATION_CODE_MAX_AGE
+        )
+    except signing.BadSignature:
+        return False
+    return value == f"{user.pk}:{user.confirmation_version}"
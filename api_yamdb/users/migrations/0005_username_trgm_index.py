@@ -0,0 +1,31 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:20
+
+from django.db import migrations
+
+
+def create_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # UserViewset searches with ``username__icontains``.
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS user_username_trgm_idx ON users_user "
+        "USING gin ((UPPER(username)) gin_trgm_ops)"
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS user_username_trgm_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0004_auto_20220521_1311"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:24
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def check_unique_emails(apps, schema_editor):
+    # Merging or renaming accounts is left to the operator, the unique
+    # index below would only fail with an IntegrityError.
+    User = apps.get_model("users", "User")
+    duplicates = (
+        User.objects.values("email")
+        .annotate(users=Count("id"))
+        .filter(users__gt=1)
+        .order_by("email")
+    )
+    if duplicates:
+        emails = ", ".join(
+            f"{row['email']} ({row['users']})" for row in duplicates
+        )
+        raise RuntimeError(
+            "Emails must be unique before this migration, fix the users "
+            f"sharing these emails: {emails}"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0005_username_trgm_index"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="user",
+            name="confirmation_code",
+        ),
+        migrations.AddField(
+            model_name="user",
+            name="confirmation_version",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(check_unique_emails, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="user",
+            name="email",
+            field=models.EmailField(
+                max_length=254, unique=True, verbose_name="email address"
+            ),
+        ),
+    ]
@@ -16,6 +16,7 @@ class User(AbstractUser):
         (MODERATOR, _("moderator")),
         (USER, _("user")),
     ]
+    CLAIM_FIELDS = ("role", "is_superuser", "is_active")
     username = models.CharField(
         _("username"),
         max_length=30,
@@ -45,11 +46,23 @@ class User(AbstractUser):
         _("biography"),
         blank=True,
     )
-    confirmation_code = models.CharField(
-        max_length=128,
-        blank=True,
+    email = models.EmailField(_("email address"), unique=True)
+    # Part of the signed confirmation codes, see users/confirmation.py.
+    confirmation_version = models.PositiveIntegerField(
+        default=0, editable=False
     )
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if all(name in field_names for name in cls.CLAIM_FIELDS):
+            instance._claims_snapshot = instance.get_claims()
+        return instance
+
+    def get_claims(self):
+        """Values the access tokens of the user rely on."""
+        return tuple(getattr(self, name) for name in self.CLAIM_FIELDS)
+
     def is_admin(self):
         if self.role == "admin":
             return True
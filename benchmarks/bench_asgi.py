@@ -0,0 +1,63 @@
+"""Concurrent-request throughput of the WSGI and ASGI deployments.
+
+Start both against the same database, e.g.
+
+    cd api_yamdb
+    GUNICORN_BIND=127.0.0.1:8000 gunicorn api_yamdb.wsgi:application \\
+        -c gunicorn.conf.py
+    GUNICORN_BIND=127.0.0.1:8001 gunicorn api_yamdb.asgi:application \\
+        -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker
+
+then run
+
+    python benchmarks/bench_asgi.py http://127.0.0.1:8000 \\
+        http://127.0.0.1:8001 --concurrency 100 --slow 0.2
+
+Each deployment gets the same mix of title list/detail, review list and
+comment list requests. ``--slow`` delays the second half of every
+request, which ties up a sync worker but not an event loop.
+"""
+import argparse
+
+import loadgen
+
+
+def paths(title, review):
+    return [
+        "/api/v1/titles/",
+        f"/api/v1/titles/{title}/",
+        f"/api/v1/titles/{title}/reviews/",
+        f"/api/v1/titles/{title}/reviews/{review}/comments/",
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("wsgi_url")
+    parser.add_argument("asgi_url")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--slow", type=float, default=0.0)
+    parser.add_argument("--title", type=int, default=1)
+    parser.add_argument("--review", type=int, default=1)
+    args = parser.parse_args()
+    print(
+        f"{'deployment':<12}{'req/s':>10}{'p50, ms':>10}{'p99, ms':>10}"
+        f"{'errors':>8}"
+    )
+    for name, url in (("wsgi", args.wsgi_url), ("asgi", args.asgi_url)):
+        summary, _ = loadgen.run(
+            url,
+            paths(args.title, args.review),
+            concurrency=args.concurrency,
+            requests=args.requests,
+            slow=args.slow,
+        )
+        print(
+            f"{name:<12}{summary['rps']:>10.0f}{summary['p50_ms']:>10.1f}"
+            f"{summary['p99_ms']:>10.1f}{summary['errors']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Throughput of the signup -> token flow.
+
+    python benchmarks/bench_auth_flow.py --users 2000
+
+Posts ``--users`` signups to /api/v1/auth/signup/, then exchanges every
+confirmation code (taken from the queued mail) for a token at
+/api/v1/auth/token/. Prints requests per second and SQL queries per
+request for both steps. Requests go through the Django test client, so
+the numbers include the full middleware and DRF stack but no HTTP server.
+"""
+import argparse
+import time
+
+import common
+
+
+def timed_posts(client, url, payloads):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    started = time.perf_counter()
+    with CaptureQueriesContext(connection) as context:
+        for i, payload in enumerate(payloads):
+            # One client address per user, as the auth throttles are per IP.
+            address = f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}"
+            response = client.post(url, payload, REMOTE_ADDR=address)
+            assert response.status_code == 200, response.content
+    elapsed = time.perf_counter() - started
+    return len(payloads) / elapsed, len(context.captured_queries) / len(
+        payloads
+    )
+
+
+def run(count):
+    from django.test.utils import setup_test_environment
+    from jobs.models import Job
+    from rest_framework.test import APIClient
+
+    setup_test_environment()
+    client = APIClient()
+    signups = [
+        {"username": f"bench{i}", "email": f"bench{i}@ya.ru"}
+        for i in range(count)
+    ]
+    signup_rate, signup_queries = timed_posts(
+        client, "/api/v1/auth/signup/", signups
+    )
+    codes = [
+        job.get_payload()["message"].rsplit(" ", 1)[-1]
+        for job in Job.objects.filter(name="send_mail").order_by("id")
+    ]
+    tokens = [
+        {"username": signup["username"], "confirmation_code": code}
+        for signup, code in zip(signups, codes)
+    ]
+    token_rate, token_queries = timed_posts(
+        client, "/api/v1/auth/token/", tokens
+    )
+    print(f"{'step':<10}{'req/s':>10}{'queries/req':>14}")
+    print(f"{'signup':<10}{signup_rate:>10.0f}{signup_queries:>14.1f}")
+    print(f"{'token':<10}{token_rate:>10.0f}{token_queries:>14.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=2000)
+    args = parser.parse_args()
+    common.setup()
+    with common.test_database():
+        run(args.users)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,344 @@
+"""In-process load test of every API route, with a regression gate.
+
+    python benchmarks/bench_load.py --output load.json
+    python benchmarks/bench_load.py --baseline benchmarks/baseline.json
+    python benchmarks/bench_load.py --baseline benchmarks/baseline.json \\
+        --update
+
+Seeds the test database (SQLite or PostgreSQL, whatever the settings
+point at) with ``common.seed``, then sends ``--iterations`` rounds of
+requests through the Django test client: every named URL of
+api/urls.py, reads and writes. Streamed responses (the exports) are read
+to the end. For each route it records p50/p95/p99 latency, SQL queries
+per request and errors, plus the overall requests per second.
+
+With ``--baseline`` the run is compared to a saved result and the script
+exits with status 1 when a route's p95 grows by more than
+``--threshold``, a route runs more queries, a route fails, or the
+overall RPS drops by more than the threshold. ``--update`` saves the run
+as the new baseline instead. Baselines are only comparable on the same
+machine and database vendor.
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import datetime
+from urllib.parse import urlsplit
+
+import common
+
+
+class Route:
+    """One request of a round: ``build(i)`` returns method, path, data."""
+
+    def __init__(self, name, build, expected=200, user=None, format=None):
+        self.name = name
+        self.build = build
+        self.expected = expected
+        self.user = user
+        self.format = format
+
+
+def get(path):
+    return lambda i: ("get", path, None)
+
+
+def routes(title, review, comment, admin, user):
+    titles = f"/api/v1/titles/{title.id}"
+    reviews = f"{titles}/reviews"
+    comments = f"{reviews}/{review.id}/comments"
+    return [
+        Route("categories-list", get("/api/v1/categories/")),
+        Route("genres-list", get("/api/v1/genres/")),
+        Route("titles-list", get("/api/v1/titles/")),
+        Route(
+            "titles-list-filtered",
+            get("/api/v1/titles/?genre=genre-1&year__gte=1990"),
+        ),
+        Route("titles-detail", get(f"{titles}/")),
+        Route(
+            "titles-bulk",
+            lambda i: (
+                "patch",
+                "/api/v1/titles/bulk/",
+                [{"id": title.id, "description": f"Нагрузка {i}"}],
+            ),
+            user=admin,
+            format="json",
+        ),
+        Route("review-list", get(f"{reviews}/")),
+        Route("review-list-cursor", get(f"{reviews}/?cursor=")),
+        Route("review-detail", get(f"{reviews}/{review.id}/")),
+        Route("comment-list", get(f"{comments}/")),
+        Route("comment-detail", get(f"{comments}/{comment.id}/")),
+        Route("search-titles", get("/api/v1/search/?q=произведение")),
+        Route(
+            "search-reviews", get("/api/v1/search/?q=отзыв&type=reviews")
+        ),
+        Route(
+            "categories-create",
+            lambda i: (
+                "post",
+                "/api/v1/categories/",
+                {"name": f"Нагрузка {i}", "slug": f"load-{i}"},
+            ),
+            expected=201,
+            user=admin,
+        ),
+        Route(
+            "categories-delete",
+            lambda i: ("delete", f"/api/v1/categories/load-{i}/", None),
+            expected=204,
+            user=admin,
+        ),
+        Route(
+            "genres-create",
+            lambda i: (
+                "post",
+                "/api/v1/genres/",
+                {"name": f"Нагрузка {i}", "slug": f"load-{i}"},
+            ),
+            expected=201,
+            user=admin,
+        ),
+        Route(
+            "genres-delete",
+            lambda i: ("delete", f"/api/v1/genres/load-{i}/", None),
+            expected=204,
+            user=admin,
+        ),
+        Route(
+            "export-titles",
+            get("/api/v1/export/titles.ndjson"),
+            user=admin,
+        ),
+        Route(
+            "export-reviews",
+            get("/api/v1/export/reviews.ndjson"),
+            user=admin,
+        ),
+        Route(
+            "export-comments",
+            get("/api/v1/export/comments.ndjson"),
+            user=admin,
+        ),
+        Route("users-list", get("/api/v1/users/"), user=admin),
+        Route(
+            "users-detail",
+            get(f"/api/v1/users/{user.username}/"),
+            user=admin,
+        ),
+        Route("users-me", get("/api/v1/users/me/"), user=user),
+        Route(
+            "signup",
+            lambda i: (
+                "post",
+                "/api/v1/auth/signup/",
+                {"username": f"load{i}", "email": f"load{i}@ya.ru"},
+            ),
+        ),
+        Route("token", token_request(user)),
+        Route(
+            "comment-create",
+            lambda i: ("post", f"{comments}/", {"text": f"Нагрузка {i}"}),
+            expected=201,
+            user=user,
+        ),
+        Route(
+            "review-update",
+            lambda i: (
+                "patch", f"{reviews}/{review.id}/", {"score": i % 10 + 1}
+            ),
+            user=review.author,
+        ),
+    ]
+
+
+def token_request(user):
+    from users.confirmation import make_confirmation_code
+
+    code = make_confirmation_code(user)
+    return lambda i: (
+        "post",
+        "/api/v1/auth/token/",
+        {"username": user.username, "confirmation_code": code},
+    )
+
+
+def url_names(patterns):
+    for pattern in patterns:
+        if hasattr(pattern, "url_patterns"):
+            yield from url_names(pattern.url_patterns)
+        elif pattern.name and pattern.name != "api-root":
+            yield pattern.name
+
+
+def check_coverage(route_list):
+    """Fail loudly when api/urls.py gains a URL the load test skips."""
+    from api.urls import urlpatterns
+    from django.urls import resolve
+
+    covered = {
+        resolve(urlsplit(route.build(0)[1]).path).url_name
+        for route in route_list
+    }
+    missing = set(url_names(urlpatterns)) - covered
+    if missing:
+        raise SystemExit(f"Routes without load: {', '.join(sorted(missing))}")
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run(iterations):
+    from api.authentication import ClaimsAccessToken
+    from django.db import connection
+    from django.test.utils import (CaptureQueriesContext, override_settings,
+                                   setup_test_environment)
+    from rest_framework.test import APIClient
+    from reviews.models import Comment, Review, Title
+    from users.models import User
+
+    setup_test_environment()
+    # The seeded reviews and comments are only seconds old.
+    override_settings(EXPORT_WATERMARK_LAG=0).enable()
+    common.seed()
+    title = Title.objects.order_by("id").first()
+    review = Review.objects.filter(title=title).order_by("id").first()
+    comment = Comment.objects.filter(review=review).order_by("id").first()
+    admin = User.objects.get(role=User.ADMIN)
+    user = User.objects.filter(role=User.USER).order_by("id").first()
+    route_list = routes(title, review, comment, admin, user)
+    check_coverage(route_list)
+    clients = {}
+    for account in {route.user for route in route_list}:
+        clients[account] = APIClient()
+        if account is not None:
+            clients[account].credentials(
+                HTTP_AUTHORIZATION=(
+                    f"Bearer {ClaimsAccessToken.for_user(account)}"
+                )
+            )
+    samples = {route.name: [] for route in route_list}
+    started = time.perf_counter()
+    for i in range(iterations):
+        for j, route in enumerate(route_list):
+            method, path, data = route.build(i)
+            # One client address per request, the throttles are per IP.
+            address = f"10.{i >> 8 & 255}.{i & 255}.{j}"
+            extra = {"format": route.format} if route.format else {}
+            with CaptureQueriesContext(connection) as context:
+                request_started = time.perf_counter()
+                response = getattr(clients[route.user], method)(
+                    path, data, REMOTE_ADDR=address, **extra
+                )
+                if response.streaming:
+                    b"".join(response.streaming_content)
+                elapsed = time.perf_counter() - request_started
+            samples[route.name].append((
+                elapsed,
+                len(context.captured_queries),
+                response.status_code == route.expected,
+            ))
+    total = time.perf_counter() - started
+    result = {
+        "meta": {
+            "vendor": connection.vendor,
+            "iterations": iterations,
+            "created": datetime.now().isoformat(timespec="seconds"),
+        },
+        "total": {
+            "requests": iterations * len(route_list),
+            "seconds": total,
+            "rps": iterations * len(route_list) / total,
+        },
+        "routes": {},
+    }
+    for name, route_samples in samples.items():
+        latencies = [sample[0] * 1000 for sample in route_samples]
+        result["routes"][name] = {
+            "p50_ms": percentile(latencies, 0.5),
+            "p95_ms": percentile(latencies, 0.95),
+            "p99_ms": percentile(latencies, 0.99),
+            "queries": sum(s[1] for s in route_samples) / len(route_samples),
+            "errors": sum(1 for s in route_samples if not s[2]),
+        }
+    return result
+
+
+def compare(result, baseline, threshold, min_delta_ms=0.5):
+    """Regressions of ``result`` against ``baseline``, as messages."""
+    problems = []
+    for name, current in result["routes"].items():
+        if current["errors"]:
+            problems.append(f"{name}: {current['errors']} failed requests")
+        previous = baseline["routes"].get(name)
+        if previous is None:
+            continue
+        if current["queries"] > previous["queries"] + 0.01:
+            problems.append(
+                f"{name}: {current['queries']:.2f} queries per request, "
+                f"was {previous['queries']:.2f}"
+            )
+        limit = previous["p95_ms"] * (1 + threshold)
+        if current["p95_ms"] > max(limit, previous["p95_ms"] + min_delta_ms):
+            problems.append(
+                f"{name}: p95 {current['p95_ms']:.2f} ms, "
+                f"was {previous['p95_ms']:.2f} ms"
+            )
+    if result["total"]["rps"] < baseline["total"]["rps"] * (1 - threshold):
+        problems.append(
+            f"total: {result['total']['rps']:.0f} req/s, "
+            f"was {baseline['total']['rps']:.0f} req/s"
+        )
+    return problems
+
+
+def report(result):
+    print(
+        f"{'route':<22}{'p50, ms':>9}{'p95, ms':>9}{'p99, ms':>9}"
+        f"{'queries':>9}{'errors':>8}"
+    )
+    for name, route in result["routes"].items():
+        print(
+            f"{name:<22}{route['p50_ms']:>9.2f}{route['p95_ms']:>9.2f}"
+            f"{route['p99_ms']:>9.2f}{route['queries']:>9.2f}"
+            f"{route['errors']:>8}"
+        )
+    print(f"total: {result['total']['rps']:.0f} req/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--output")
+    parser.add_argument("--baseline")
+    parser.add_argument("--threshold", type=float, default=0.25)
+    parser.add_argument("--update", action="store_true")
+    args = parser.parse_args()
+    common.setup()
+    with common.test_database():
+        result = run(args.iterations)
+    report(result)
+    if args.output:
+        with open(args.output, "w", encoding="utf8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+    if not args.baseline:
+        return
+    if args.update:
+        with open(args.baseline, "w", encoding="utf8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+        return
+    with open(args.baseline, encoding="utf8") as f:
+        problems = compare(result, json.load(f), args.threshold)
+    for problem in problems:
+        print(f"REGRESSION {problem}", file=sys.stderr)
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Serialization throughput of 1k-row pages, DRF serializers vs rows.
+
+    python benchmarks/bench_serialization.py --rows 1000
+
+For titles, reviews and comments it times one page of ``--rows``
+objects from the query to the JSON bytes, twice: the model serializer
+with JSONRenderer, and the row serializer of api/rows.py with
+FastJSONRenderer (orjson when installed). Prints objects per second for
+both and checks that the bytes are the same.
+"""
+import argparse
+
+import common
+
+
+def pages(size):
+    from api.renderers import FastJSONRenderer
+    from api.rows import RowSerializer, TitleRowSerializer
+    from api.serializers import (CommentSerializer, ReviewSerializer,
+                                 TitleSerializer)
+    from api.views import GENRES_BY_ID
+    from rest_framework.renderers import JSONRenderer
+    from reviews.models import Comment, Review, Title
+
+    cases = (
+        (
+            "titles",
+            Title.objects.select_related("category")
+            .prefetch_related(GENRES_BY_ID)
+            .order_by("id"),
+            TitleSerializer,
+            TitleRowSerializer(TitleSerializer),
+        ),
+        (
+            "reviews",
+            Review.objects.select_related("author").order_by("id"),
+            ReviewSerializer,
+            RowSerializer(ReviewSerializer),
+        ),
+        (
+            "comments",
+            Comment.objects.select_related("author").order_by("id"),
+            CommentSerializer,
+            RowSerializer(CommentSerializer),
+        ),
+    )
+    for name, queryset, serializer_class, row_serializer in cases:
+
+        def before():
+            return JSONRenderer().render(
+                serializer_class(queryset[:size], many=True).data
+            )
+
+        def after():
+            rows = list(row_serializer.get_values(queryset)[:size])
+            return FastJSONRenderer().render(
+                row_serializer.to_representation(rows)
+            )
+
+        yield name, before, after
+
+
+def run(size):
+    from django.test.utils import setup_test_environment
+
+    setup_test_environment()
+    common.seed(titles=size, reviews_per_title=5, comments_per_review=2)
+    print(f"{'page':<10}{'before, obj/s':>15}{'after, obj/s':>15}"
+          f"{'speedup':>9}")
+    for name, before, after in pages(size):
+        assert before() == after(), f"{name}: the outputs differ"
+        before_rate = size / common.measure(before)
+        after_rate = size / common.measure(after)
+        print(
+            f"{name:<10}{before_rate:>15.0f}{after_rate:>15.0f}"
+            f"{after_rate / before_rate:>8.1f}x"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1000)
+    args = parser.parse_args()
+    common.setup()
+    with common.test_database():
+        run(args.rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Title filter and search queries with and without the catalog indexes.
+
+    python benchmarks/bench_title_indexes.py --titles 1000000 --keepdb
+
+Fills the test database with ``--titles`` rows (once, with ``--keepdb``),
+then times each FilterTitle/SearchFilter query as the API runs it
+(COUNT(*) plus the first page) with the indexes in place, and again inside
+a transaction that drops them and is rolled back. Trigram indexes only
+exist on PostgreSQL.
+"""
+import argparse
+import random
+
+import common
+
+INDEXES = (
+    "title_year_idx",
+    "title_category_year_idx",
+    "title_name_trgm_idx",
+    "category_name_trgm_idx",
+)
+WORDS = (
+    "война", "мир", "отец", "побег", "звезда", "ночь", "город", "море",
+    "тень", "песня", "остров", "время", "путь", "дом", "небо", "огонь",
+)
+
+
+def fill(count, batch_size=10000):
+    from reviews.bulk import RowBuilder, insert_rows
+    from reviews.models import Category, Title
+
+    if Title.objects.count() >= count:
+        return
+    Title.objects.all().delete()
+    Category.objects.all().delete()
+    categories = [
+        Category.objects.create(name=f"Категория {i}", slug=f"category-{i}")
+        for i in range(20)
+    ]
+    builder = RowBuilder(Title, ("id", "name", "year", "category_id"))
+    rng = random.Random(0)
+    for start in range(0, count, batch_size):
+        rows = [
+            builder.build((
+                str(pk),
+                f"{rng.choice(WORDS)} {rng.choice(WORDS)} {pk}",
+                str(rng.randint(1900, 2022)),
+                str(rng.choice(categories).pk),
+            ))
+            for pk in range(start + 1, min(start + batch_size, count) + 1)
+        ]
+        insert_rows(Title, rows)
+
+
+def queries():
+    from api.filters import FilterTitle
+    from reviews.models import Category, Title
+
+    def title_filter(**params):
+        return FilterTitle(params, Title.objects.order_by("id")).qs
+
+    return {
+        "name contains (rare)": title_filter(name="999"),
+        "name contains (common)": title_filter(name="звезда"),
+        "year": title_filter(year=1984),
+        "year + category": title_filter(year=1984, category="category-7"),
+        "category search": Category.objects.filter(name__icontains="ия 1"),
+    }
+
+
+def run(connection, repeat):
+    from django.db import transaction
+
+    def timings():
+        return {
+            name: common.measure(
+                lambda: (queryset.count(), list(queryset[:5])), repeat
+            )
+            for name, queryset in queries().items()
+        }
+
+    indexed = timings()
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            for index in INDEXES:
+                cursor.execute(f"DROP INDEX IF EXISTS {index}")
+        plain = timings()
+        transaction.set_rollback(True)
+    print(f"{'query':<25}{'indexed, ms':>14}{'no index, ms':>14}{'x':>8}")
+    for name in indexed:
+        print(
+            f"{name:<25}{indexed[name] * 1000:>14.2f}"
+            f"{plain[name] * 1000:>14.2f}"
+            f"{plain[name] / indexed[name]:>8.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--titles", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--keepdb", action="store_true")
+    args = parser.parse_args()
+    common.setup()
+    with common.test_database(keepdb=args.keepdb) as connection:
+        fill(args.titles)
+        run(connection, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Shared setup for the benchmark scripts.
+
+Benchmarks never touch the configured database: they run against the
+test database Django creates next to it (``test_<NAME>``), which is
+dropped afterwards unless ``keepdb`` is set.
+"""
+import os
+import statistics
+import sys
+import time
+from contextlib import contextmanager
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, "api_yamdb"))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "api_yamdb.settings")
+
+
+def setup():
+    import django
+
+    django.setup()
+
+
+@contextmanager
+def test_database(keepdb=False):
+    from django.db import connection
+
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0, keepdb=keepdb)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(
+            old_name, verbosity=0, keepdb=keepdb
+        )
+
+
+def measure(func, repeat=5):
+    """Median wall time of ``func()`` in seconds, after one warm-up call."""
+    func()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def seed(titles=200, users=50, reviews_per_title=5, comments_per_review=2,
+         random_seed=0):
+    """Fill an empty database with a small deterministic dataset."""
+    import random
+
+    from reviews.models import Category, Comment, Genre, Review, Title
+    from users.models import User
+
+    rng = random.Random(random_seed)
+    categories = Category.objects.bulk_create(
+        Category(name=f"Категория {i}", slug=f"category-{i}")
+        for i in range(5)
+    )
+    Genre.objects.bulk_create(
+        Genre(name=f"Жанр {i}", slug=f"genre-{i}") for i in range(8)
+    )
+    User.objects.bulk_create(
+        User(
+            username=f"user{i}",
+            email=f"user{i}@ya.ru",
+            role=User.ADMIN if i == 0 else User.USER,
+        )
+        for i in range(users)
+    )
+    Title.objects.bulk_create(
+        Title(
+            name=f"Произведение {i}",
+            year=rng.randint(1950, 2022),
+            description=f"Описание произведения {i}",
+            category=rng.choice(categories),
+        )
+        for i in range(titles)
+    )
+    # bulk_create does not return ids on every backend, read them back.
+    title_ids = list(Title.objects.values_list("id", flat=True))
+    user_ids = list(User.objects.values_list("id", flat=True))
+    genre_ids = [genre.id for genre in Genre.objects.all()]
+    Title.genre.through.objects.bulk_create(
+        Title.genre.through(title_id=title_id, genre_id=genre_id)
+        for title_id in title_ids
+        for genre_id in rng.sample(genre_ids, 2)
+    )
+    Review.objects.bulk_create(
+        Review(
+            title_id=title_id,
+            author_id=author_id,
+            text=f"Отзыв {title_id}-{author_id}",
+            score=rng.randint(1, 10),
+        )
+        for title_id in title_ids
+        for author_id in rng.sample(user_ids, reviews_per_title)
+    )
+    Comment.objects.bulk_create(
+        Comment(
+            review_id=review_id,
+            author_id=rng.choice(user_ids),
+            text=f"Комментарий {review_id}-{i}",
+        )
+        for review_id in Review.objects.values_list("id", flat=True)
+        for i in range(comments_per_review)
+    )
+    Title.objects.rebuild_ratings()
+    Title.objects.update_search_vector()
+    Review.objects.update_search_vector()
@@ -0,0 +1,122 @@
+"""Minimal asyncio HTTP/1.1 load generator, standard library only.
+
+``run(url, paths, concurrency, requests)`` opens ``concurrency`` client
+connections to ``url`` and sends ``requests`` GETs in total, cycling
+through ``paths``. Connections are kept alive while the server allows it.
+``slow`` makes every client send the request in two halves that far
+apart, like a client on a bad network.
+"""
+import asyncio
+import statistics
+import time
+from urllib.parse import urlsplit
+
+
+async def send_request(reader, writer, host, path, slow, headers=None):
+    lines = [f"GET {path} HTTP/1.1", f"Host: {host}", "Accept: */*"]
+    lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+    data = ("\r\n".join(lines) + "\r\n\r\n").encode()
+    if slow:
+        writer.write(data[:len(data) // 2])
+        await writer.drain()
+        await asyncio.sleep(slow)
+        data = data[len(data) // 2:]
+    writer.write(data)
+    await writer.drain()
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("Connection closed by the server")
+    status = int(status_line.split()[1])
+    response_headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        response_headers[name.strip().lower()] = value.strip()
+    if "content-length" in response_headers:
+        body = await reader.readexactly(
+            int(response_headers["content-length"])
+        )
+    elif response_headers.get("transfer-encoding") == "chunked":
+        body = b""
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            body += await reader.readexactly(size + 2)
+            if not size:
+                break
+    else:
+        body = await reader.read()
+        response_headers["connection"] = "close"
+    return status, response_headers, body
+
+
+async def client(url, paths, counter, results, slow, headers):
+    parts = urlsplit(url)
+    port = parts.port or 80
+    connection = None
+    while counter:
+        index = counter.pop()
+        path = paths[index % len(paths)]
+        started = time.perf_counter()
+        try:
+            if connection is None:
+                connection = await asyncio.open_connection(
+                    parts.hostname, port
+                )
+            status, response_headers, _ = await send_request(
+                *connection, parts.netloc, path, slow, headers
+            )
+        except (OSError, ValueError, asyncio.IncompleteReadError):
+            results.append((path, None, time.perf_counter() - started))
+            connection = None
+            continue
+        results.append((path, status, time.perf_counter() - started))
+        if response_headers.get("connection", "").lower() == "close":
+            connection[1].close()
+            connection = None
+    if connection is not None:
+        connection[1].close()
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def summarize(results, elapsed):
+    latencies = [latency for _, status, latency in results if status]
+    errors = sum(1 for _, status, _ in results if status is None or (
+        status >= 500
+    ))
+    return {
+        "requests": len(results),
+        "errors": errors,
+        "seconds": elapsed,
+        "rps": len(results) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 0.5) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "mean_ms": (statistics.mean(latencies) * 1000 if latencies else 0.0),
+    }
+
+
+def run(url, paths, concurrency=50, requests=2000, slow=0.0, headers=None):
+    """Load ``url`` and return the summary plus the per-request results.
+
+    Each result is ``(path, status or None, seconds)``.
+    """
+
+    async def main():
+        counter = list(range(requests))
+        results = []
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            client(url, paths, counter, results, slow, headers)
+            for _ in range(concurrency)
+        ))
+        return results, time.perf_counter() - started
+
+    results, elapsed = asyncio.run(main())
+    return summarize(results, elapsed), results
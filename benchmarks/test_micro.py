@@ -0,0 +1,75 @@
+"""Micro-benchmarks of the serializers and permission classes.
+
+    pytest benchmarks/ --benchmark-autosave
+    pytest benchmarks/ --benchmark-compare --benchmark-compare-fail=mean:20%
+
+Needs pytest-benchmark. Objects are loaded before timing, so only the
+Python side of serialization and permission checks is measured.
+"""
+import common
+import pytest
+from api.authentication import ClaimsAccessToken, ClaimsUser
+from api.permissions import (IsAdminOrSuperuser, IsAdminOrSuperuserOrReadOnly,
+                             IsAuthorOrStaffOrReadOnly)
+from api.serializers import ReviewSerializer, TitleSerializer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from reviews.models import Review, Title
+from users.models import User
+
+
+@pytest.fixture
+def dataset(db):
+    common.seed(titles=100, users=20)
+
+
+@pytest.fixture
+def titles(dataset):
+    return list(
+        Title.objects.select_related("category")
+        .prefetch_related("genre")
+        .with_rating()
+        .order_by("id")
+    )
+
+
+@pytest.fixture
+def reviews(dataset):
+    return list(Review.objects.select_related("author").order_by("id")[:100])
+
+
+def test_title_serializer(benchmark, titles):
+    data = benchmark(lambda: TitleSerializer(titles, many=True).data)
+
+    assert len(data) == 100
+
+
+def test_review_serializer(benchmark, reviews):
+    data = benchmark(lambda: ReviewSerializer(reviews, many=True).data)
+
+    assert len(data) == 100
+
+
+@pytest.mark.parametrize("method", ["get", "patch"])
+def test_permissions(benchmark, reviews, method):
+    user = ClaimsUser(
+        ClaimsAccessToken.for_user(User.objects.get(username="user1"))
+    )
+    request = Request(getattr(APIRequestFactory(), method)("/"))
+    request.user = user
+    permissions = (
+        IsAuthorOrStaffOrReadOnly(),
+        IsAdminOrSuperuserOrReadOnly(),
+        IsAdminOrSuperuser(),
+    )
+
+    def check():
+        allowed = 0
+        for review in reviews:
+            for permission in permissions:
+                allowed += permission.has_permission(request, None) and (
+                    permission.has_object_permission(request, None, review)
+                )
+        return allowed
+
+    assert benchmark(check) >= 0
@@ -1,9 +1,46 @@
 import sys
 from os.path import abspath, dirname, join
 
+import pytest
+
 root_dir = dirname(dirname(abspath(__file__)))
 sys.path.append(root_dir)
 infra_dir_path = join(root_dir, 'infra')
 
 pytest_plugins = [
 ]
+
+
+@pytest.fixture(autouse=True)
+def inspect_queries(settings):
+    settings.QUERY_INSPECTOR = 'raise'
+
+
+@pytest.fixture(autouse=True)
+def shared_cache(settings):
+    """A cache shared by all workers, as SHARED_CACHE_URL configures."""
+    from django.core.cache import caches
+
+    settings.CACHES = {
+        **settings.CACHES,
+        'shared': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'yamdb-shared',
+        },
+    }
+    caches['shared'].clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_caches(shared_cache):
+    from api import search
+    from api.throttling import get_store
+    from django.core.cache import caches
+    from reviews.models import Review, Title
+
+    for cache in caches.all():
+        cache.clear()
+    get_store().clear()
+    # Only a commit drops the search indexes, see api/signals.py.
+    for model in (Title, Review):
+        search.invalidate(model)
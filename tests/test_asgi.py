@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+from django.core.signals import request_finished, request_started
+from rest_framework.test import APIClient
+from reviews.models import Title
+
+from api_yamdb.db.pool import ConnectionPool
+
+
+def asgi_get(path):
+    from api_yamdb.asgi import application
+
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        'type': 'http',
+        'http_version': '1.1',
+        'scheme': 'http',
+        'method': 'GET',
+        'path': path,
+        'query_string': b'',
+        'headers': [(b'host', b'testserver')],
+        'server': ('testserver', 80),
+    }
+    asyncio.run(application(scope, receive, send))
+    status = messages[0]['status']
+    body = b''.join(message.get('body', b'') for message in messages[1:])
+    return status, body
+
+
+@pytest.mark.django_db(transaction=True)
+class TestAsgi:
+
+    def test_same_response_as_wsgi(self):
+        title = Title.objects.create(name='Солярис', year=1972)
+        path = f'/api/v1/titles/{title.id}/'
+
+        status, body = asgi_get(path)
+
+        assert status == 200
+        assert body == APIClient().get(path).content, (
+            'Проверьте, что ASGI отдаёт тот же ответ, что и WSGI'
+        )
+
+    def test_request_finished(self):
+        finished = []
+
+        def receiver(**kwargs):
+            finished.append(True)
+
+        request_finished.connect(receiver)
+        try:
+            status, _ = asgi_get('/api/v1/categories/')
+        finally:
+            request_finished.disconnect(receiver)
+
+        assert status == 200
+        assert finished == [True], (
+            'Проверьте, что под ASGI отправляется сигнал request_finished'
+        )
+
+    def test_connection_returned_to_pool(self):
+        # Like the pooled backend: a connection is taken when a request
+        # starts and given back when Django closes it at its end.
+        pool = ConnectionPool(1, timeout=0.1)
+        taken = []
+
+        def take(**kwargs):
+            taken.append(pool.get(object))
+
+        def give_back(**kwargs):
+            if taken:
+                pool.put(taken.pop())
+
+        request_started.connect(take)
+        request_finished.connect(give_back)
+        try:
+            statuses = [asgi_get('/api/v1/genres/')[0] for _ in range(3)]
+        finally:
+            request_started.disconnect(take)
+            request_finished.disconnect(give_back)
+
+        assert statuses == [200, 200, 200]
+        assert pool.stats()['in_use'] == 0, (
+            'Проверьте, что соединение возвращается в пул после запроса'
+        )
+        assert pool.stats()['timeouts'] == 0
@@ -0,0 +1,186 @@
+import pytest
+from api.authentication import ClaimsAccessToken
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from jobs.models import Job
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from users.confirmation import make_confirmation_code
+from users.models import User
+
+USERS_URL = '/api/v1/users/'
+
+
+def client_for(token):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+    return client
+
+
+def user_queries(queries):
+    return [
+        query['sql'] for query in queries
+        if User._meta.db_table in query['sql']
+    ]
+
+
+@pytest.mark.django_db
+class TestClaimsAuthentication:
+
+    def test_token_carries_role_claims(self):
+        admin = User.objects.create(
+            username='admin', email='admin@ya.ru', role='admin'
+        )
+
+        response = APIClient().post(
+            '/api/v1/auth/token/',
+            {
+                'username': 'admin',
+                'confirmation_code': make_confirmation_code(admin),
+            },
+        )
+
+        token = AccessToken(response.json()['access'])
+        assert token['role'] == 'admin'
+        assert token['is_superuser'] is False
+
+    def test_permission_check_without_user_query(self):
+        admin = User.objects.create(
+            username='admin', email='admin@ya.ru', role='admin'
+        )
+        client = client_for(self.token(admin))
+
+        with CaptureQueriesContext(connection) as context:
+            response = client.delete(f'{USERS_URL}nobody/')
+
+        assert response.status_code == 404
+        assert len(user_queries(context.captured_queries)) == 1, (
+            'Проверьте, что пользователь запроса не загружается из БД'
+        )
+
+    def test_role_change_revokes_claims(self):
+        admin = User.objects.create(
+            username='admin', email='admin@ya.ru', role='admin'
+        )
+        other = User.objects.create(
+            username='other', email='other@ya.ru', role='admin'
+        )
+        client = client_for(self.token(admin))
+        assert client.get(USERS_URL).status_code == 200
+
+        client_for(self.token(other)).patch(
+            f'{USERS_URL}admin/', {'role': 'user'}
+        )
+
+        assert client.get(USERS_URL).status_code == 403, (
+            'Проверьте, что смена роли сразу отзывает права токена'
+        )
+
+    def test_claims_need_shared_cache(self, settings):
+        admin = User.objects.create(
+            username='admin', email='admin@ya.ru', role='admin'
+        )
+        client = client_for(self.token(admin))
+        settings.CACHES = {
+            name: cache
+            for name, cache in settings.CACHES.items()
+            if name != 'shared'
+        }
+        # update() sends no signals: the revocation mark of another
+        # worker would not be seen without a shared cache.
+        User.objects.filter(pk=admin.pk).update(role='user')
+
+        assert client.get(USERS_URL).status_code == 403, (
+            'Проверьте, что без общего кэша права берутся из БД'
+        )
+
+    def test_profile_edit_keeps_claims(self):
+        user = User.objects.create(username='user', email='user@ya.ru')
+        client = client_for(self.token(user))
+        client.patch(f'{USERS_URL}me/', {'bio': 'Кинокритик'})
+
+        with CaptureQueriesContext(connection) as context:
+            client.get('/api/v1/titles/')
+
+        assert not user_queries(context.captured_queries)
+
+    def test_deleted_user_is_rejected(self):
+        user = User.objects.create(username='user', email='user@ya.ru')
+        token = self.token(user)
+        user.delete()
+
+        assert client_for(token).get(f'{USERS_URL}me/').status_code == 401
+
+    def test_token_without_claims(self):
+        user = User.objects.create(username='user', email='user@ya.ru')
+
+        response = client_for(AccessToken.for_user(user)).get(
+            f'{USERS_URL}me/'
+        )
+
+        assert response.status_code == 200
+        assert response.json()['username'] == 'user'
+
+    @staticmethod
+    def token(user):
+        return ClaimsAccessToken.for_user(user)
+
+
+@pytest.mark.django_db
+class TestConfirmationCodes:
+
+    def signup(self, username='user', email='user@ya.ru'):
+        response = APIClient().post(
+            '/api/v1/auth/signup/',
+            {'username': username, 'email': email},
+        )
+        assert response.status_code == 200
+        message = Job.objects.order_by('id').last().get_payload()['message']
+        return message.rsplit(' ', 1)[-1]
+
+    def get_token(self, code, username='user'):
+        with CaptureQueriesContext(connection) as context:
+            response = APIClient().post(
+                '/api/v1/auth/token/',
+                {'username': username, 'confirmation_code': code},
+            )
+        assert len(user_queries(context.captured_queries)) == 1
+        return response
+
+    def test_signup_and_token(self):
+        with CaptureQueriesContext(connection) as context:
+            code = self.signup()
+        assert len(user_queries(context.captured_queries)) == 1, (
+            'Проверьте, что регистрация выполняет один запрос к пользователям'
+        )
+
+        response = self.get_token(code)
+
+        assert response.status_code == 200
+        assert AccessToken(response.json()['access'])['user_id'] == (
+            User.objects.get(username='user').id
+        )
+
+    def test_code_expires(self, settings):
+        code = self.signup()
+        settings.CONFIRMATION_CODE_MAX_AGE = -1
+
+        assert self.get_token(code).status_code == 400
+
+    def test_new_signup_replaces_code(self):
+        old_code = self.signup()
+        new_code = self.signup()
+
+        assert self.get_token(old_code).status_code == 400
+        assert self.get_token(new_code).status_code == 200
+
+    def test_taken_email(self):
+        self.signup()
+
+        response = APIClient().post(
+            '/api/v1/auth/signup/',
+            {'username': 'other', 'email': 'user@ya.ru'},
+        )
+
+        assert response.status_code == 400
+        assert 'email' in response.json()
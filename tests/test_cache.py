@@ -0,0 +1,74 @@
+import pytest
+from api import cache
+from django.db import transaction
+from rest_framework.test import APIClient
+from reviews.models import Category, Review, Title
+from users.models import User
+
+
+@pytest.fixture
+def titles():
+    category = Category.objects.create(name='Фильм', slug='movie')
+    return [
+        Title.objects.create(name=f'Фильм {i}', year=2000, category=category)
+        for i in range(2)
+    ]
+
+
+@pytest.mark.django_db
+class TestResponseCache:
+
+    def test_repeated_reads_are_cached(self, titles,
+                                       django_assert_num_queries):
+        client = APIClient()
+        first = client.get('/api/v1/titles/')
+
+        # Only the conditional GET validators.
+        with django_assert_num_queries(1):
+            second = client.get('/api/v1/titles/')
+
+        assert second.json() == first.json()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_review_invalidates_only_its_title(self, titles,
+                                               django_assert_num_queries):
+        client = APIClient()
+        first_url = f'/api/v1/titles/{titles[0].id}/'
+        second_url = f'/api/v1/titles/{titles[1].id}/'
+        client.get(first_url)
+        client.get(second_url)
+
+        author = User.objects.create(username='critic', email='c@ya.ru')
+        Review.objects.create(
+            title=titles[0], author=author, text='Отлично', score=9
+        )
+
+        with django_assert_num_queries(1):
+            client.get(second_url)
+        assert client.get(first_url).json()['rating'] == 9
+        assert client.get('/api/v1/titles/').json()['results'][0][
+            'rating'] == 9
+
+    @pytest.mark.django_db(transaction=True)
+    def test_category_change_invalidates_titles(self, titles):
+        client = APIClient()
+        client.get('/api/v1/titles/')
+
+        category = Category.objects.get(slug='movie')
+        category.name = 'Кино'
+        category.save()
+
+        response = client.get('/api/v1/titles/')
+        assert response.json()['results'][0]['category']['name'] == 'Кино'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_tokens_bumped_on_commit(self, titles):
+        token = cache.get_tokens(['categories'])['categories']
+
+        with transaction.atomic():
+            Category.objects.create(name='Книга', slug='book')
+            assert cache.get_tokens(['categories'])['categories'] == token, (
+                'Проверьте, что версия меняется только после коммита'
+            )
+
+        assert cache.get_tokens(['categories'])['categories'] != token
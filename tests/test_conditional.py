@@ -0,0 +1,154 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from reviews.models import Comment, Review, Title
+from users.models import User
+
+
+@pytest.fixture
+def title():
+    return Title.objects.create(name='Сталкер', year=1979)
+
+
+@pytest.fixture
+def review(title):
+    author = User.objects.create(username='critic', email='critic@ya.ru')
+    return Review.objects.create(
+        title=title, author=author, text='Зона', score=9
+    )
+
+
+@pytest.mark.django_db
+class TestConditionalGet:
+
+    def test_reviews_not_modified(self, title, review,
+                                  django_assert_num_queries):
+        client = APIClient()
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        etag = client.get(url)['ETag']
+
+        with django_assert_num_queries(1):
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == 304
+        assert response['ETag'] == etag
+
+    def test_review_edit_changes_etag(self, title, review):
+        client = APIClient()
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        etag = client.get(url)['ETag']
+
+        review.text = 'Комната'
+        review.save()
+
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response.json()['results'][0]['text'] == 'Комната'
+
+    def test_reviews_cursor_etag_without_count(self, title, review):
+        client = APIClient()
+        url = f'/api/v1/titles/{title.id}/reviews/?cursor='
+        etag = client.get(url)['ETag']
+
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == 304
+        assert not any(
+            'COUNT(' in query['sql'] for query in context.captured_queries
+        ), 'Проверьте, что валидаторы списка отзывов не считают строки'
+
+    def test_comments_etag_follows_comments(self, title, review):
+        client = APIClient()
+        url = f'/api/v1/titles/{title.id}/reviews/{review.id}/comments/'
+        comment = Comment.objects.create(
+            review=review, author=review.author, text='Да'
+        )
+        etag = client.get(url)['ETag']
+        assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+        comment.text = 'Нет'
+        comment.save()
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        etag = response['ETag']
+
+        comment.delete()
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что удаление комментария меняет ETag списка'
+        )
+        assert response.json()['results'] == []
+
+    def test_title_if_modified_since(self, title):
+        client = APIClient()
+        url = f'/api/v1/titles/{title.id}/'
+        last_modified = client.get(url)['Last-Modified']
+
+        response = client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        assert response.status_code == 304
+
+    @pytest.mark.django_db(transaction=True)
+    def test_title_etag_follows_reviews(self, title, review,
+                                        django_assert_num_queries):
+        client = APIClient()
+        url = f'/api/v1/titles/{title.id}/'
+        etag = client.get(url)['ETag']
+
+        with django_assert_num_queries(1):
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+
+        review.score = 3
+        review.save()
+
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response.json()['rating'] == 3
+
+    def test_title_etag_without_token_bump(self, title, settings):
+        # Responses expire at once, the version tokens stay.
+        settings.RESPONSE_CACHE_TIMEOUT = 0
+        client = APIClient()
+        url = f'/api/v1/titles/{title.id}/'
+        etag = client.get(url)['ETag']
+
+        # update() sends no signals, like a change made on another worker
+        # whose token bumps this one never sees.
+        Title.objects.filter(pk=title.pk).update(
+            name='Солярис', modified=timezone.now()
+        )
+
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что ETag произведения следует Title.modified'
+        )
+        assert response.json()['name'] == 'Солярис'
+
+    def test_title_list_etag(self, title):
+        client = APIClient()
+        etag = client.get('/api/v1/titles/')['ETag']
+
+        assert client.get(
+            '/api/v1/titles/', HTTP_IF_NONE_MATCH=etag
+        ).status_code == 304
+        Title.objects.create(name='Солярис', year=1972)
+
+        assert client.get(
+            '/api/v1/titles/', HTTP_IF_NONE_MATCH=etag
+        ).status_code == 200
+
+    def test_title_list_validators_are_cheap(self, title):
+        client = APIClient()
+        client.get('/api/v1/titles/?genre=drama')
+
+        with CaptureQueriesContext(connection) as context:
+            client.get('/api/v1/titles/?genre=drama')
+
+        assert len(context.captured_queries) == 1, (
+            'Проверьте, что ответ из кэша стоит одного запроса валидаторов'
+        )
+        assert 'JOIN' not in context.captured_queries[0]['sql']
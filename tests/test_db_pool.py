@@ -0,0 +1,58 @@
+import time
+
+import pytest
+
+from api_yamdb.db import pool as pool_module
+from api_yamdb.db.pool import ConnectionPool, PoolTimeoutError
+
+
+class FakeConnection:
+
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class TestConnectionPool:
+
+    def test_connections_are_reused(self):
+        pool = ConnectionPool(2)
+        first = pool.get(FakeConnection)
+        pool.put(first)
+
+        assert pool.get(FakeConnection) is first, (
+            'Проверьте, что возвращённое соединение используется повторно'
+        )
+        assert pool.stats()['connects'] == 1
+        assert pool.stats()['in_use'] == 1
+
+    def test_checkout_timeout(self):
+        pool = ConnectionPool(1, timeout=0.01)
+        pool.get(FakeConnection)
+
+        with pytest.raises(PoolTimeoutError):
+            pool.get(FakeConnection)
+        assert pool.stats()['timeouts'] == 1
+
+    def test_expired_connection_is_replaced(self):
+        pool = ConnectionPool(1, max_age=0)
+        first = pool.get(FakeConnection)
+        pool.put(first)
+
+        assert first.closed
+        assert pool.get(FakeConnection) is not first
+
+    def test_idle_connection_is_checked(self, monkeypatch):
+        monkeypatch.setattr(pool_module, 'CHECK_AFTER', 0)
+        pool = ConnectionPool(1)
+        broken = pool.get(FakeConnection)
+        pool.put(broken)
+        time.sleep(0.001)
+
+        connection = pool.get(FakeConnection, check=lambda conn: False)
+
+        assert connection is not broken
+        assert broken.closed
+        assert pool.stats()['discards'] == 1
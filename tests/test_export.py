@@ -0,0 +1,203 @@
+import gzip
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from api.authentication import ClaimsAccessToken
+from rest_framework.test import APIClient
+from reviews.models import Category, Comment, Genre, Review, Title
+from users.models import User
+
+
+def client_for(user):
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION=f'Bearer {ClaimsAccessToken.for_user(user)}'
+    )
+    return client
+
+
+@pytest.fixture(autouse=True)
+def no_watermark_lag(settings):
+    settings.EXPORT_WATERMARK_LAG = 0
+
+
+@pytest.fixture
+def admin_client():
+    return client_for(User.objects.create(
+        username='admin', email='admin@ya.ru', role=User.ADMIN
+    ))
+
+
+@pytest.fixture
+def catalog():
+    category = Category.objects.create(name='Фильм', slug='movie')
+    genre = Genre.objects.create(name='Драма', slug='drama')
+    users = [
+        User.objects.create(username=f'user{i}', email=f'user{i}@ya.ru')
+        for i in range(3)
+    ]
+    titles = []
+    for i in range(3):
+        title = Title.objects.create(
+            name=f'Фильм {i}', year=2000 + i, category=category
+        )
+        title.genre.set([genre])
+        titles.append(title)
+    start = datetime(2021, 1, 1)
+    for i, user in enumerate(users):
+        review = Review.objects.create(
+            title=titles[0], author=user, text=f'Отзыв {i}', score=i + 5
+        )
+        Comment.objects.create(review=review, author=user, text=f'Да {i}')
+    # Two reviews share a pub_date, the watermark must tell them apart.
+    Review.objects.filter(author=users[0]).update(pub_date=start)
+    Review.objects.exclude(author=users[0]).update(
+        pub_date=start + timedelta(days=1)
+    )
+    return titles
+
+
+def read_lines(response):
+    content = b''.join(response.streaming_content)
+    if response.get('Content-Encoding') == 'gzip':
+        content = gzip.decompress(content)
+    return [json.loads(line) for line in content.splitlines()]
+
+
+@pytest.mark.django_db
+class TestExport:
+
+    @pytest.mark.parametrize('resource', ['titles', 'reviews', 'comments'])
+    def test_admin_only(self, catalog, resource):
+        path = f'/api/v1/export/{resource}.ndjson'
+        user = User.objects.get(username='user0')
+
+        assert APIClient().get(path).status_code == 401
+        assert client_for(user).get(path).status_code == 403, (
+            'Проверьте, что выгрузка доступна только администратору'
+        )
+
+    def test_unknown_resource(self, admin_client):
+        response = admin_client.get('/api/v1/export/users.ndjson')
+
+        assert response.status_code == 404
+
+    def test_titles(self, catalog, admin_client, settings):
+        settings.EXPORT_CHUNK_SIZE = 2
+        response = admin_client.get('/api/v1/export/titles.ndjson')
+        api = admin_client.get('/api/v1/titles/?page_size=10').json()
+
+        assert response.status_code == 200
+        assert response['Content-Type'] == 'application/x-ndjson'
+        assert read_lines(response) == api['results'], (
+            'Проверьте, что выгрузка совпадает с ответом API'
+        )
+
+    def test_reviews(self, catalog, admin_client, settings):
+        settings.EXPORT_CHUNK_SIZE = 2
+        lines = read_lines(
+            admin_client.get('/api/v1/export/reviews.ndjson')
+        )
+        api = admin_client.get(
+            f'/api/v1/titles/{catalog[0].id}/reviews/'
+        ).json()['results']
+
+        assert [(line['pub_date'], line['id']) for line in lines] == sorted(
+            (line['pub_date'], line['id']) for line in lines
+        ), 'Проверьте, что отзывы выгружаются по (pub_date, id)'
+        for line in lines:
+            assert line.pop('title') == catalog[0].id
+        assert sorted(lines, key=lambda line: line['id']) == sorted(
+            api, key=lambda line: line['id']
+        )
+
+    def test_comments(self, catalog, admin_client):
+        lines = read_lines(
+            admin_client.get('/api/v1/export/comments.ndjson')
+        )
+
+        assert len(lines) == Comment.objects.count()
+        assert {line['review'] for line in lines} == set(
+            Review.objects.values_list('id', flat=True)
+        )
+        assert lines[0]['author'] == 'user0'
+
+    def test_since(self, catalog, admin_client):
+        lines = read_lines(
+            admin_client.get('/api/v1/export/reviews.ndjson')
+        )
+        last = lines[1]
+        delta = read_lines(admin_client.get(
+            '/api/v1/export/reviews.ndjson',
+            {'since': last['pub_date'], 'since_id': last['id']},
+        ))
+
+        assert delta == lines[2:], (
+            'Проверьте, что since и since_id отдают только новые строки'
+        )
+
+    def test_recent_rows_held_back(self, catalog, admin_client, settings):
+        settings.EXPORT_WATERMARK_LAG = 60
+        Review.objects.filter(author__username='user2').update(
+            pub_date=datetime.now()
+        )
+
+        lines = read_lines(
+            admin_client.get('/api/v1/export/reviews.ndjson')
+        )
+        comments = read_lines(
+            admin_client.get('/api/v1/export/comments.ndjson')
+        )
+
+        assert [line['author'] for line in lines] == ['user0', 'user1'], (
+            'Проверьте, что свежие отзывы ждут следующей выгрузки'
+        )
+        assert comments == []
+
+    def test_since_id_for_titles(self, catalog, admin_client):
+        lines = read_lines(admin_client.get(
+            '/api/v1/export/titles.ndjson', {'since_id': catalog[0].id}
+        ))
+
+        assert [line['id'] for line in lines] == [
+            title.id for title in catalog[1:]
+        ]
+
+    def test_gzip(self, catalog, admin_client):
+        plain = admin_client.get('/api/v1/export/comments.ndjson')
+        compressed = admin_client.get(
+            '/api/v1/export/comments.ndjson', HTTP_ACCEPT_ENCODING='gzip'
+        )
+
+        assert compressed['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in compressed['Vary']
+        assert read_lines(compressed) == read_lines(plain)
+
+    @pytest.mark.parametrize('header, compressed', [
+        ('gzip;q=0', False),
+        ('gzip;q=0.5, identity', True),
+        ('deflate, *;q=0', False),
+        ('deflate, *', True),
+        ('GZIP', True),
+        ('br', False),
+    ])
+    def test_gzip_quality(self, catalog, admin_client, header, compressed):
+        response = admin_client.get(
+            '/api/v1/export/comments.ndjson', HTTP_ACCEPT_ENCODING=header
+        )
+
+        assert (response.get('Content-Encoding') == 'gzip') is compressed, (
+            'Проверьте, что учитываются q-значения Accept-Encoding'
+        )
+        assert len(read_lines(response)) == 3
+
+    @pytest.mark.parametrize('params', [
+        {'since': 'вчера'},
+        {'since_id': '-1'},
+    ])
+    def test_bad_watermark(self, admin_client, params):
+        response = admin_client.get('/api/v1/export/reviews.ndjson', params)
+
+        assert response.status_code == 400
+        assert set(response.json()) == set(params)
@@ -0,0 +1,198 @@
+import json
+import re
+from io import StringIO
+from os.path import abspath, dirname, join
+
+import pytest
+from django.core.management import call_command
+from reviews.models import Category, Comment, Genre, Review, Title
+from users.models import User
+
+DATA_DIR = join(dirname(abspath(__file__)), 'fixtures', 'filldb')
+SUMMARY_RE = re.compile(r'^(\S+): (\d+) rows in .*, (\d+) skipped$')
+
+
+def filldb(tmp_path, stdout=None, **options):
+    stdout = stdout or StringIO()
+    call_command(
+        'filldb',
+        path=DATA_DIR,
+        checkpoint=str(tmp_path / 'checkpoint.json'),
+        stdout=stdout,
+        stderr=StringIO(),
+        **options,
+    )
+    return {
+        match[1]: (int(match[2]), int(match[3]))
+        for match in map(SUMMARY_RE.match, stdout.getvalue().splitlines())
+        if match
+    }
+
+
+@pytest.mark.django_db(transaction=True)
+class TestFillDb:
+
+    def test_counts(self, tmp_path):
+        summary = filldb(tmp_path)
+
+        assert summary == {
+            'users.csv': (3, 0),
+            'category.csv': (2, 0),
+            'genre.csv': (2, 0),
+            'titles.csv': (2, 2),
+            'genre_title.csv': (3, 2),
+            'review.csv': (3, 2),
+            'comments.csv': (2, 1),
+        }, 'Проверьте, сколько строк загружено и пропущено'
+        assert User.objects.count() == 3
+        assert Category.objects.count() == Genre.objects.count() == 2
+        assert Title.objects.count() == 2
+        assert Title.genre.through.objects.count() == 3
+        assert Review.objects.count() == 3
+        assert Comment.objects.count() == 2
+
+    def test_skipped_rows(self, tmp_path):
+        filldb(tmp_path)
+
+        assert set(Title.objects.values_list('id', flat=True)) == {1, 2}, (
+            'Проверьте, что строки с неизвестным ключом или неверным '
+            'значением пропускаются'
+        )
+        assert set(Review.objects.values_list('id', flat=True)) == {1, 2, 3}
+        assert not Comment.objects.filter(id=2).exists()
+
+    def test_multiline_records(self, tmp_path):
+        filldb(tmp_path)
+
+        assert User.objects.get(username='capt_obvious').bio == (
+            'Пишу очевидное,\nс новой строки'
+        )
+        assert Review.objects.get(id=1).text == (
+            'Отличный фильм,\n"правда"'
+        ), 'Проверьте, что записи из нескольких строк читаются целиком'
+        assert Comment.objects.get(id=3).text == 'Две\nстроки'
+
+    def test_ratings_rebuilt(self, tmp_path):
+        filldb(tmp_path)
+
+        assert list(
+            Title.objects.order_by('id').values_list(
+                'rating_sum', 'rating_count'
+            )
+        ) == [(16, 2), (3, 1)], 'Проверьте, что рейтинги пересчитаны'
+
+    def test_dry_run(self, tmp_path):
+        stdout = StringIO()
+        summary = filldb(tmp_path, stdout=stdout, dry_run=True)
+
+        assert summary['review.csv'] == (3, 2)
+        assert 'fixtures added to DB' not in stdout.getvalue(), (
+            'Проверьте, что пробный запуск не сообщает о записи в БД'
+        )
+        assert 'nothing written' in stdout.getvalue()
+        assert not User.objects.exists()
+        assert not (tmp_path / 'checkpoint.json').exists()
+
+    def test_reload_skips_loaded_rows(self, tmp_path):
+        filldb(tmp_path)
+        summary = filldb(tmp_path)
+
+        assert summary['users.csv'] == (0, 3)
+        assert Review.objects.count() == 3
+        assert Title.objects.get(id=1).rating_count == 2
+
+
+class Interrupted(Exception):
+    pass
+
+
+@pytest.fixture
+def inserted(monkeypatch):
+    """Ids inserted into each table, to catch rows loaded twice."""
+    from reviews.management.commands import filldb as command
+
+    inserted = []
+    insert_rows = command.insert_rows
+
+    def record(model, rows, using='default'):
+        inserted.extend((model._meta.db_table, row[0]) for row in rows)
+        insert_rows(model, rows, using)
+
+    monkeypatch.setattr(command, 'insert_rows', record)
+    return inserted
+
+
+@pytest.mark.django_db(transaction=True)
+class TestFillDbResume:
+
+    def interrupt(self, monkeypatch, when):
+        from reviews.management.commands.filldb import Command
+
+        load = Command.load
+
+        def interrupted(command, csv_file):
+            if when(csv_file):
+                raise Interrupted
+            load(command, csv_file)
+
+        monkeypatch.setattr(Command, 'load', interrupted)
+        return load
+
+    def test_resume_after_one_file(self, tmp_path, monkeypatch, inserted):
+        from reviews.management.commands.filldb import Command
+
+        load = self.interrupt(
+            monkeypatch, lambda csv_file: csv_file.filename != 'users.csv'
+        )
+        with pytest.raises(Interrupted):
+            filldb(tmp_path, jobs=2)
+
+        checkpoint = json.loads((tmp_path / 'checkpoint.json').read_text())
+        assert checkpoint['users.csv']['done'] is True
+        assert not any(
+            state['done'] for name, state in checkpoint.items()
+            if name != 'users.csv'
+        )
+
+        monkeypatch.setattr(Command, 'load', load)
+        summary = filldb(tmp_path, jobs=2)
+
+        assert 'users.csv' not in summary, (
+            'Проверьте, что загруженный файл не читается повторно'
+        )
+        assert len(inserted) == len(set(inserted)), (
+            'Проверьте, что после возобновления строки не загружаются дважды'
+        )
+        assert User.objects.count() == 3
+        assert Comment.objects.count() == 2
+        assert Title.objects.get(id=1).rating_count == 2
+        assert not (tmp_path / 'checkpoint.json').exists()
+
+    def test_resume_inside_a_file(self, tmp_path, monkeypatch, inserted):
+        from reviews.management.commands import filldb as command
+
+        insert_rows = command.insert_rows
+        calls = []
+
+        def fail_on_second_review_batch(model, rows, using='default'):
+            if model is Review:
+                calls.append(rows)
+                if len(calls) == 2:
+                    raise Interrupted
+            insert_rows(model, rows, using)
+
+        monkeypatch.setattr(
+            command, 'insert_rows', fail_on_second_review_batch
+        )
+        with pytest.raises(Interrupted):
+            filldb(tmp_path, batch_size=1)
+        assert Review.objects.count() == 1
+        monkeypatch.setattr(command, 'insert_rows', insert_rows)
+
+        summary = filldb(tmp_path, batch_size=1)
+
+        assert summary['review.csv'] == (2, 2), (
+            'Проверьте, что загрузка продолжается с сохранённого смещения'
+        )
+        assert len(inserted) == len(set(inserted))
+        assert Review.objects.count() == 3
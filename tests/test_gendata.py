@@ -0,0 +1,68 @@
+from collections import Counter
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from reviews.models import Comment, Review, Title
+
+OPTIONS = {
+    'users': 30,
+    'categories': 3,
+    'genres': 5,
+    'titles': 40,
+    'reviews_per_title': 4,
+    'comments_per_review': 1,
+    'batch_size': 15,
+    'truncate': True,
+    'stdout': StringIO(),
+}
+
+
+def snapshot():
+    return (
+        list(Title.objects.order_by('id').values_list(
+            'id', 'name', 'year', 'category_id', 'rating_sum'
+        )),
+        list(Title.genre.through.objects.order_by('id').values_list(
+            'title_id', 'genre_id'
+        )),
+        list(Review.objects.order_by('id').values_list(
+            'title_id', 'author_id', 'score', 'text', 'pub_date'
+        )),
+        list(Comment.objects.order_by('id').values_list(
+            'review_id', 'author_id', 'pub_date'
+        )),
+    )
+
+
+@pytest.mark.django_db
+class TestGenData:
+
+    def test_same_seed_same_data(self):
+        call_command('gendata', seed=7, **OPTIONS)
+        first = snapshot()
+        call_command('gendata', seed=7, **OPTIONS)
+
+        assert snapshot() == first, (
+            'Проверьте, что одинаковый seed даёт одинаковые данные'
+        )
+        call_command('gendata', seed=8, **OPTIONS)
+        assert snapshot() != first
+
+    def test_counts_and_constraints(self):
+        call_command('gendata', zipf=1.5, **OPTIONS)
+
+        assert Title.objects.count() == 40
+        assert Title.genre.through.objects.count() == 80
+        counts = Counter(Review.objects.values_list('title_id', flat=True))
+        pairs = Review.objects.values_list('title_id', 'author_id')
+        assert len(set(pairs)) == len(pairs), (
+            'Проверьте, что автор оставляет не больше одного отзыва'
+        )
+        assert max(counts.values()) <= 30
+        assert max(counts.values()) > 4 * 3, (
+            'Проверьте, что отзывы распределены неравномерно'
+        )
+        title = Title.objects.get(pk=counts.most_common(1)[0][0])
+        assert title.rating_count == counts[title.pk]
+        assert Comment.objects.exists()
@@ -0,0 +1,68 @@
+from datetime import timedelta
+
+import pytest
+from django.core import mail
+from django.core.management import call_command
+from django.utils import timezone
+from jobs.models import Job
+from jobs.tasks import Worker, enqueue, register
+from rest_framework.test import APIClient
+
+
+@register('test_fail')
+def fail(worker, message):
+    raise RuntimeError(message)
+
+
+@pytest.mark.django_db
+class TestJobs:
+
+    def test_signup_enqueues_mail(self):
+        response = APIClient().post(
+            '/api/v1/auth/signup/',
+            {'username': 'user', 'email': 'user@ya.ru'},
+        )
+
+        assert response.status_code == 200
+        assert not mail.outbox, (
+            'Проверьте, что письмо не отправляется внутри запроса'
+        )
+        assert Job.objects.filter(name='send_mail').count() == 1
+
+        call_command('runworker', once=True)
+
+        assert [message.to for message in mail.outbox] == [['user@ya.ru']]
+        assert not Job.objects.exists()
+
+    def test_mails_share_connection(self):
+        for i in range(3):
+            enqueue(
+                'send_mail', subject='Тема', message='Текст',
+                recipient_list=[f'user{i}@ya.ru'],
+            )
+
+        assert Worker(batch_size=10).run_batch() == [True, True, True]
+        assert len(mail.outbox) == 3
+        assert len({id(message.connection) for message in mail.outbox}) == 1
+
+    def test_retry_with_backoff(self):
+        job = enqueue('test_fail', message='Ошибка')
+        worker = Worker(max_attempts=2, retry_delay=10)
+
+        assert worker.run_batch() == [False]
+        job.refresh_from_db()
+        assert job.status == Job.PENDING
+        assert job.attempts == 1
+        assert job.run_at > timezone.now() + timedelta(seconds=5)
+        assert 'Ошибка' in job.last_error
+        assert worker.run_batch() == []
+
+        Job.objects.update(run_at=timezone.now())
+        assert worker.run_batch() == [False]
+        job.refresh_from_db()
+        assert job.status == Job.FAILED
+        assert worker.run_batch() == []
+
+    def test_unknown_job(self):
+        with pytest.raises(ValueError):
+            enqueue('missing')
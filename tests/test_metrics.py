@@ -0,0 +1,134 @@
+import json
+import os
+
+import pytest
+from django.test import Client
+from reviews.models import Category, Genre, Title
+
+from api_yamdb import metrics
+
+
+def create_titles(count):
+    category = Category.objects.create(name='Фильм', slug='movie')
+    genre = Genre.objects.create(name='Драма', slug='drama')
+    for i in range(count):
+        title = Title.objects.create(name=f'Фильм {i}', year=2000,
+                                     category=category)
+        title.genre.add(genre)
+
+
+@pytest.mark.django_db
+class TestPerformanceMiddleware:
+
+    def test_server_timing(self, settings):
+        settings.SERVER_TIMING = True
+        create_titles(3)
+        response = Client().get('/api/v1/titles/')
+
+        assert response.status_code == 200
+        header = response['Server-Timing']
+        assert 'db;dur=' in header
+        assert 'serializer;dur=' in header
+        assert 'view;dur=' in header
+        queries = int(header.split('desc="')[1].split()[0])
+        assert queries > 0, (
+            'Проверьте, что в Server-Timing передаётся число SQL-запросов'
+        )
+
+    def test_server_timing_is_off_by_default(self):
+        response = Client().get('/api/v1/categories/')
+
+        assert 'Server-Timing' not in response
+
+    def test_server_timing_only_for_allowed_clients(self, settings):
+        settings.SERVER_TIMING = True
+        response = Client(REMOTE_ADDR='203.0.113.5').get(
+            '/api/v1/categories/'
+        )
+
+        assert 'Server-Timing' not in response, (
+            'Проверьте, что тайминги не отдаются внешним клиентам'
+        )
+
+    def test_metrics_endpoint(self):
+        client = Client()
+        client.get('/api/v1/genres/')
+        response = client.get('/metrics/')
+
+        assert response.status_code == 200
+        text = response.content.decode()
+        assert '# TYPE yamdb_request_duration_seconds histogram' in text
+        assert (
+            'yamdb_request_duration_seconds_bucket'
+            '{route="genres-list",method="GET",le="+Inf"}'
+        ) in text, 'Проверьте, что гистограмма собирается по имени маршрута'
+        assert 'yamdb_responses_total{route="genres-list",status="200"}' in (
+            text
+        )
+
+
+class TestMetricsAccess:
+
+    def test_other_networks_forbidden(self):
+        response = Client(REMOTE_ADDR='203.0.113.5').get('/metrics/')
+
+        assert response.status_code == 403, (
+            'Проверьте, что метрики недоступны снаружи'
+        )
+
+    def test_forwarded_address_ignored(self):
+        response = Client(
+            REMOTE_ADDR='203.0.113.5', HTTP_X_FORWARDED_FOR='127.0.0.1'
+        ).get('/metrics/')
+
+        assert response.status_code == 403
+
+    def test_private_network_allowed(self):
+        response = Client(REMOTE_ADDR='172.18.0.4').get('/metrics/')
+
+        assert response.status_code == 200
+
+    def test_token(self, settings):
+        settings.METRICS_TOKEN = 'секрет'
+        client = Client()
+
+        assert client.get('/metrics/').status_code == 403
+        assert client.get(
+            '/metrics/', HTTP_AUTHORIZATION='Bearer чужой'
+        ).status_code == 403
+        assert client.get(
+            '/metrics/', HTTP_AUTHORIZATION='Bearer секрет'
+        ).status_code == 200, 'Проверьте доступ к метрикам по токену'
+
+
+class TestMultiprocessMetrics:
+
+    def test_workers_are_added_up(self, settings, tmp_path):
+        settings.METRICS_DIR = str(tmp_path)
+        registry = metrics.Registry()
+        labels = (('route', 'test'), ('method', 'GET'))
+        registry.observe('yamdb_request_duration_seconds', labels, 0.02)
+        registry.inc('yamdb_db_queries_total', (('route', 'test'),), 3)
+        registry.flush(str(tmp_path), force=True)
+        # The file of another worker.
+        os.rename(tmp_path / f'{os.getpid()}.json', tmp_path / '1.json')
+        total = metrics.collect()
+
+        assert total[('yamdb_db_queries_total', (('route', 'test'),))] >= 3
+        histogram = total[('yamdb_request_duration_seconds', labels)]
+        assert sum(histogram[:-1]) >= 1
+
+    def test_dead_worker_is_archived(self, tmp_path):
+        registry = metrics.Registry()
+        registry.inc('yamdb_db_queries_total', (('route', 'test'),), 3)
+        for pid in (1, 2):
+            registry.flush(str(tmp_path), force=True)
+            os.rename(tmp_path / f'{os.getpid()}.json', tmp_path / f'{pid}.json')
+            metrics.mark_process_dead(str(tmp_path), pid)
+
+        assert not (tmp_path / '1.json').exists()
+        with open(tmp_path / metrics.ARCHIVE) as f:
+            archived = json.load(f)
+        assert archived['counters'] == [
+            ['yamdb_db_queries_total', [['route', 'test']], 6]
+        ], 'Проверьте, что счётчики завершённых воркеров не теряются'
@@ -0,0 +1,86 @@
+import pytest
+from api import slugs
+from django.http import HttpResponse
+from django.test import RequestFactory
+from rest_framework.test import APIClient
+from reviews.models import Genre
+
+from api_yamdb.queries import (QueryInspectionError, QueryInspectorMiddleware,
+                               fingerprint)
+
+
+def load_genres_one_by_one(request):
+    for slug in ('a', 'b', 'c', 'd', 'e', 'f'):
+        Genre.objects.filter(slug=slug).first()
+    return HttpResponse()
+
+
+def fetch_genres_one_by_one(request):
+    # The queries run in api/slugs.py, a module of the project.
+    for slug in ('a', 'b', 'c', 'd', 'e', 'f'):
+        slugs.genres.fetch(slug=slug)
+    return HttpResponse()
+
+
+class TestFingerprint:
+
+    def test_values_are_removed(self):
+        first = fingerprint(
+            'SELECT * FROM "t" WHERE "t"."id" = %s AND name = \'x\' LIMIT 21'
+        )
+        second = fingerprint(
+            'SELECT *  FROM "t" WHERE "t"."id" = %s AND name = \'y\' LIMIT 5'
+        )
+
+        assert first == second
+        assert fingerprint('id IN (%s, %s)') == fingerprint(
+            'id IN (%s, %s, %s)'
+        ), 'Проверьте, что списки IN сворачиваются'
+
+
+@pytest.mark.django_db
+class TestQueryInspector:
+
+    def test_repeated_query_is_reported(self):
+        middleware = QueryInspectorMiddleware(load_genres_one_by_one)
+
+        with pytest.raises(QueryInspectionError) as error:
+            middleware(RequestFactory().get('/'))
+        assert '6 x SELECT' in str(error.value)
+        assert 'load_genres_one_by_one' not in str(error.value), (
+            'Проверьте, что в стек попадают только файлы проекта'
+        )
+
+    def test_project_frames_are_reported(self):
+        middleware = QueryInspectorMiddleware(fetch_genres_one_by_one)
+
+        with pytest.raises(QueryInspectionError) as error:
+            middleware(RequestFactory().get('/'))
+        message = str(error.value)
+        assert '6 x SELECT' in message
+        assert 'api/slugs.py' in message and 'in fetch' in message, (
+            'Проверьте, что в отчёт попадает стек из файлов проекта'
+        )
+        assert 'fetch_genres_one_by_one' not in message
+
+    def test_repeated_query_is_logged(self, settings, caplog):
+        settings.QUERY_INSPECTOR = 'log'
+        middleware = QueryInspectorMiddleware(load_genres_one_by_one)
+
+        assert middleware(RequestFactory().get('/')).status_code == 200
+        assert '6 x SELECT' in caplog.text
+
+    def test_budget_is_enforced(self, settings):
+        settings.QUERY_BUDGETS = {'GenreViewSet.list': 0}
+
+        with pytest.raises(QueryInspectionError) as error:
+            APIClient().get('/api/v1/genres/')
+        assert 'GenreViewSet.list ran 1 queries, the budget is 0' in str(
+            error.value
+        )
+
+    def test_disabled(self, settings):
+        settings.QUERY_INSPECTOR = ''
+        settings.QUERY_BUDGETS = {'GenreViewSet.list': 0}
+
+        assert APIClient().get('/api/v1/genres/').status_code == 200
@@ -0,0 +1,220 @@
+import pytest
+from api.authentication import ClaimsAccessToken
+from rest_framework.test import APIClient
+from reviews.models import Review, Title
+from users.models import User
+
+
+def create_reviews(count):
+    title = Title.objects.create(name='Произведение', year=2000)
+    reviews = []
+    for i in range(count):
+        author = User.objects.create(
+            username=f'user{i}', email=f'user{i}@ya.ru'
+        )
+        reviews.append(Review.objects.create(
+            title=title, author=author, text=f'Отзыв {i}', score=5
+        ))
+    return title, reviews
+
+
+@pytest.mark.django_db
+class TestReviewsCursorPagination:
+
+    def test_cursor_pages(self):
+        title, reviews = create_reviews(12)
+        client = APIClient()
+        url = f'/api/v1/titles/{title.id}/reviews/?cursor='
+        expected = [review.id for review in reversed(reviews)]
+
+        pages = []
+        while url:
+            response = client.get(url)
+            assert response.status_code == 200
+            data = response.json()
+            assert 'count' not in data, (
+                'Проверьте, что в режиме курсора не считается COUNT(*)'
+            )
+            pages.append(data)
+            url = data['next']
+
+        assert [len(page['results']) for page in pages] == [5, 5, 2]
+        assert [
+            result['id'] for page in pages for result in page['results']
+        ] == expected
+        assert pages[0]['previous'] is None
+
+        response = client.get(pages[2]['previous'])
+        assert [result['id'] for result in response.json()['results']] == (
+            expected[5:10]
+        )
+
+    def test_page_number_pagination_is_default(self):
+        title, _ = create_reviews(6)
+
+        response = APIClient().get(f'/api/v1/titles/{title.id}/reviews/')
+
+        assert response.json()['count'] == 6
+
+    def test_invalid_cursor(self):
+        title, _ = create_reviews(1)
+
+        response = APIClient().get(
+            f'/api/v1/titles/{title.id}/reviews/', {'cursor': 'broken'}
+        )
+
+        assert response.status_code == 404
+
+
+def client_for(user):
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION=f'Bearer {ClaimsAccessToken.for_user(user)}'
+    )
+    return client
+
+
+@pytest.mark.django_db
+class TestNestedResources:
+
+    def test_reviews_list_queries(self, django_assert_num_queries):
+        title, _ = create_reviews(5)
+        client = APIClient()
+        url = f'/api/v1/titles/{title.id}/reviews/?cursor='
+        client.get(url)
+
+        with django_assert_num_queries(2):
+            response = client.get(url, HTTP_IF_NONE_MATCH='"stale"')
+
+        assert len(response.json()['results']) == 5
+
+    def test_reviews_of_missing_title(self):
+        response = APIClient().get('/api/v1/titles/404/reviews/')
+
+        assert response.status_code == 404
+
+    def test_second_review_rejected(self):
+        title, reviews = create_reviews(1)
+
+        response = client_for(reviews[0].author).post(
+            f'/api/v1/titles/{title.id}/reviews/',
+            {'text': 'Ещё раз', 'score': 1},
+        )
+
+        assert response.status_code == 400
+        assert title.reviews.count() == 1
+
+    def test_review_for_missing_title_in_transaction(self):
+        # The test runs inside a transaction, where the foreign keys are
+        # only checked at the commit.
+        user = User.objects.create(username='user', email='user@ya.ru')
+
+        response = client_for(user).post(
+            '/api/v1/titles/404/reviews/', {'text': 'Отзыв', 'score': 5}
+        )
+
+        assert response.status_code == 404, (
+            'Проверьте, что произведение проверяется до создания отзыва'
+        )
+        assert not Review.objects.exists()
+
+    def test_comment_under_other_title(self):
+        title, reviews = create_reviews(1)
+        other = Title.objects.create(name='Другое', year=2001)
+        url = f'/api/v1/titles/{other.id}/reviews/{reviews[0].id}/comments/'
+
+        assert APIClient().get(url).status_code == 404
+        response = client_for(reviews[0].author).post(url, {'text': 'Мимо'})
+        assert response.status_code == 404
+
+
+def rating_of(title):
+    title.refresh_from_db()
+    return title.rating_sum, title.rating_count
+
+
+@pytest.mark.django_db
+class TestRating:
+
+    def test_create(self):
+        title, _ = create_reviews(3)
+
+        assert rating_of(title) == (15, 3)
+
+    def test_update_score(self):
+        title, reviews = create_reviews(2)
+        reviews[0].score = 9
+        reviews[0].save()
+
+        assert rating_of(title) == (14, 2), (
+            'Проверьте, что рейтинг пересчитывается при изменении оценки'
+        )
+
+    def test_change_title(self):
+        title, reviews = create_reviews(2)
+        other = Title.objects.create(name='Другое', year=2001)
+        reviews[0].title = other
+        reviews[0].score = 8
+        reviews[0].save()
+
+        assert rating_of(title) == (5, 1)
+        assert rating_of(other) == (8, 1), (
+            'Проверьте, что отзыв переносит оценку в другое произведение'
+        )
+
+    def test_delete(self):
+        title, reviews = create_reviews(2)
+        reviews[0].delete()
+
+        assert rating_of(title) == (5, 1)
+
+    def test_update_without_snapshot(self):
+        title, reviews = create_reviews(2)
+        review = Review(
+            pk=reviews[0].pk, title=title, author=reviews[0].author,
+            text='Изменён', score=1, pub_date=reviews[0].pub_date,
+        )
+        review.save()
+
+        assert rating_of(title) == (6, 2), (
+            'Проверьте, что старая оценка читается из базы'
+        )
+
+    def test_stale_instances(self):
+        # Two requests load the review before either one saves it.
+        title, reviews = create_reviews(2)
+        first = Review.objects.get(pk=reviews[0].pk)
+        second = Review.objects.get(pk=reviews[0].pk)
+        first.score = 1
+        first.save()
+        second.score = 3
+        second.save()
+
+        assert rating_of(title) == (8, 2), (
+            'Проверьте, что разница оценок считается от сохранённой строки'
+        )
+
+        first.delete()
+        assert rating_of(title) == (5, 1)
+
+    def test_over_the_api(self):
+        title, reviews = create_reviews(2)
+        client = client_for(reviews[0].author)
+        url = f'/api/v1/titles/{title.id}/reviews/{reviews[0].id}/'
+
+        client.patch(url, {'score': 10})
+        assert rating_of(title) == (15, 2)
+        client.delete(url)
+        assert rating_of(title) == (5, 1)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_review_for_missing_title():
+    user = User.objects.create(username='user', email='user@ya.ru')
+
+    response = client_for(user).post(
+        '/api/v1/titles/404/reviews/', {'text': 'Отзыв', 'score': 5}
+    )
+
+    assert response.status_code == 404
+    assert not Review.objects.exists()
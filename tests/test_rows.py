@@ -0,0 +1,177 @@
+from datetime import datetime
+
+import pytest
+from api import renderers
+from api.authentication import ClaimsAccessToken
+from api.renderers import FastJSONRenderer
+from api.views import (CommentsViewSet, ReviewsViewSet, TitleViewSet,
+                       UserViewset)
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from reviews.models import Category, Comment, Genre, Review, Title
+from users.models import User
+
+
+@pytest.fixture
+def catalog():
+    category = Category.objects.create(name='Фильм', slug='movie')
+    genres = [
+        Genre.objects.create(name=f'Жанр {i}', slug=f'genre-{i}')
+        for i in range(3)
+    ]
+    users = [
+        User.objects.create(username=f'user{i}', email=f'user{i}@ya.ru')
+        for i in range(3)
+    ]
+    first = Title.objects.create(
+        name='Фильм', year=2000, category=category,
+        description='Строка\u2028с разделителем',
+    )
+    first.genre.set(genres[::-1])
+    second = Title.objects.create(name='Без категории', year=1990)
+    for user in users:
+        review = Review.objects.create(
+            title=first, author=user, text=f'Отзыв {user.username}', score=7
+        )
+        Comment.objects.create(review=review, author=user, text='"Да"')
+    return first, second
+
+
+VIEWS = (TitleViewSet, ReviewsViewSet, CommentsViewSet, UserViewset)
+
+
+@pytest.fixture
+def admin_client():
+    admin = User.objects.create(
+        username='admin', email='admin@ya.ru', role=User.ADMIN
+    )
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION=f'Bearer {ClaimsAccessToken.for_user(admin)}'
+    )
+    return client
+
+
+@pytest.mark.django_db
+class TestRowSerializers:
+
+    def get_both(self, client, monkeypatch, path):
+        fast = client.get(path)
+        # The catalog views cache their responses.
+        for cache in caches.all():
+            cache.clear()
+        for view in VIEWS:
+            monkeypatch.setattr(view, 'row_serializer', None)
+        slow = client.get(path)
+        monkeypatch.undo()
+        return fast, slow
+
+    @pytest.mark.parametrize('path', [
+        '/api/v1/titles/',
+        '/api/v1/titles/?ordering=-year',
+        '/api/v1/titles/{title}/',
+        '/api/v1/titles/{title}/reviews/',
+        '/api/v1/titles/{title}/reviews/?cursor=',
+        '/api/v1/titles/{title}/reviews/{review}/',
+        '/api/v1/titles/{title}/reviews/{review}/comments/',
+        '/api/v1/titles/{title}/reviews/{review}/comments/{comment}/',
+        '/api/v1/titles/?fields=genre,name',
+        '/api/v1/titles/{title}/?fields=rating,category',
+        '/api/v1/titles/{title}/reviews/?cursor=&fields=text&page_size=2',
+        '/api/v1/titles/{title}/reviews/{review}/comments/?fields=author',
+        '/api/v1/users/',
+        '/api/v1/users/user1/?fields=role,email',
+    ])
+    def test_same_bytes(self, catalog, admin_client, monkeypatch, path):
+        title = catalog[0]
+        review = title.reviews.first()
+        path = path.format(
+            title=title.id,
+            review=review.id,
+            comment=review.comments.first().id,
+        )
+        fast, slow = self.get_both(admin_client, monkeypatch, path)
+
+        assert fast.status_code == slow.status_code == 200
+        assert fast.content == slow.content, (
+            f'Проверьте, что быстрый путь {path} отдаёт тот же ответ'
+        )
+
+    def test_missing_object(self, catalog):
+        response = APIClient().get('/api/v1/titles/0/')
+
+        assert response.status_code == 404
+
+
+@pytest.mark.django_db
+class TestSparseFields:
+
+    def test_selected_fields(self, catalog):
+        response = APIClient().get('/api/v1/titles/?fields=name,genre')
+
+        assert response.status_code == 200
+        for title in response.json()['results']:
+            assert list(title) == ['name', 'genre'], (
+                'Проверьте, что fields= оставляет только выбранные поля'
+            )
+
+    def test_unknown_field(self, catalog):
+        response = APIClient().get('/api/v1/titles/?fields=name,secret')
+
+        assert response.status_code == 400
+        assert 'fields' in response.json()
+
+    def test_fields_drive_queries(self, catalog, django_assert_num_queries):
+        # Validators, COUNT and the titles, the genres are not read.
+        with django_assert_num_queries(3):
+            APIClient().get('/api/v1/titles/?fields=id,name')
+
+    def test_writes_ignore_fields(self, catalog, admin_client):
+        response = admin_client.post(
+            '/api/v1/titles/?fields=id',
+            {'name': 'Новый', 'year': 2001, 'category': 'movie',
+             'genre': ['genre-0']},
+        )
+
+        assert response.status_code == 201
+        assert response.json()['name'] == 'Новый'
+
+
+@pytest.mark.django_db
+class TestPageSize:
+
+    def test_page_size(self, catalog):
+        response = APIClient().get('/api/v1/titles/?page_size=1')
+
+        assert len(response.json()['results']) == 1
+        assert response.json()['next']
+
+    def test_page_size_is_bounded(self, catalog, settings):
+        settings.MAX_PAGE_SIZE = 1
+        response = APIClient().get('/api/v1/titles/?page_size=100')
+
+        assert len(response.json()['results']) == 1, (
+            'Проверьте, что page_size ограничен MAX_PAGE_SIZE'
+        )
+
+
+class TestFastJSONRenderer:
+
+    def test_same_bytes_as_json_renderer(self):
+        data = {
+            'text': 'Строка\u2028"кавычки"\\',
+            'lazy': gettext_lazy('username'),
+            'date': datetime(2021, 5, 1, 12, 30, 15, 123456),
+            'items': [1, 2.5, None, True],
+        }
+
+        assert FastJSONRenderer().render(data) == JSONRenderer().render(
+            data
+        )
+
+    def test_stdlib_fallback(self, monkeypatch):
+        monkeypatch.setattr(renderers, 'orjson', None)
+
+        assert FastJSONRenderer().render({'a': 1}) == b'{"a":1}'
@@ -0,0 +1,100 @@
+import pytest
+from rest_framework.test import APIClient
+from reviews.models import Review, Title
+from users.models import User
+
+SEARCH_URL = '/api/v1/search/'
+
+
+@pytest.mark.django_db
+class TestSearch:
+
+    def test_titles_ranked_by_name_then_description(self):
+        in_description = Title.objects.create(
+            name='Зелёная миля', year=1999, description='Побег не удался'
+        )
+        in_name = Title.objects.create(name='Побег из Шоушенка', year=1994)
+        Title.objects.create(name='Крёстный отец', year=1972)
+
+        response = APIClient().get(SEARCH_URL, {'q': 'побег'})
+
+        assert response.status_code == 200
+        results = response.json()['results']
+        assert [result['id'] for result in results] == [
+            in_name.id, in_description.id
+        ], 'Совпадение в названии должно быть выше совпадения в описании'
+        assert results[0]['rank'] > results[1]['rank']
+
+    @pytest.mark.django_db(transaction=True)
+    def test_search_reflects_updates(self):
+        client = APIClient()
+        title = Title.objects.create(name='Мастер и Маргарита', year=1966)
+        assert client.get(SEARCH_URL, {'q': 'маргарита'}).json()['results']
+
+        title.name = 'Собачье сердце'
+        title.save()
+
+        assert not client.get(
+            SEARCH_URL, {'q': 'маргарита'}
+        ).json()['results']
+
+    def test_reviews_search_pages(self):
+        title = Title.objects.create(name='Солярис', year=1972)
+        for i in range(7):
+            author = User.objects.create(
+                username=f'user{i}', email=f'user{i}@ya.ru'
+            )
+            Review.objects.create(
+                title=title, author=author, score=8,
+                text='Шедевр ' * (i + 1) + 'кино',
+            )
+        client = APIClient()
+
+        first = client.get(SEARCH_URL, {'q': 'шедевр', 'type': 'reviews'})
+        second = client.get(first.json()['next'])
+
+        results = first.json()['results'] + second.json()['results']
+        assert len(results) == 7
+        assert second.json()['next'] is None
+        assert [result['rank'] for result in results] == sorted(
+            (result['rank'] for result in results), reverse=True
+        )
+
+    def test_equal_ranks_across_pages(self):
+        title = Title.objects.create(name='Сталкер', year=1979)
+        for i in range(7):
+            author = User.objects.create(
+                username=f'user{i}', email=f'user{i}@ya.ru'
+            )
+            Review.objects.create(
+                title=title, author=author, score=8, text='Зона кино'
+            )
+        client = APIClient()
+
+        pages = [client.get(SEARCH_URL, {'q': 'зона', 'type': 'reviews'})]
+        while pages[-1].json()['next']:
+            pages.append(client.get(pages[-1].json()['next']))
+
+        ids = [
+            result['id'] for page in pages for result in page.json()['results']
+        ]
+        assert len(pages) == 2
+        assert ids == sorted(
+            Review.objects.values_list('id', flat=True), reverse=True
+        ), 'Проверьте, что равные ранги не теряются на границе страниц'
+
+    def test_fallback_limit(self, settings):
+        settings.SEARCH_FALLBACK_LIMIT = 2
+        for i in range(4):
+            Title.objects.create(
+                name='Дюна', year=1965 + i, description='Дюна ' * i
+            )
+
+        results = APIClient().get(SEARCH_URL, {'q': 'дюна'}).json()['results']
+
+        assert [result['year'] for result in results] == [1968, 1967], (
+            'Проверьте, что без PostgreSQL отдаются лучшие совпадения'
+        )
+
+    def test_query_is_required(self):
+        assert APIClient().get(SEARCH_URL).status_code == 400
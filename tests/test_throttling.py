@@ -0,0 +1,51 @@
+import pytest
+from api.throttling import SQLiteStore, take
+from rest_framework.test import APIClient
+
+SIGNUP_URL = '/api/v1/auth/signup/'
+
+
+def signup(client, i, **extra):
+    return client.post(
+        SIGNUP_URL, {'username': f'user{i}', 'email': f'user{i}@ya.ru'},
+        **extra,
+    )
+
+
+@pytest.mark.django_db
+class TestThrottling:
+
+    def test_signup_throttled_per_ip(self, settings):
+        settings.REST_FRAMEWORK = {
+            **settings.REST_FRAMEWORK,
+            'DEFAULT_THROTTLE_RATES': {'signup': '2/min'},
+        }
+        client = APIClient()
+
+        assert signup(client, 1).status_code == 200
+        assert signup(client, 2).status_code == 200
+        response = signup(client, 3)
+
+        assert response.status_code == 429
+        assert 0 < int(response['Retry-After']) <= 30, (
+            'Проверьте, что ответ 429 содержит заголовок Retry-After'
+        )
+        assert signup(
+            client, 4, HTTP_X_FORWARDED_FOR='10.0.0.2'
+        ).status_code == 200, 'Проверьте, что лимит считается по IP клиента'
+
+    def test_sqlite_store_is_shared(self, tmp_path):
+        path = str(tmp_path / 'buckets.sqlite3')
+        first, second = SQLiteStore(path), SQLiteStore(path)
+
+        assert first.consume('key', 2, 1.0)[0]
+        assert second.consume('key', 2, 1.0)[0]
+        allowed, wait = first.consume('key', 2, 0.1)
+
+        assert not allowed
+        assert 0 < wait <= 10
+
+    def test_bucket_refills(self):
+        assert take(0, 0, 5, 2.0, 1) == (True, 1.0, None)
+        assert take(0, 0, 5, 2.0, 100)[1] == 4
+        assert take(0.5, 0, 5, 1.0, 0) == (False, 0.5, 0.5)
@@ -0,0 +1,262 @@
+import pytest
+from api.authentication import ClaimsAccessToken
+from rest_framework.test import APIClient
+from reviews.models import Category, Genre, Review, Title
+from users.models import User
+
+TITLES_URL = '/api/v1/titles/'
+BULK_URL = '/api/v1/titles/bulk/'
+
+
+def create_titles(count, genres_per_title=3):
+    category = Category.objects.create(name='Фильм', slug='movie')
+    genres = [
+        Genre.objects.create(name=f'Жанр {i}', slug=f'genre-{i}')
+        for i in range(genres_per_title)
+    ]
+    authors = [
+        User.objects.create(username=f'user{i}', email=f'user{i}@ya.ru')
+        for i in range(2)
+    ]
+    titles = []
+    for i in range(count):
+        title = Title.objects.create(
+            name=f'Произведение {i}', year=2000 + i, category=category
+        )
+        title.genre.set(genres)
+        for score, author in zip((4, 7), authors):
+            Review.objects.create(
+                title=title, author=author, text='Текст', score=score
+            )
+        titles.append(title)
+    return titles
+
+
+@pytest.mark.django_db
+class TestTitleList:
+
+    def test_title_representation(self):
+        title = create_titles(1)[0]
+
+        response = APIClient().get(f'{TITLES_URL}{title.id}/')
+
+        assert response.status_code == 200
+        assert response.json() == {
+            'id': title.id,
+            'rating': 6,
+            'name': 'Произведение 0',
+            'year': 2000,
+            'description': '',
+            'category': {'name': 'Фильм', 'slug': 'movie'},
+            'genre': [
+                {'name': 'Жанр 0', 'slug': 'genre-0'},
+                {'name': 'Жанр 1', 'slug': 'genre-1'},
+                {'name': 'Жанр 2', 'slug': 'genre-2'},
+            ],
+        }
+
+    @pytest.mark.parametrize('titles_count', [1, 5, 12])
+    def test_title_list_queries(self, django_assert_num_queries,
+                                titles_count):
+        create_titles(titles_count)
+        client = APIClient()
+
+        # validators, count, titles with categories, genres prefetch
+        with django_assert_num_queries(4):
+            response = client.get(TITLES_URL)
+
+        assert response.status_code == 200, (
+            'Проверьте, что список произведений доступен без авторизации'
+        )
+        assert response.json()['count'] == titles_count
+
+    def test_title_list_ordering_by_rating(self):
+        titles = create_titles(3)
+        Review.objects.filter(title=titles[1]).update(score=10)
+        Title.objects.rebuild_ratings()
+
+        response = APIClient().get(TITLES_URL, {'ordering': '-rating'})
+
+        assert response.json()['results'][0]['id'] == titles[1].id
+
+
+@pytest.fixture
+def admin_client():
+    admin = User.objects.create(
+        username='admin', email='admin@ya.ru', role=User.ADMIN
+    )
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION=f'Bearer {ClaimsAccessToken.for_user(admin)}'
+    )
+    return client
+
+
+def new_titles(count):
+    return [
+        {'name': f'Новое {i}', 'year': 2000 + i, 'category': 'movie',
+         'genre': ['genre-0', 'genre-1']}
+        for i in range(count)
+    ]
+
+
+@pytest.mark.django_db
+class TestTitleBulk:
+
+    def test_admin_only(self):
+        create_titles(0)
+
+        response = APIClient().post(BULK_URL, new_titles(1), format='json')
+
+        assert response.status_code == 401
+        assert not Title.objects.exists()
+
+    def test_create(self, admin_client):
+        create_titles(0)
+
+        response = admin_client.post(BULK_URL, new_titles(3), format='json')
+
+        assert response.status_code == 201
+        data = response.json()
+        assert [title['name'] for title in data] == [
+            'Новое 0', 'Новое 1', 'Новое 2'
+        ]
+        assert data[0] == admin_client.get(
+            f'{TITLES_URL}{data[0]["id"]}/'
+        ).json(), 'Проверьте, что ответ совпадает с карточкой произведения'
+        assert Title.objects.get(pk=data[2]['id']).genre.count() == 2
+
+    @pytest.mark.parametrize('count', [2, 20])
+    def test_create_queries(self, admin_client, django_assert_num_queries,
+                            count):
+        create_titles(0)
+
+        # savepoint, categories, genres, titles, their ids (SQLite only),
+        # genre links, release, and the response: titles and genres
+        with django_assert_num_queries(9):
+            response = admin_client.post(
+                BULK_URL, new_titles(count), format='json'
+            )
+
+        assert response.status_code == 201
+
+    def test_update(self, admin_client):
+        titles = create_titles(2)
+        Category.objects.create(name='Книга', slug='book')
+
+        response = admin_client.patch(BULK_URL, [
+            {'id': titles[1].id, 'genre': ['genre-2']},
+            {'id': titles[0].id, 'name': 'Другое', 'category': 'book'},
+        ], format='json')
+
+        assert response.status_code == 200
+        first, second = response.json()
+        assert first['id'] == titles[1].id
+        assert first['genre'] == [{'name': 'Жанр 2', 'slug': 'genre-2'}]
+        assert second['name'] == 'Другое'
+        assert second['category']['slug'] == 'book'
+        assert second['rating'] == 6, (
+            'Проверьте, что изменение не трогает рейтинг'
+        )
+        assert admin_client.get(f'{TITLES_URL}{titles[0].id}/').json()[
+            'name'
+        ] == 'Другое', 'Проверьте, что кэш карточки сброшен'
+
+    def test_errors_by_item(self, admin_client):
+        create_titles(0)
+        items = new_titles(4)
+        items[1]['category'] = 'nope'
+        items[2]['genre'] = ['genre-0', 'nope']
+        del items[3]['year']
+
+        response = admin_client.post(BULK_URL, items, format='json')
+
+        assert response.status_code == 400
+        errors = response.json()
+        assert errors[0] == {}
+        assert list(errors[1]) == ['category']
+        assert list(errors[2]) == ['genre']
+        assert list(errors[3]) == ['year']
+        assert not Title.objects.exists(), (
+            'Проверьте, что при ошибках ничего не записано'
+        )
+
+    def test_update_errors(self, admin_client):
+        title = create_titles(1)[0]
+
+        response = admin_client.patch(BULK_URL, [
+            {'name': 'Без id'},
+            {'id': 0, 'name': 'Нет такого'},
+            {'id': title.id, 'name': 'Есть'},
+            {'id': title.id, 'name': 'Повтор'},
+        ], format='json')
+
+        assert response.status_code == 400
+        assert [list(error) for error in response.json()] == [
+            ['id'], ['id'], [], ['id']
+        ]
+
+    def test_too_many(self, admin_client, settings):
+        settings.MAX_BULK_TITLES = 1
+
+        response = admin_client.post(BULK_URL, new_titles(2), format='json')
+
+        assert response.status_code == 400
+
+    def test_update_writes_only_sent_fields(self, admin_client, monkeypatch):
+        from api import bulk
+
+        titles = create_titles(2)
+        resolve_items = bulk.resolve_items
+
+        def edited_meanwhile(*args):
+            loaded = resolve_items(*args)
+            # Another editor renames the title after it was loaded.
+            Title.objects.filter(pk=titles[0].id).update(name='Чужое')
+            return loaded
+
+        monkeypatch.setattr(bulk, 'resolve_items', edited_meanwhile)
+        response = admin_client.patch(BULK_URL, [
+            {'id': titles[0].id, 'description': 'Описание'},
+            {'id': titles[1].id, 'name': 'Другое'},
+        ], format='json')
+
+        assert response.status_code == 200
+        title = Title.objects.get(pk=titles[0].id)
+        assert (title.name, title.description) == ('Чужое', 'Описание'), (
+            'Проверьте, что записываются только присланные поля'
+        )
+        assert Title.objects.get(pk=titles[1].id).name == 'Другое'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_category_deleted_before_write(self, admin_client, monkeypatch):
+        from api import bulk
+
+        create_titles(0)
+        book = Category.objects.create(name='Книга', slug='book')
+        resolve_items = bulk.resolve_items
+        calls = []
+
+        def stale(items, errors, partial):
+            titles = resolve_items(items, errors, partial)
+            if not calls:
+                # The category is read just before it is deleted.
+                calls.append(True)
+                items[1]['category'] = book.id
+                errors[1].pop('category', None)
+            return titles
+
+        Category.objects.filter(pk=book.pk).delete()
+        monkeypatch.setattr(bulk, 'resolve_items', stale)
+        items = new_titles(2)
+        items[1]['category'] = 'book'
+
+        response = admin_client.post(BULK_URL, items, format='json')
+
+        assert response.status_code == 400, (
+            'Проверьте, что удалённая категория даёт ошибку позиции, а не 500'
+        )
+        assert [list(error) for error in response.json()] == [
+            [], ['category']
+        ]
+        assert not Title.objects.exists()